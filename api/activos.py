@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Entrega de los archivos estáticos del frontend con caché
+# Al arrancar (y cuando cambia algún archivo de frontend/) se construye en memoria:
+# - calendar.js -> calendar.<hash>.js (y lo mismo para cada .js/.css), con las referencias
+#   de index.html reescritas a los nombres con hash
+# - variantes gzip y brotli (si está instalado el paquete brotli) de cada archivo de texto
+# Los nombres con hash se sirven con Cache-Control immutable; index.html y los nombres originales
+# con "no-cache" + ETag, así una recarga solo transfiere index.html o recibe un 304.
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from flask import Response, abort, request
+
+from db.logger import logger
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; gzip viene con Python
+    brotli = None
+
+CARPETA_FRONTEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
+EXTENSIONES_CON_HASH = (".js", ".css")
+EXTENSIONES_COMPRIMIBLES = (".html", ".js", ".css", ".json", ".svg", ".txt")
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+SEGUNDOS_ENTRE_REVISIONES = 2  # Cada cuánto se mira si cambió algún archivo de frontend/
+
+_TIPOS_COMPRIMIBLES = {mimetypes.guess_type("x" + ext)[0] or "text/plain" for ext in EXTENSIONES_COMPRIMIBLES}
+# Etiqueta opaca de cada entity-tag de If-None-Match, sin el prefijo W/ de los validadores débiles
+_RE_ETAG = re.compile(r'(?:W/)?("[^"]*")')
+_RE_REFERENCIA = re.compile(r'''(\b(?:src|href)\s*=\s*["'])([^"'?#]+)(["'])''', re.IGNORECASE)
+
+
+class Activo:
+    """Un archivo listo para servir: contenido por codificación, ETag y Cache-Control."""
+
+    def __init__(self, contenido, tipo, cache_control):
+        self.tipo = tipo
+        self.cache_control = cache_control
+        self.sha = hashlib.sha256(contenido).hexdigest()
+        self.variantes = {"identity": contenido}
+        if tipo.split(";")[0] in _TIPOS_COMPRIMIBLES and len(contenido) > 256:
+            comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+            if len(comprimido) < len(contenido):
+                self.variantes["gzip"] = comprimido
+            if brotli is not None:
+                comprimido = brotli.compress(contenido, quality=11)
+                if len(comprimido) < len(contenido):
+                    self.variantes["br"] = comprimido
+
+    def etag(self, codificacion):
+        # Un ETag fuerte distinto por codificación: los bytes enviados son distintos
+        return '"%s-%s"' % (self.sha[:16], codificacion)
+
+
+def _tipo(nombre):
+    tipo = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+    if tipo.startswith("text/") or tipo in ("application/javascript", "application/json"):
+        tipo += "; charset=utf-8"
+    return tipo
+
+
+def nombre_con_hash(nombre, contenido):
+    base, ext = os.path.splitext(nombre)
+    return "%s.%s%s" % (base, hashlib.sha256(contenido).hexdigest()[:10], ext)
+
+
+def _firma_carpeta(carpeta):
+    firma = []
+    for raiz, _, archivos in os.walk(carpeta):
+        for archivo in archivos:
+            estado = os.stat(os.path.join(raiz, archivo))
+            firma.append((os.path.join(raiz, archivo), estado.st_mtime_ns, estado.st_size))
+    return tuple(sorted(firma))
+
+
+def construir_activos(carpeta=CARPETA_FRONTEND):
+    """
+    Lee frontend/ completo y devuelve {ruta_relativa: Activo}, incluyendo los nombres con hash.
+    Los nombres originales siguen disponibles (sin caché larga) para quien los pida directamente.
+    """
+    contenidos = {}
+    for raiz, _, archivos in os.walk(carpeta):
+        for archivo in archivos:
+            ruta = os.path.join(raiz, archivo)
+            with open(ruta, "rb") as f:
+                contenidos[os.path.relpath(ruta, carpeta).replace(os.sep, "/")] = f.read()
+
+    renombres = {nombre: nombre_con_hash(nombre, contenido) for nombre, contenido in contenidos.items()
+                 if nombre.endswith(EXTENSIONES_CON_HASH)}
+
+    activos = {}
+    for nombre, contenido in contenidos.items():
+        if nombre.endswith(".html"):
+            html = contenido.decode("utf-8")
+            html = _RE_REFERENCIA.sub(
+                lambda m: m.group(1) + renombres.get(m.group(2), m.group(2)) + m.group(3), html)
+            contenido = html.encode("utf-8")
+        activos[nombre] = Activo(contenido, _tipo(nombre), CACHE_REVALIDAR)
+        if nombre in renombres:
+            activos[renombres[nombre]] = Activo(contenido, _tipo(nombre), CACHE_INMUTABLE)
+    logger.info("Activos del frontend construidos: %d archivos (%d con hash, brotli %s)",
+                len(contenidos), len(renombres), "sí" if brotli is not None else "no")
+    return activos
+
+
+class _Cache:
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.activos = None
+        self.firma = None
+        self.revisado = 0
+        self._lock = threading.Lock()
+
+    def obtener(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if self.activos is None or ahora - self.revisado >= SEGUNDOS_ENTRE_REVISIONES:
+                self.revisado = ahora
+                firma = _firma_carpeta(self.carpeta)
+                if firma != self.firma:
+                    self.activos = construir_activos(self.carpeta)
+                    self.firma = firma
+            return self.activos
+
+
+_caches = {}
+
+
+def obtener_activos(carpeta=CARPETA_FRONTEND):
+    """Activos en memoria de `carpeta`; se reconstruyen solo si algún archivo cambió."""
+    cache = _caches.get(carpeta)
+    if cache is None:
+        cache = _caches.setdefault(carpeta, _Cache(carpeta))
+    return cache.obtener()
+
+
+def _calidades(accept_encoding):
+    """{codificación: q} de Accept-Encoding; el parámetro q puede ir entre otros parámetros."""
+    aceptadas = {}
+    for parte in accept_encoding.split(","):
+        token, *parametros = [p.strip() for p in parte.split(";")]
+        if not token:
+            continue
+        calidad = 1.0
+        for parametro in parametros:
+            nombre, _, valor = parametro.partition("=")
+            if nombre.strip().lower() == "q":
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    pass
+        aceptadas[token.lower()] = calidad
+    return aceptadas
+
+
+def _elegir_codificacion(activo, accept_encoding):
+    """
+    Codificación con mayor q (RFC 9110 §12.5.3): "*" vale para las no nombradas y q=0 rechaza.
+    Ante un empate gana br, luego gzip. identity sin nombrar queda como último recurso.
+    """
+    aceptadas = _calidades(accept_encoding)
+
+    def calidad(codificacion):
+        if codificacion in aceptadas:
+            return aceptadas[codificacion]
+        return aceptadas.get("*", 0.0)
+
+    candidatas = [c for c in ("br", "gzip") if c in activo.variantes] + ["identity"]
+    mejor = max(candidatas, key=calidad)
+    # Sin ninguna aceptable se envía sin codificar (la RFC lo permite en lugar de un 406)
+    return mejor if calidad(mejor) > 0 else "identity"
+
+
+def _coincide_etag(if_none_match, etag):
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2): "*" o la lista de ETags, con o sin W/."""
+    if if_none_match.strip() == "*":
+        return True
+    return etag in _RE_ETAG.findall(if_none_match)
+
+
+def responder_activo(nombre, carpeta=CARPETA_FRONTEND):
+    """Respuesta Flask para un archivo del frontend, con compresión, ETag y 304."""
+    activo = obtener_activos(carpeta).get(nombre)
+    if activo is None:
+        abort(404)
+    codificacion = _elegir_codificacion(activo, request.headers.get("Accept-Encoding", ""))
+    etag = activo.etag(codificacion)
+    cabeceras = {"ETag": etag, "Cache-Control": activo.cache_control, "Vary": "Accept-Encoding"}
+
+    if _coincide_etag(request.headers.get("If-None-Match", ""), etag):
+        return Response(status=304, headers=cabeceras)
+
+    if codificacion != "identity":
+        cabeceras["Content-Encoding"] = codificacion
+    return Response(activo.variantes[codificacion], content_type=activo.tipo, headers=cabeceras)
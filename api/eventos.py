@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# Índice en memoria de data/events.json para el calendario
+# El archivo se lee una sola vez (y otra vez solo si cambia su mtime o tamaño). Los eventos quedan
+# ordenados por inicio y una consulta por rango usa bisect: solo se revisan los eventos que empiezan
+# entre (inicio_vista - duración_máxima) y fin_vista, en lugar de recorrer y parsear todo el archivo.
+import bisect
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from db.logger import logger
+
+RUTA_EVENTOS = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'events.json'))
+
+
+def parsear_fecha(valor):
+    """
+    ISO 8601 (fecha sola, con hora, con zona) a datetime sin zona.
+    Se compara en hora "de pared", igual que el calendario muestra los eventos.
+    """
+    if not valor:
+        return None
+    if isinstance(valor, str) and valor.endswith("Z"):
+        valor = valor[:-1] + "+00:00"
+    return datetime.fromisoformat(valor).replace(tzinfo=None)
+
+
+def _intervalo(evento):
+    """(inicio, fin) de un evento; sin fin dura 0, o un día si es de día completo."""
+    inicio = parsear_fecha(evento.get("start") or evento.get("inicio"))
+    if inicio is None:
+        return None
+    fin = parsear_fecha(evento.get("end") or evento.get("fin"))
+    if fin is None or fin < inicio:
+        todo_el_dia = evento.get("allDay", evento.get("todoElDia", False))
+        fin = inicio + timedelta(days=1) if todo_el_dia else inicio
+    return inicio, fin
+
+
+class IndiceEventos:
+    def __init__(self, ruta=RUTA_EVENTOS):
+        self.ruta = ruta
+        self.firma = None
+        # (inicios, fines, eventos, duracion_maxima) en una sola tupla: una recarga la reemplaza
+        # con una única asignación y un lector nunca mezcla listas de dos versiones del archivo
+        self.indice = ([], [], [], timedelta(0))
+        self._lock = threading.Lock()
+
+    def _firma_actual(self):
+        estado = os.stat(self.ruta)
+        return estado.st_mtime_ns, estado.st_size
+
+    def _cargar(self, firma):
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+        con_intervalo = []
+        for evento in datos:
+            try:
+                intervalo = _intervalo(evento)
+            except (TypeError, ValueError):
+                intervalo = None
+            if intervalo is None:
+                logger.warning("Evento sin fecha válida ignorado: %s", evento.get("id"))
+                continue
+            con_intervalo.append((intervalo[0], intervalo[1], evento))
+        con_intervalo.sort(key=lambda item: item[0])
+        self.indice = (
+            [item[0] for item in con_intervalo],
+            [item[1] for item in con_intervalo],
+            [item[2] for item in con_intervalo],
+            max((fin - inicio for inicio, fin, _ in con_intervalo), default=timedelta(0)),
+        )
+        self.firma = firma
+        logger.info("Índice de eventos cargado: %d eventos", len(con_intervalo))
+
+    def actualizar(self):
+        """Recarga el archivo si cambió; devuelve la firma (mtime_ns, tamaño) vigente."""
+        firma = self._firma_actual()
+        if firma != self.firma:
+            with self._lock:
+                if firma != self.firma:
+                    self._cargar(firma)
+        return self.firma
+
+    def buscar(self, inicio=None, fin=None):
+        """Eventos que se solapan con [inicio, fin); sin límites devuelve todos."""
+        self.actualizar()
+        # Una sola lectura del índice: una recarga concurrente reemplaza la tupla entera
+        inicios, fines, eventos, duracion_maxima = self.indice
+        desde = 0 if inicio is None else bisect.bisect_left(inicios, inicio - duracion_maxima)
+        hasta = len(eventos) if fin is None else bisect.bisect_left(inicios, fin)
+        resultado = []
+        for i in range(desde, hasta):
+            # Un evento de duración 0 cuenta si empieza dentro del rango
+            if inicio is None or fines[i] > inicio or (fines[i] == inicios[i] and inicios[i] >= inicio):
+                resultado.append(eventos[i])
+        return resultado
+
+    def etag(self, inicio=None, fin=None):
+        """ETag de una consulta: cambia si cambia el archivo o el rango pedido."""
+        firma = self.actualizar()
+        clave = "%s|%s|%s|%s" % (firma[0], firma[1], inicio, fin)
+        return '"%s"' % hashlib.sha1(clave.encode("utf-8")).hexdigest()[:20]
+
+
+indice_eventos = IndiceEventos()
@@ -1,79 +1,200 @@
 # API to serve JSON data for a web dashboard y servir frontend
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, request, g, Response, stream_with_context
 import sys
 import os
 import json
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from db.database import obtener_conexion, guardar_producto
+from db.logger import configurar_logging
+from db.metricas import registro as metricas, ultimo_reporte, reporte_a_prometheus
+from db.cambios import ENTIDADES, version_actual, cambios_desde
+from db.catalogo import LIMITE_PAGINA, listar_catalogo
+from api.activos import responder_activo
+from api.eventos import indice_eventos, parsear_fecha
 from datetime import datetime
+from urllib.parse import urlencode
 
 FRONTEND_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
-app = Flask(__name__, static_folder=FRONTEND_FOLDER, static_url_path="")
+# Sin carpeta estática de Flask: el frontend lo sirve api/activos.py (hash, compresión y 304)
+app = Flask(__name__, static_folder=None)
+# Cada cuánto el stream SSE consulta cambios nuevos y cada cuánto manda un comentario para mantener viva la conexión
+INTERVALO_SSE = 1.0
+LATIDO_SSE = 15
+
+# Latencia y conteo de peticiones por ruta (se agrupa por la regla, no por la URL concreta)
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+
+@app.after_request
+def registrar_medicion(respuesta):
+    inicio = g.pop("inicio_peticion", None)
+    if inicio is not None:
+        ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+        metricas.observar("api_latencia_segundos", time.perf_counter() - inicio, ruta=ruta)
+        metricas.contador("api_peticiones", ruta=ruta, estado=respuesta.status_code)
+        metricas.contador("api_bytes_enviados", respuesta.calculate_content_length() or 0, ruta=ruta)
+    return respuesta
+
+# Métricas en formato Prometheus: las del proceso de la API y los totales de la última ejecución del scraper
+@app.route("/metrics")
+def exponer_metricas():
+    try:
+        texto = metricas.exportar_prometheus() + reporte_a_prometheus(ultimo_reporte())
+    except Exception as e:
+        return Response(f"# error: {e}\n", status=500, mimetype="text/plain")
+    return Response(texto, mimetype="text/plain; version=0.0.4")
+
 # Endpoint to get the list of products with metadata
 @app.route("/data/results.json")
 def obtener_resultados():
     try:
         conn = obtener_conexion()
+        # La versión se lee antes que los datos: un cambio concurrente se vuelve a aplicar, nunca se pierde
+        version = version_actual(conn)
         cur = conn.cursor()
-        cur.execute("SELECT titulo, precio, url_imagen FROM productos ORDER BY id DESC;")
+        cur.execute("SELECT id, titulo, precio, url_imagen FROM productos ORDER BY id DESC;")
         filas = cur.fetchall()
         cur.close()
         conn.close()
         resultados = []
-        for i, fila in enumerate(filas):
+        for fila in filas:
+            # El id es el de la base para que los cambios del feed se puedan aplicar sobre esta lista
             resultados.append({
-                "id": i + 1,
-                "titulo": fila[0],
-                "descripcion": f"Precio: {fila[1]}",
-                "url_imagen": fila[2]
+                "id": fila[0],
+                "titulo": fila[1],
+                "descripcion": f"Precio: {fila[2]}",
+                "url_imagen": fila[3]
             })
-        return jsonify(resultados)
+        respuesta = jsonify(resultados)
+        respuesta.headers["X-Version-Cambios"] = str(version)
+        return respuesta
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Endpoint para eventos (lee el archivo events.json)
+# Endpoint para eventos (índice en memoria de events.json; acepta start/end de FullCalendar)
 @app.route("/data/events.json")
 def obtener_eventos():
     try:
-        events_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'events.json'))
-        with open(events_path, 'r', encoding='utf-8') as f:
-            eventos = json.load(f)
-        return jsonify(eventos)
+        try:
+            inicio = parsear_fecha(request.args.get("start"))
+            fin = parsear_fecha(request.args.get("end"))
+        except ValueError:
+            return jsonify({"error": "start/end deben ser fechas ISO 8601"}), 400
+        etag = indice_eventos.etag(inicio, fin)
+        if etag in [e.strip() for e in request.headers.get("If-None-Match", "").split(",")]:
+            return Response(status=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        respuesta = jsonify(indice_eventos.buscar(inicio, fin))
+        respuesta.headers["ETag"] = etag
+        respuesta.headers["Cache-Control"] = "no-cache"
+        return respuesta
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 # Endpoint to get the list of downloaded files with metadata
+# Catálogo paginado: ?tipo=PDF|image/*, ?origen=estatico|dinamico, ?desde/?hasta (fecha ISO), ?buscar=,
+# ?limite= y ?despues=<cursor>. El cuerpo sigue siendo una lista; total y cursor van en cabeceras.
 @app.route("/data/files.json")
 def obtener_archivos():
     try:
+        try:
+            desde = parsear_fecha(request.args.get("desde"))
+            hasta = parsear_fecha(request.args.get("hasta"))
+        except ValueError:
+            return jsonify({"error": "desde/hasta deben ser fechas ISO 8601"}), 400
         conn = obtener_conexion()
-        cur = conn.cursor()
-        cur.execute("SELECT nombre_archivo, url FROM archivos_descargados ORDER BY id DESC;")
-        filas = cur.fetchall()
-        cur.close()
-        conn.close()
-        archivos = []
-        for i, fila in enumerate(filas):
-            nombre_archivo = fila[0]
-            ext = nombre_archivo.split('.')[-1].upper()
-            archivos.append({
-                "id": i + 1,
-                "nombre_archivo": nombre_archivo,
-                "tipo": ext,
-                "url": fila[1]
-            })
-        return jsonify(archivos)
+        try:
+            version = version_actual(conn)
+            archivos, siguiente, total = listar_catalogo(
+                conn,
+                tipo=request.args.get("tipo"),
+                origen=request.args.get("origen"),
+                desde=desde,
+                hasta=hasta,
+                buscar=request.args.get("buscar"),
+                despues=request.args.get("despues", type=int),
+                limite=request.args.get("limite", LIMITE_PAGINA, type=int)
+            )
+        finally:
+            conn.close()
+        respuesta = jsonify(archivos)
+        respuesta.headers["X-Version-Cambios"] = str(version)
+        respuesta.headers["X-Total-Archivos"] = str(total)
+        if siguiente is not None:
+            respuesta.headers["X-Siguiente"] = str(siguiente)
+            parametros = request.args.to_dict()
+            parametros["despues"] = siguiente
+            respuesta.headers["Link"] = '<%s?%s>; rel="next"' % (request.path, urlencode(parametros))
+        return respuesta
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+def _leer_filtros_cambios():
+    """Versión de partida (Last-Event-ID al reconectar, si no ?desde=) y entidades (?entidad=producto,archivo)."""
+    # EventSource reconecta con la misma URL: ?desde= es la versión de la carga inicial y
+    # Last-Event-ID la del último cambio recibido, que es la que vale
+    desde = request.headers.get("Last-Event-ID", type=int)
+    if desde is None:
+        desde = request.args.get("desde", 0, type=int)
+    entidades = [e for e in request.args.get("entidad", "").split(",") if e in ENTIDADES] or None
+    return desde, entidades
+
+# Cambios desde una versión: el dashboard los aplica en lugar de volver a pedir results.json/files.json
+@app.route("/data/cambios")
+def obtener_cambios():
+    try:
+        desde, entidades = _leer_filtros_cambios()
+        limite = max(1, min(request.args.get("limite", 1000, type=int), 5000))
+        conn = obtener_conexion()
+        try:
+            cambios, hay_mas = cambios_desde(conn, desde, entidades, limite)
+            version = cambios[-1]["version"] if cambios else max(desde, version_actual(conn))
+        finally:
+            conn.close()
+        return jsonify({"version": version, "cambios": cambios, "hay_mas": hay_mas})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Los mismos cambios como Server-Sent Events (una conexión abierta, sin sondeo desde el navegador)
+@app.route("/data/cambios/stream")
+def stream_cambios():
+    desde, entidades = _leer_filtros_cambios()
+
+    def generar(version):
+        conn = obtener_conexion()
+        conn.autocommit = True  # Cada consulta ve lo último confirmado
+        ultimo_envio = time.monotonic()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                cambios, hay_mas = cambios_desde(conn, version, entidades)
+                for cambio in cambios:
+                    version = cambio["version"]
+                    yield "id: %d\nevent: cambio\ndata: %s\n\n" % (version, json.dumps(cambio, ensure_ascii=False, default=str))
+                if cambios:
+                    ultimo_envio = time.monotonic()
+                elif time.monotonic() - ultimo_envio >= LATIDO_SSE:
+                    yield ": latido\n\n"
+                    ultimo_envio = time.monotonic()
+                if not hay_mas:
+                    time.sleep(INTERVALO_SSE)
+        finally:
+            conn.close()
+
+    return Response(stream_with_context(generar(desde)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # Endpoint to check if the server is running
 
 # Servir index.html y archivos estáticos del frontend
 @app.route("/")
 def root():
-    return send_from_directory(app.static_folder, "index.html")
+    return responder_activo("index.html", FRONTEND_FOLDER)
 
 @app.route("/<path:filename>")
 def serve_static(filename):
-    return send_from_directory(app.static_folder, filename)
+    return responder_activo(filename, FRONTEND_FOLDER)
 
 if __name__ == "__main__":
+    configurar_logging()
     app.run(port=5500, debug=True)
\ No newline at end of file
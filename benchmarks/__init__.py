@@ -0,0 +1 @@
+# Permite que la carpeta benchmarks sea un paquete Python
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Mide el descubrimiento de enlaces sobre una página renderizada grande (varios MB)
+# Compara el esquema anterior (BeautifulSoup con html.parser y cuatro recorridos del árbol)
+# con scraper/enlaces.py (una sola pasada sin construir el árbol).
+# La memoria se mide con ru_maxrss en un proceso hijo por método, para que no se mezclen.
+# Uso: python -m benchmarks.bench_enlaces [--tarjetas 20000] [--repeticiones 5] [--salida resultado.json]
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(RAIZ)
+
+URL_BASE = "http://localhost:5500/"
+EXTENSIONES = [".pdf", ".jpg", ".png", ".docx", ".zip", ".xlsx"]
+
+
+def generar_pagina(tarjetas):
+    """HTML sintético parecido a una página renderizada: mucho marcado y pocos enlaces a archivos."""
+    partes = ["<html><head><title>Documentos</title></head><body><div id='app'>"]
+    for i in range(tarjetas):
+        partes.append(
+            "<div class='card card-%d'><h3 class='titulo'>Documento %d</h3>"
+            "<p class='descripcion'>Texto descriptivo del documento número %d con algo de relleno.</p>"
+            "<a href='/detalle/%d'>Ver detalle</a>" % (i % 7, i, i, i)
+        )
+        if i % 10 == 0:
+            partes.append("<a href='archivos/doc_%d.pdf'>PDF</a>" % i)
+        if i % 25 == 0:
+            partes.append("<button data-download='/archivos/anexo_%d.docx'>Descargar</button>" % i)
+        if i % 40 == 0:
+            partes.append("<span data-file='archivos/tabla_%d.xlsx' data-url='#'></span>" % i)
+        partes.append("</div>")
+    partes.append("</div></body></html>")
+    return "".join(partes)
+
+
+def metodo_anterior(html):
+    """Lo que hacía raspar_sitio_dinamico antes: árbol completo y cuatro find_all."""
+    from urllib.parse import urljoin
+    from bs4 import BeautifulSoup
+
+    archivos = {}
+    sopa = BeautifulSoup(html, "html.parser")
+    for enlace in sopa.find_all("a", href=True):
+        href = enlace["href"]
+        if any(href.lower().endswith(ext) for ext in EXTENSIONES):
+            url_completa = urljoin(URL_BASE, href)
+            archivos[os.path.basename(href)] = url_completa
+    for attr in ['data-file', 'data-url', 'data-download']:
+        for elemento in sopa.find_all(attrs={attr: True}):
+            url_archivo = elemento.get(attr)
+            if url_archivo and any(url_archivo.lower().endswith(ext) for ext in EXTENSIONES):
+                archivos[os.path.basename(url_archivo)] = urljoin(URL_BASE, url_archivo)
+    return archivos
+
+
+def metodo_nuevo(html):
+    from scraper.enlaces import extraer_enlaces_archivos
+    return extraer_enlaces_archivos(html, URL_BASE, EXTENSIONES)
+
+
+METODOS = {"bs4_html_parser": metodo_anterior, "una_pasada": metodo_nuevo}
+
+
+def medir(metodo, tarjetas, repeticiones):
+    """Se ejecuta en el proceso hijo: tiempos y pico de memoria de un solo método."""
+    html = generar_pagina(tarjetas)
+    funcion = METODOS[metodo]
+    # ru_maxrss antes de parsear para descontar el intérprete y el propio HTML
+    base_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    archivos = funcion(html)
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(html)
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        "archivos": len(archivos),
+        "mb_html": round(len(html.encode("utf-8")) / 1e6, 2),
+        "ms_mediana": round(statistics.median(tiempos) * 1000, 2),
+        "memoria_extra_mb": round((pico_kb - base_kb) / 1024, 2),
+    }
+
+
+def medir_en_subproceso(metodo, tarjetas, repeticiones):
+    comando = [sys.executable, "-m", "benchmarks.bench_enlaces", "--hijo", metodo,
+               "--tarjetas", str(tarjetas), "--repeticiones", str(repeticiones)]
+    proceso = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        return {"error": proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else "falló"}
+    return json.loads(proceso.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del descubrimiento de enlaces")
+    parser.add_argument("--tarjetas", type=int, default=20000, help="Tarjetas en la página sintética")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", help="Ruta del JSON de resultados (por defecto stdout)")
+    parser.add_argument("--hijo", choices=sorted(METODOS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.hijo:
+        print(json.dumps(medir(args.hijo, args.tarjetas, args.repeticiones)))
+        return
+
+    resultados = {metodo: medir_en_subproceso(metodo, args.tarjetas, args.repeticiones) for metodo in METODOS}
+    anterior, nuevo = resultados["bs4_html_parser"], resultados["una_pasada"]
+    if "ms_mediana" in anterior and "ms_mediana" in nuevo:
+        resultados["aceleracion"] = round(anterior["ms_mediana"] / nuevo["ms_mediana"], 2)
+    salida = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Mide el costo por registro del logging en el hilo que scrapea
+# Compara el esquema anterior (FileHandler síncrono) con la cola de db/logger.py,
+# y el formateo con f-strings frente al estilo % en mensajes DEBUG desactivados.
+# Uso: python -m benchmarks.bench_logging [--registros 20000] [--salida resultado.json]
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db.logger import FiltroContexto, HandlerCola
+
+
+def _medir(log, registros):
+    nombre_archivo = "documento_de_prueba.pdf"
+    inicio = time.perf_counter()
+    for i in range(registros):
+        log.info("[NUEVO][HTML] %s descargado (%d)", nombre_archivo, i)
+    return (time.perf_counter() - inicio) / registros * 1e6
+
+
+def medir_sincrono(ruta, registros):
+    log = logging.getLogger("bench.sincrono")
+    log.propagate = False
+    handler = logging.FileHandler(ruta, encoding="utf-8")
+    handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    try:
+        return _medir(log, registros)
+    finally:
+        handler.close()
+
+
+def medir_cola(ruta, registros):
+    log = logging.getLogger("bench.cola")
+    log.propagate = False
+    handler = logging.FileHandler(ruta, encoding="utf-8")
+    handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] [%(run_id)s/%(etapa)s] %(message)s'))
+    cola = queue.SimpleQueue()
+    handler_cola = HandlerCola(cola)
+    handler_cola.addFilter(FiltroContexto())
+    log.addHandler(handler_cola)
+    log.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(cola, handler)
+    listener.start()
+    try:
+        return _medir(log, registros)
+    finally:
+        listener.stop()
+        handler.close()
+
+
+def medir_debug_desactivado(registros):
+    log = logging.getLogger("bench.debug")
+    log.setLevel(logging.INFO)
+    datos = {"titulo": "Celular 5G", "precio": "₡ 799.900"}
+    inicio = time.perf_counter()
+    for _ in range(registros):
+        log.debug(f"Producto extraído: {datos}")
+    con_fstring = (time.perf_counter() - inicio) / registros * 1e6
+    inicio = time.perf_counter()
+    for _ in range(registros):
+        log.debug("Producto extraído: %s", datos)
+    con_porcentaje = (time.perf_counter() - inicio) / registros * 1e6
+    return con_fstring, con_porcentaje
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Costo del logging por registro")
+    parser.add_argument("--registros", type=int, default=20000)
+    parser.add_argument("--salida", help="Ruta del JSON de resultados (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        sincrono = medir_sincrono(os.path.join(carpeta, "sincrono.log"), args.registros)
+        cola = medir_cola(os.path.join(carpeta, "cola.log"), args.registros)
+    con_fstring, con_porcentaje = medir_debug_desactivado(args.registros)
+
+    salida = json.dumps({
+        "benchmark": "logging",
+        "registros": args.registros,
+        "resultados": {
+            "info_filehandler_sincrono_us": round(sincrono, 3),
+            "info_queuehandler_us": round(cola, 3),
+            "debug_desactivado_fstring_us": round(con_fstring, 3),
+            "debug_desactivado_porcentaje_us": round(con_porcentaje, 3),
+        },
+    }, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+# Suite de benchmarks sin red: fixtures guardadas, servidor HTTP local y PostgreSQL desechable
+# Uso:
+#   python -m benchmarks.ejecutar --salida bench_output.json
+#   python -m benchmarks.ejecutar --comparar bench_anterior.json
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(RAIZ)
+
+from benchmarks import postgres_local
+from benchmarks.servidor_local import CARPETA_FIXTURES, servidor_local
+
+LISTADOS = {
+    "magento": os.path.join(CARPETA_FIXTURES, "magento_listado.html"),
+    "algolia": os.path.join(CARPETA_FIXTURES, "algolia_listado.html"),
+}
+
+
+def _leer(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def bench_extraccion(repeticiones):
+    """Productos por segundo de extraer_productos_de_html sobre cada listado guardado."""
+    from scraper.productos import extraer_productos_de_html
+
+    resultados = {}
+    for nombre, ruta in LISTADOS.items():
+        html = _leer(ruta)
+        productos = extraer_productos_de_html(html)
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            extraer_productos_de_html(html)
+            tiempos.append(time.perf_counter() - inicio)
+        mediana = statistics.median(tiempos)
+        resultados[nombre] = {
+            "productos_por_pagina": len(productos),
+            "ms_por_pagina": round(mediana * 1000, 3),
+            "productos_por_segundo": round(len(productos) / mediana, 1),
+        }
+    return resultados
+
+
+def bench_sitio_estatico(repeticiones):
+    """Archivos por segundo de scrapear_sitio_estatico contra el servidor local."""
+    from scraper import http_cliente, static_scraper
+    from benchmarks.servidor_local import cargar_manifiesto
+
+    # El servidor local no necesita cortesía: se mide el scraper, no el límite por host
+    http_cliente.configurar_cliente(tasa_por_host=10000, rafaga=10000)
+
+    total_archivos = len(cargar_manifiesto())
+    with servidor_local() as base_url, tempfile.TemporaryDirectory() as descargas:
+        static_scraper.BASE_URL = base_url
+        static_scraper.CARPETA_DESCARGAS = descargas
+        # La primera pasada descarga todo; las siguientes solo verifican hashes
+        inicio = time.perf_counter()
+        static_scraper.scrapear_sitio_estatico()
+        primera = time.perf_counter() - inicio
+        siguientes = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            static_scraper.scrapear_sitio_estatico()
+            siguientes.append(time.perf_counter() - inicio)
+        descargados = len(os.listdir(descargas))
+    sin_cambios = statistics.median(siguientes)
+    return {
+        "archivos": descargados,
+        "archivos_esperados": total_archivos,
+        "primera_pasada_s": round(primera, 4),
+        "archivos_por_segundo_primera": round(descargados / primera, 2),
+        "pasada_sin_cambios_s": round(sin_cambios, 4),
+        "archivos_por_segundo_sin_cambios": round(descargados / sin_cambios, 2),
+    }
+
+
+def bench_descargas_reanudables(fraccion_corte=0.5):
+    """Bytes servidos cuando cada archivo se corta a mitad de la descarga y se reanuda con Range."""
+    import hashlib
+    from scraper import http_cliente
+    from scraper.descargas import descargar_archivo
+    from benchmarks.servidor_local import ManejadorSitio, cargar_manifiesto, contenido_archivo
+
+    manifiesto = cargar_manifiesto()
+    http_cliente.configurar_cliente(tasa_por_host=10000, rafaga=10000)
+    with servidor_local() as base_url, tempfile.TemporaryDirectory() as descargas:
+        ManejadorSitio.cortes = {nombre: int(tamano * fraccion_corte) for nombre, tamano in manifiesto.items()}
+        inicio = time.perf_counter()
+        correctos = 0
+        for nombre, tamano in manifiesto.items():
+            descarga = descargar_archivo(base_url + "archivos/" + nombre, os.path.join(descargas, nombre))
+            correctos += descarga["sha256"] == hashlib.sha256(contenido_archivo(nombre, tamano)).hexdigest()
+        duracion = time.perf_counter() - inicio
+        servidos = ManejadorSitio.bytes_enviados
+    total = sum(manifiesto.values())
+    # Sin reanudación cada corte obliga a repetir el archivo desde el byte 0
+    sin_reanudar = total + sum(int(tamano * fraccion_corte) for tamano in manifiesto.values())
+    if correctos != len(manifiesto):
+        raise AssertionError("%d de %d archivos con hash incorrecto" % (len(manifiesto) - correctos, len(manifiesto)))
+    # Reanudar solo puede repetir lo que estaba en tránsito al cortarse la conexión
+    if servidos - total > (sin_reanudar - total) * 0.1:
+        raise AssertionError("La reanudación repite %d bytes; empezar de cero repetiría %d"
+                             % (servidos - total, sin_reanudar - total))
+    return {
+        "archivos": len(manifiesto),
+        "hash_correcto": correctos,
+        "bytes_archivos": total,
+        "bytes_servidos": servidos,
+        "bytes_servidos_sin_reanudar": sin_reanudar,
+        "desperdicio_pct": round((servidos - total) / total * 100, 2),
+        "duracion_s": round(duracion, 4),
+    }
+
+
+def bench_pipeline(paginas=30, navegacion=0.02, extraccion=0.015, guardado=0.01):
+    """
+    Tiempo de un recorrido con etapas simuladas (sleep), en serie y con scraper/pipeline.py.
+    Con el pipeline el total debería acercarse al de la etapa más lenta (la navegación).
+    """
+    from scraper.pipeline import Pipeline
+
+    def extraer(pagina):
+        time.sleep(extraccion)
+        return [pagina]
+
+    def guardar(lote):
+        time.sleep(guardado)
+
+    inicio = time.perf_counter()
+    for pagina in range(paginas):
+        time.sleep(navegacion)
+        extraer(pagina)
+        guardar([pagina])
+    serie = time.perf_counter() - inicio
+
+    pipeline = Pipeline("bench").etapa("extraccion", extraer).escritor("guardado", guardar, tamano_lote=10)
+    inicio = time.perf_counter()
+    with pipeline:
+        for pagina in range(paginas):
+            time.sleep(navegacion)
+            pipeline.poner(pagina)
+    en_pipeline = time.perf_counter() - inicio
+    return {
+        "paginas": paginas,
+        "serie_s": round(serie, 4),
+        "pipeline_s": round(en_pipeline, 4),
+        "etapa_mas_lenta_s": round(paginas * max(navegacion, extraccion, guardado), 4),
+        "aceleracion": round(serie / en_pipeline, 2),
+    }
+
+
+def bench_cola(tareas_por_corrida=40, duracion_tarea=0.02, trabajadores=(1, 2, 4)):
+    """
+    Rendimiento de la cola crawl_tasks con 1, 2 y 4 trabajadores (hilos, cada uno con su
+    conexión) ejecutando tareas simuladas (sleep). Verifica además que ninguna se ejecute dos veces.
+    """
+    from db import tareas
+    from db.database import obtener_conexion
+    from scraper.trabajador import Trabajador
+
+    resultados = {}
+    for cantidad in trabajadores:
+        ejecutadas = []
+        conn = obtener_conexion()
+        for i in range(tareas_por_corrida):
+            tareas.encolar(conn, "bench", "bench:%d:%d" % (cantidad, i), {"n": i})
+        conn.close()
+
+        def simular(trabajador, carga):
+            time.sleep(duracion_tarea)
+            ejecutadas.append(carga["n"])
+
+        instancias = [Trabajador(tipos=["bench"], manejadores={"bench": simular}) for _ in range(cantidad)]
+        hilos = [threading.Thread(target=t.ejecutar, kwargs={"salir_si_vacia": True}) for t in instancias]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+        resultados["trabajadores_%d" % cantidad] = {
+            "duracion_s": round(duracion, 4),
+            "tareas_por_segundo": round(tareas_por_corrida / duracion, 1),
+            "duplicadas": len(ejecutadas) - len(set(ejecutadas)),
+        }
+    return resultados
+
+
+def bench_historial_precios(productos=300, dias=90, repeticiones=5):
+    """
+    "Precio en el tiempo" de un producto sobre `dias` de historial sintético: reparsear un JSON
+    con todo el historial contra db/analitica.py (particiones por día y solo las columnas pedidas).
+    """
+    from datetime import timedelta
+    from db.analitica import escribir_filas, precio_en_el_tiempo
+
+    inicio_historial = datetime(2025, 1, 1, 10)
+    filas = []
+    for dia in range(dias):
+        fecha = inicio_historial + timedelta(days=dia)
+        for i in range(productos):
+            precio = 100000 + i * 1000 + dia * 10
+            filas.append({
+                "id": len(filas) + 1, "fecha_captura": fecha, "run_id": fecha.strftime("%Y%m%dT%H%M%S") + "-bench",
+                "categoria": "celulares", "titulo": "Producto %d" % i,
+                "url": "https://example.invalid/producto-%d" % i, "url_imagen": "https://example.invalid/%d.jpg" % i,
+                "precio": float(precio), "moneda": "CRC", "precio_texto": "₡ {:,}".format(precio).replace(",", "."),
+            })
+    objetivo = "https://example.invalid/producto-%d" % (productos // 2)
+    desde = (inicio_historial + timedelta(days=dias - 30)).date().isoformat()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_json = os.path.join(carpeta, "historial.json")
+        with open(ruta_json, "w", encoding="utf-8") as f:
+            json.dump([dict(fila, fecha_captura=fila["fecha_captura"].isoformat()) for fila in filas], f,
+                      indent=2, ensure_ascii=False)
+        carpeta_parquet = os.path.join(carpeta, "parquet")
+        escribir_filas(filas, carpeta_parquet)
+        bytes_parquet = sum(os.path.getsize(os.path.join(raiz, nombre))
+                            for raiz, _, nombres in os.walk(carpeta_parquet) for nombre in nombres)
+
+        tiempos_json, tiempos_parquet = [], []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            with open(ruta_json, "r", encoding="utf-8") as f:
+                serie_json = [fila for fila in json.load(f) if fila["url"] == objetivo and fila["fecha_captura"] >= desde]
+            tiempos_json.append(time.perf_counter() - inicio)
+            inicio = time.perf_counter()
+            serie_parquet = precio_en_el_tiempo(url=objetivo, desde=desde, carpeta=carpeta_parquet)
+            tiempos_parquet.append(time.perf_counter() - inicio)
+        if len(serie_json) != len(serie_parquet):
+            raise AssertionError("JSON y Parquet devuelven historiales distintos")
+        return {
+            "filas": len(filas),
+            "bytes_json": os.path.getsize(ruta_json),
+            "bytes_parquet": bytes_parquet,
+            "json_s": round(statistics.median(tiempos_json), 4),
+            "parquet_s": round(statistics.median(tiempos_parquet), 4),
+            "puntos": len(serie_parquet),
+        }
+
+
+def _sembrar_productos(cantidad):
+    from db.database import obtener_conexion, guardar_producto
+
+    # Crea la tabla con el mismo esquema que usa el scraper
+    guardar_producto("semilla", "₡ 0", "")
+    conn = obtener_conexion()
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT INTO productos (titulo, precio, url_imagen) VALUES (%s, %s, %s);",
+        [("Producto %d" % i, "₡ %d.900" % (i % 900), "https://example.invalid/%d.jpg" % i)
+         for i in range(cantidad - 1)]
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def bench_exportacion(cantidad, repeticiones):
+    """Tiempo de exportar_productos_a_json con `cantidad` productos en la base."""
+    from db.exportar import exportar_productos_a_json
+
+    _sembrar_productos(cantidad)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "results.json")
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            exportar_productos_a_json(ruta)
+            tiempos.append(time.perf_counter() - inicio)
+        tamano = os.path.getsize(ruta)
+    mediana = statistics.median(tiempos)
+    return {
+        "productos": cantidad,
+        "exportacion_s": round(mediana, 4),
+        "productos_por_segundo": round(cantidad / mediana, 1),
+        "bytes_json": tamano,
+    }
+
+
+def bench_api(peticiones, con_base):
+    """Latencia de los endpoints de la API servida en un hilo local."""
+    from werkzeug.serving import make_server
+    from api.json_api_server import app
+
+    rutas = ["/data/events.json", "/metrics", "/"]
+    if con_base:
+        rutas += ["/data/results.json", "/data/files.json"]
+
+    servidor = make_server("127.0.0.1", 0, app, threaded=True)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    base_url = "http://127.0.0.1:%d" % servidor.server_port
+    resultados = {}
+    try:
+        for ruta in rutas:
+            tiempos = []
+            bytes_respuesta = 0
+            for _ in range(peticiones):
+                inicio = time.perf_counter()
+                with urllib.request.urlopen(base_url + ruta) as respuesta:
+                    bytes_respuesta = len(respuesta.read())
+                tiempos.append(time.perf_counter() - inicio)
+            resultados[ruta] = {
+                "p50_ms": round(_percentil(tiempos, 50) * 1000, 3),
+                "p95_ms": round(_percentil(tiempos, 95) * 1000, 3),
+                "bytes": bytes_respuesta,
+            }
+    finally:
+        servidor.shutdown()
+    return resultados
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _ejecutar(nombre, funcion, resultados, omitidos):
+    try:
+        resultados[nombre] = funcion()
+    except ImportError as e:
+        omitidos[nombre] = "dependencia no instalada: %s" % e
+    except Exception as e:
+        omitidos[nombre] = "%s: %s" % (type(e).__name__, e)
+
+
+def ejecutar_suite(repeticiones=20, productos=5000, peticiones=50):
+    resultados, omitidos = {}, {}
+    _ejecutar("extraccion_productos", lambda: bench_extraccion(repeticiones), resultados, omitidos)
+    _ejecutar("descargas_reanudables", bench_descargas_reanudables, resultados, omitidos)
+    _ejecutar("pipeline", bench_pipeline, resultados, omitidos)
+    _ejecutar("historial_precios", bench_historial_precios, resultados, omitidos)
+
+    hay_base, motivo = postgres_local.disponible()
+    if hay_base:
+        try:
+            with postgres_local.postgres_temporal():
+                _ejecutar("sitio_estatico", lambda: bench_sitio_estatico(max(3, repeticiones // 5)),
+                          resultados, omitidos)
+                _ejecutar("exportacion_json", lambda: bench_exportacion(productos, max(3, repeticiones // 5)),
+                          resultados, omitidos)
+                _ejecutar("api", lambda: bench_api(peticiones, True), resultados, omitidos)
+                _ejecutar("cola_tareas", bench_cola, resultados, omitidos)
+        except Exception as e:
+            motivo = "no se pudo iniciar PostgreSQL: %s" % e
+            hay_base = False
+    if not hay_base:
+        for nombre in ("sitio_estatico", "exportacion_json", "cola_tareas"):
+            omitidos[nombre] = motivo
+        _ejecutar("api", lambda: bench_api(peticiones, False), resultados, omitidos)
+
+    return {
+        "commit": _commit_actual(),
+        "fecha": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+        "omitidos": omitidos,
+    }
+
+
+def _aplanar(datos, prefijo=""):
+    planos = {}
+    for clave, valor in datos.items():
+        nombre = prefijo + clave
+        if isinstance(valor, dict):
+            planos.update(_aplanar(valor, nombre + "."))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            planos[nombre] = valor
+    return planos
+
+
+def comparar(anterior, actual):
+    """Cambio relativo de cada métrica numérica respecto a un resultado anterior."""
+    base = _aplanar(anterior.get("resultados", {}))
+    nuevo = _aplanar(actual.get("resultados", {}))
+    return {
+        clave: {"anterior": base[clave], "actual": nuevo[clave],
+                "cambio_pct": round((nuevo[clave] - base[clave]) / base[clave] * 100, 2) if base[clave] else None}
+        for clave in sorted(base.keys() & nuevo.keys())
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks sin red del scraper")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--productos", type=int, default=5000, help="Productos sembrados para la exportación")
+    parser.add_argument("--peticiones", type=int, default=50, help="Peticiones por endpoint de la API")
+    parser.add_argument("--salida", help="Ruta del JSON de resultados (por defecto stdout)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para calcular la diferencia")
+    args = parser.parse_args(argv)
+
+    # Los benchmarks no deben medir la escritura del log por cada archivo o producto
+    logging.getLogger("scraper").setLevel(logging.WARNING)
+
+    reporte = ejecutar_suite(args.repeticiones, args.productos, args.peticiones)
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            reporte["comparacion"] = comparar(json.load(f), reporte)
+
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
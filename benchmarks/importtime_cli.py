@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Mide el tiempo de arranque de cada subcomando de cli.py con `python -X importtime`
+# Uso: python -m benchmarks.importtime_cli [--repeticiones 5] [--salida resultado.json]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Código que importa exactamente lo que necesita cada caso (sin ejecutar el subcomando)
+CASOS = {
+    "legacy:import main": "import main",
+    "cli export": "import cli; cli.cargar('export')",
+    "cli serve": "import cli; cli.cargar('serve')",
+    "cli sync-files": "import cli; cli.cargar('sync-files')",
+    "cli scrape": "import cli; cli.cargar('scrape')",
+}
+
+
+def medir_caso(codigo):
+    """Ejecuta el código en un intérprete nuevo y devuelve (segundos, µs de importación, error)."""
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True
+    )
+    duracion = time.perf_counter() - inicio
+    # Formato: "import time: self [us] | cumulative | imported package"
+    # Los módulos de primer nivel no llevan sangría en la columna del nombre
+    total_us = 0
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "imported package" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        if not nombre[1:].startswith(" "):
+            total_us += int(acumulado)
+    error = None
+    if proceso.returncode != 0:
+        error = proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else "error"
+    return duracion, total_us, error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de arranque por subcomando")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", help="Ruta del JSON de resultados (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for nombre, codigo in CASOS.items():
+        mediciones = [medir_caso(codigo) for _ in range(args.repeticiones)]
+        errores = [error for _, _, error in mediciones if error]
+        resultados[nombre] = {
+            "wall_s_min": round(min(m[0] for m in mediciones), 4),
+            "import_us_min": min(m[1] for m in mediciones),
+            "error": errores[0] if errores else None,
+        }
+
+    salida = json.dumps({"benchmark": "importtime_cli", "resultados": resultados}, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(salida)
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Base PostgreSQL desechable para los benchmarks
+# 1. Si BENCH_DB_CREDENCIALES apunta a un archivo con el formato de db_credentials.txt, se usa esa base.
+# 2. Si no, y hay initdb/pg_ctl en el PATH, se crea un clúster temporal que se borra al terminar.
+# 3. Si no hay ninguna de las dos, los benchmarks que necesitan base de datos se omiten.
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def disponible():
+    """Indica si se puede obtener una base para los benchmarks (y por qué no, si no se puede)."""
+    if os.getenv("BENCH_DB_CREDENCIALES"):
+        return True, None
+    if shutil.which("initdb") and shutil.which("pg_ctl"):
+        return True, None
+    return False, "sin BENCH_DB_CREDENCIALES ni initdb/pg_ctl en el PATH"
+
+
+@contextmanager
+def postgres_temporal():
+    """
+    Deja DB_CREDENCIALES apuntando a una base vacía mientras dura el bloque.
+    :return: Ruta del archivo de credenciales en uso.
+    """
+    anterior = os.environ.get("DB_CREDENCIALES")
+    externo = os.getenv("BENCH_DB_CREDENCIALES")
+    if externo:
+        os.environ["DB_CREDENCIALES"] = externo
+        try:
+            yield externo
+        finally:
+            _restaurar(anterior)
+        return
+
+    carpeta = tempfile.mkdtemp(prefix="bench_pg_")
+    datos = os.path.join(carpeta, "datos")
+    puerto = _puerto_libre()
+    try:
+        subprocess.run(["initdb", "-D", datos, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+                       check=True, capture_output=True)
+        subprocess.run(["pg_ctl", "-D", datos, "-w", "-l", os.path.join(carpeta, "postgres.log"),
+                        "-o", "-p %d -k %s -c listen_addresses=''" % (puerto, carpeta), "start"],
+                       check=True, capture_output=True)
+        subprocess.run(["createdb", "-h", carpeta, "-p", str(puerto), "-U", "postgres", "bench"],
+                       check=True, capture_output=True)
+        ruta = os.path.join(carpeta, "db_credentials.txt")
+        with open(ruta, "w") as f:
+            # Mismo formato que db_credentials.txt; el host es la carpeta del socket Unix
+            f.write("\n".join(["bench", "postgres", "", carpeta, str(puerto)]) + "\n")
+        os.environ["DB_CREDENCIALES"] = ruta
+        yield ruta
+    finally:
+        _restaurar(anterior)
+        subprocess.run(["pg_ctl", "-D", datos, "-m", "immediate", "stop"], capture_output=True)
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def _restaurar(anterior):
+    if anterior is None:
+        os.environ.pop("DB_CREDENCIALES", None)
+    else:
+        os.environ["DB_CREDENCIALES"] = anterior
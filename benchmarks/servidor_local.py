@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Servidor HTTP local que reemplaza a BASE_URL ("http://localhost:5500/") en los benchmarks
+# Sirve benchmarks/fixtures/sitio_estatico: index.html, data/files.json y los archivos
+# descargables, cuyo contenido se genera de forma determinista a partir de archivos.json.
+# Los archivos admiten Range/If-Range (con ETag y Last-Modified) y se puede simular un corte de
+# conexión a mitad de un archivo con ManejadorSitio.cortes = {nombre: bytes_antes_del_corte}.
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from email.utils import formatdate
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+CARPETA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CARPETA_SITIO = os.path.join(CARPETA_FIXTURES, "sitio_estatico")
+
+
+def cargar_manifiesto():
+    """Devuelve {nombre_archivo: tamaño} de los archivos descargables del sitio de prueba."""
+    with open(os.path.join(CARPETA_SITIO, "archivos.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def contenido_archivo(nombre, tamano):
+    """Bytes deterministas para un archivo del manifiesto (mismo nombre, mismo contenido)."""
+    bloque = hashlib.sha256(nombre.encode("utf-8")).digest()
+    return (bloque * (tamano // len(bloque) + 1))[:tamano]
+
+
+FECHA_ARCHIVOS = formatdate(1700000000, usegmt=True)
+_RE_RANGO = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class ManejadorSitio(SimpleHTTPRequestHandler):
+    manifiesto = {}
+    cortes = {}
+    bytes_enviados = 0
+    _lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=CARPETA_SITIO, **kwargs)
+
+    def log_message(self, formato, *args):
+        # Sin salida por petición: ensuciaría las mediciones
+        pass
+
+    def _responder(self, cuerpo, tipo):
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _contar(self, cantidad):
+        with ManejadorSitio._lock:
+            ManejadorSitio.bytes_enviados += cantidad
+
+    def _responder_archivo(self, nombre):
+        contenido = contenido_archivo(nombre, self.manifiesto[nombre])
+        etag = '"%s"' % hashlib.sha256(contenido).hexdigest()[:16]
+        inicio, fin, estado = 0, len(contenido) - 1, 200
+        rango = _RE_RANGO.match(self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        # If-Range: el rango solo se respeta si el validador sigue vigente; si no, archivo completo
+        if rango and (if_range is None or if_range in (etag, FECHA_ARCHIVOS)):
+            inicio = int(rango.group(1))
+            if rango.group(2):
+                fin = min(fin, int(rango.group(2)))
+            if inicio >= len(contenido):
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */%d" % len(contenido))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            estado = 206
+        cuerpo = contenido[inicio:fin + 1]
+
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", FECHA_ARCHIVOS)
+        if estado == 206:
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (inicio, fin, len(contenido)))
+        self.end_headers()
+
+        with ManejadorSitio._lock:
+            corte = ManejadorSitio.cortes.pop(nombre, None)
+        if corte is not None and corte < len(cuerpo):
+            # Se anuncia el tamaño completo pero se cierra la conexión antes de terminar
+            self.wfile.write(cuerpo[:corte])
+            self._contar(corte)
+            self.close_connection = True
+            return
+        self.wfile.write(cuerpo)
+        self._contar(len(cuerpo))
+
+    def do_GET(self):
+        ruta = self.path.split("?", 1)[0]
+        if ruta == "/data/files.json":
+            base_url = "http://%s:%d/" % self.server.server_address[:2]
+            with open(os.path.join(CARPETA_SITIO, "data", "files.json"), "r", encoding="utf-8") as f:
+                cuerpo = f.read().replace("{{BASE_URL}}", base_url).encode("utf-8")
+            return self._responder(cuerpo, "application/json")
+        if ruta.startswith("/archivos/"):
+            nombre = ruta[len("/archivos/"):]
+            if nombre not in self.manifiesto:
+                return self.send_error(404)
+            return self._responder_archivo(nombre)
+        return super().do_GET()
+
+
+@contextmanager
+def servidor_local():
+    """Levanta el sitio de prueba en un puerto libre y devuelve su URL base (con / final)."""
+    ManejadorSitio.manifiesto = cargar_manifiesto()
+    ManejadorSitio.cortes = {}
+    ManejadorSitio.bytes_enviados = 0
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), ManejadorSitio)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield "http://127.0.0.1:%d/" % servidor.server_address[1]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# Punto de entrada único del proyecto
+# Cada subcomando importa solo lo que necesita: exportar o servir no cargan Selenium ni el LLM
+import argparse
+import sys
+
+from db.logger import configurar_logging, nuevo_run_id
+
+
+def _con_reporte(funcion):
+    """Ejecuta la función con un run_id nuevo y guarda el reporte de métricas al terminar."""
+    from db.metricas import registro as metricas
+
+    nuevo_run_id()
+    metricas.reiniciar()
+    try:
+        funcion()
+    finally:
+        metricas.guardar_reporte()
+
+
+def _cargar_scrape():
+    from main import ScraperTiendaMonge
+
+    def ejecutar(args):
+        scraper = ScraperTiendaMonge()
+        if args.solo_web:
+            _con_reporte(scraper.scrapear_sitio_web)
+        else:
+            # La ejecución completa genera su propio run_id y reporte de métricas
+            scraper.ejecutar_scraping_completo()
+    return ejecutar
+
+
+def _cargar_sync_files():
+    from scraper.static_scraper import scrapear_sitio_estatico
+
+    def ejecutar(args):
+        def sincronizar():
+            scrapear_sitio_estatico()
+            if args.dinamico:
+                from scraper.scraper_dynamic import raspar_sitio_dinamico
+                raspar_sitio_dinamico()
+        _con_reporte(sincronizar)
+    return ejecutar
+
+
+def _cargar_reprocess():
+    from scraper.reprocesar import reprocesar_snapshots, resumir
+
+    def ejecutar(args):
+        def reprocesar():
+            resultados = reprocesar_snapshots(
+                desde=args.desde, hasta=args.hasta, url=args.url,
+                tipos=[args.tipo] if args.tipo else None, procesos=args.procesos
+            )
+            if args.guardar:
+                from db.database import guardar_productos
+                # Un contenido capturado varias veces se guarda una sola vez, con la fecha, el
+                # run_id y la categoría de su primera captura
+                guardados = set()
+                for resultado in resultados:
+                    entrada = resultado["entrada"]
+                    if entrada["sha256"] in guardados:
+                        continue
+                    guardados.add(entrada["sha256"])
+                    guardar_productos(resultado["productos"], categoria=entrada.get("categoria"),
+                                      run_id=entrada["run_id"] if entrada["run_id"] != "-" else None,
+                                      fecha_captura=entrada["fecha"])
+            if args.salida:
+                import json
+                with open(args.salida, "w", encoding="utf-8") as f:
+                    json.dump(resultados, f, indent=2, ensure_ascii=False)
+            print("Reprocesado:", resumir(resultados))
+        _con_reporte(reprocesar)
+    return ejecutar
+
+
+def _cargar_export():
+    from db.analitica import exportar_productos_a_parquet
+    from db.exportar import exportar_productos_a_json, exportar_archivos_a_json
+
+    def ejecutar(args):
+        def exportar():
+            exportar_productos_a_json(args.productos)
+            exportar_archivos_a_json(args.archivos)
+            if not args.sin_parquet:
+                exportar_productos_a_parquet(args.parquet)
+        _con_reporte(exportar)
+    return ejecutar
+
+
+def _cargar_serve():
+    def ejecutar(args):
+        if args.solo_frontend:
+            from serve_frontend import app
+        else:
+            from api.json_api_server import app
+        app.run(port=args.puerto, debug=args.debug)
+    return ejecutar
+
+
+def _cargar_schedule():
+    from scheduler import iniciar_programador
+
+    def ejecutar(args):
+        iniciar_programador()
+    return ejecutar
+
+
+def _cargar_worker():
+    from scraper.trabajador import iniciar_trabajadores
+
+    def ejecutar(args):
+        # Cada proceso genera su propio run_id y reporte de métricas
+        iniciar_trabajadores(procesos=args.procesos, tipos=args.tipos, max_tareas=args.max_tareas,
+                             salir_si_vacia=args.salir_si_vacia)
+    return ejecutar
+
+
+def _cargar_enqueue():
+    from scraper.trabajador import encolar_recorrido
+
+    def ejecutar(args):
+        print("Estado de la cola:", encolar_recorrido(completo=args.completo, dinamico=args.dinamico))
+    return ejecutar
+
+
+def _cargar_price_history():
+    from db.analitica import precio_en_el_tiempo
+
+    def ejecutar(args):
+        filtro = {"url": args.producto} if args.url else {"titulo": args.producto}
+        for fila in precio_en_el_tiempo(desde=args.desde, hasta=args.hasta, carpeta=args.parquet, **filtro):
+            print(fila["fecha_captura"].isoformat(), fila["precio"], fila["moneda"] or "", fila["run_id"] or "", sep="\t")
+    return ejecutar
+
+
+CARGADORES = {
+    "scrape": _cargar_scrape,
+    "sync-files": _cargar_sync_files,
+    "reprocess": _cargar_reprocess,
+    "export": _cargar_export,
+    "serve": _cargar_serve,
+    "schedule": _cargar_schedule,
+    "worker": _cargar_worker,
+    "enqueue": _cargar_enqueue,
+    "price-history": _cargar_price_history,
+}
+
+
+def cargar(comando):
+    """Importa los módulos del subcomando y devuelve la función que lo ejecuta."""
+    return CARGADORES[comando]()
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Scraping Tienda Monge")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    scrape = subparsers.add_parser("scrape", help="Scraping completo (web + estático + LLM)")
+    scrape.add_argument("--solo-web", action="store_true", help="Solo el scraping de productos con Selenium")
+
+    sync = subparsers.add_parser("sync-files", help="Sincroniza los archivos descargables")
+    sync.add_argument("--dinamico", action="store_true", help="Incluye el raspado dinámico con Selenium")
+
+    reprocess = subparsers.add_parser("reprocess", help="Re-extrae productos y archivos de los snapshots archivados")
+    reprocess.add_argument("--desde", help="Fecha ISO mínima de captura (p. ej. 2025-07-01)")
+    reprocess.add_argument("--hasta", help="Fecha ISO máxima de captura")
+    reprocess.add_argument("--url", help="Solo snapshots cuya URL empiece por este prefijo")
+    reprocess.add_argument("--tipo", choices=["listado", "archivos", "spa"])
+    reprocess.add_argument("--procesos", type=int, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    reprocess.add_argument("--guardar", action="store_true", help="Guarda los productos re-extraídos en la base")
+    reprocess.add_argument("--salida", help="Escribe los resultados en este JSON")
+
+    export = subparsers.add_parser("export", help="Genera results.json y files.json desde la base de datos")
+    export.add_argument("--productos", default="data/results.json")
+    export.add_argument("--archivos", default="data/files.json")
+    export.add_argument("--parquet", default="data/parquet/productos", help="Carpeta del historial Parquet")
+    export.add_argument("--sin-parquet", action="store_true", help="No agrega las filas nuevas al historial Parquet")
+
+    precio = subparsers.add_parser("price-history", help="Precio en el tiempo de un producto (lee el historial Parquet)")
+    precio.add_argument("producto", help="Título exacto del producto, o su URL con --url")
+    precio.add_argument("--url", action="store_true", help="Buscar por URL en lugar de título")
+    precio.add_argument("--desde", help="Fecha ISO mínima (p. ej. 2025-07-01)")
+    precio.add_argument("--hasta", help="Fecha ISO máxima")
+    precio.add_argument("--parquet", default="data/parquet/productos")
+
+    serve = subparsers.add_parser("serve", help="Levanta la API y el frontend")
+    serve.add_argument("--solo-frontend", action="store_true", help="Sirve solo el frontend estático")
+    serve.add_argument("--puerto", type=int, default=5500)
+    serve.add_argument("--debug", action="store_true")
+
+    subparsers.add_parser("schedule", help="Inicia el programador de tareas (solo encola)")
+
+    worker = subparsers.add_parser("worker", help="Ejecuta tareas de la cola crawl_tasks")
+    worker.add_argument("--procesos", type=int, default=1, help="Trabajadores en paralelo en esta máquina")
+    worker.add_argument("--tipos", nargs="+", choices=["pagina_categoria", "descubrir_archivos", "archivo", "exportar"],
+                        help="Solo estos tipos de tarea (p. ej. archivo en un nodo sin Chrome)")
+    worker.add_argument("--max-tareas", type=int, help="Termina después de esta cantidad de tareas")
+    worker.add_argument("--salir-si-vacia", action="store_true", help="Termina cuando no quedan tareas disponibles")
+
+    enqueue = subparsers.add_parser("enqueue", help="Encola un recorrido en crawl_tasks")
+    enqueue.add_argument("--completo", action="store_true", help="Incluye los archivos del sitio estático")
+    enqueue.add_argument("--dinamico", action="store_true", help="Incluye los archivos del sitio dinámico")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    configurar_logging()
+    cargar(args.comando)(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
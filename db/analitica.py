@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# Exportación columnar de productos para análisis (Parquet)
+# Cada exportación agrega solo las filas nuevas de `productos` en archivos Parquet particionados
+# por día de captura. "Nuevas" se mide por la transacción que insertó cada fila (columna txid),
+# no por el id: ver _filas_nuevas.
+#   data/parquet/productos/fecha=2025-07-01/productos-<primer id>.parquet
+#   data/parquet/productos/fecha=sin-fecha/...  <- filas guardadas antes de existir fecha_captura
+#   data/parquet/productos/_estado.json      <- {"ultimo_id": ..., "txid": ...}
+# Los textos repetidos (run_id, categoría, título, URL) van con codificación de diccionario y el
+# precio como número, así "precio en el tiempo" lee unas pocas columnas de las particiones del
+# rango pedido en lugar de volver a parsear todo el historial en JSON.
+import json
+import os
+import re
+from datetime import datetime
+
+from db.logger import logger
+from db.metricas import registro as metricas
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.parquet
+except ImportError:  # pyarrow es opcional; sin él no se exporta Parquet
+    pyarrow = None
+
+CARPETA_PARQUET = "data/parquet/productos"
+ARCHIVO_ESTADO = "_estado.json"
+# Filas por archivo dentro de una partición; un día normal cabe en uno solo
+FILAS_POR_ARCHIVO = 100000
+FILAS_POR_LECTURA = 5000
+# Partición de las filas anteriores a fecha_captura (sin fecha conocida)
+SIN_FECHA = "sin-fecha"
+COLUMNAS_DICCIONARIO = ["run_id", "categoria", "titulo", "url", "moneda"]
+MONEDAS = {"₡": "CRC", "$": "USD"}
+
+_RE_NUMERO = re.compile(r"\d[\d.,]*")
+_aviso_sin_pyarrow = False
+
+
+def _requerir_pyarrow(funcion):
+    if pyarrow is None:
+        raise ImportError("%s requiere pyarrow (pip install pyarrow)" % funcion)
+
+
+def esquema():
+    return pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("fecha_captura", pyarrow.timestamp("s")),
+        ("run_id", pyarrow.string()),
+        ("categoria", pyarrow.string()),
+        ("titulo", pyarrow.string()),
+        ("url", pyarrow.string()),
+        ("url_imagen", pyarrow.string()),
+        ("precio", pyarrow.float64()),
+        ("moneda", pyarrow.string()),
+        ("precio_texto", pyarrow.string()),
+    ])
+
+
+def precio_numerico(texto):
+    """
+    Convierte un precio como lo muestra el sitio ("₡ 138.900", "$1,299.99") en número.
+    El último separador es decimal solo si le siguen uno o dos dígitos; si no, es de miles.
+    :return: (precio, moneda) o (None, None) si el texto no tiene número.
+    """
+    if not texto:
+        return None, None
+    moneda = next((codigo for simbolo, codigo in MONEDAS.items() if simbolo in texto), None)
+    numero = _RE_NUMERO.search(texto)
+    if numero is None:
+        return None, moneda
+    numero = numero.group(0).rstrip(".,")
+    posicion = max(numero.rfind("."), numero.rfind(","))
+    if posicion != -1 and len(numero) - posicion - 1 in (1, 2):
+        entero, decimales = numero[:posicion], numero[posicion + 1:]
+    else:
+        entero, decimales = numero, ""
+    entero = entero.replace(".", "").replace(",", "")
+    return float(entero + "." + decimales if decimales else entero), moneda
+
+
+def _ruta_estado(carpeta):
+    return os.path.join(carpeta, ARCHIVO_ESTADO)
+
+
+def leer_estado(carpeta=CARPETA_PARQUET):
+    try:
+        with open(_ruta_estado(carpeta), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"ultimo_id": 0, "txid": 0}
+
+
+def _guardar_estado(carpeta, estado):
+    temporal = _ruta_estado(carpeta) + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    os.replace(temporal, _ruta_estado(carpeta))
+
+
+def _escribir_archivo(carpeta, fecha, filas):
+    """Escribe un archivo de la partición `fecha`; el nombre sale del primer id, así reintentar lo sobrescribe."""
+    particion = os.path.join(carpeta, "fecha=" + fecha)
+    os.makedirs(particion, exist_ok=True)
+    ruta = os.path.join(particion, "productos-%d.parquet" % filas[0]["id"])
+    tabla = pyarrow.Table.from_pylist(filas, schema=esquema())
+    # El temporal empieza con "." para que las lecturas lo ignoren hasta que esté completo
+    temporal = os.path.join(particion, "." + os.path.basename(ruta) + ".tmp")
+    pyarrow.parquet.write_table(tabla, temporal, compression="zstd", use_dictionary=COLUMNAS_DICCIONARIO)
+    os.replace(temporal, ruta)
+    metricas.contador("parquet_archivos_escritos")
+    metricas.contador("parquet_bytes_escritos", os.path.getsize(ruta))
+
+
+def escribir_filas(filas, carpeta=CARPETA_PARQUET):
+    """
+    Agrega filas (dicts con las columnas de esquema(), ordenadas por id) a las particiones
+    por día de `fecha_captura`. No lee ni reescribe archivos existentes.
+    :return: Cantidad de filas escritas.
+    """
+    _requerir_pyarrow("escribir_filas")
+    pendientes = {}
+    escritas = 0
+    for fila in filas:
+        fecha = fila["fecha_captura"].date().isoformat() if fila["fecha_captura"] else SIN_FECHA
+        lote = pendientes.setdefault(fecha, [])
+        lote.append(fila)
+        if len(lote) >= FILAS_POR_ARCHIVO:
+            _escribir_archivo(carpeta, fecha, lote)
+            escritas += len(lote)
+            pendientes[fecha] = []
+    for fecha, lote in pendientes.items():
+        if lote:
+            _escribir_archivo(carpeta, fecha, lote)
+            escritas += len(lote)
+    return escritas
+
+
+def _frontera_txid(cur):
+    """
+    Transacción más antigua todavía abierta: toda transacción anterior ya terminó, así que sus
+    filas ya no pueden aparecer más tarde (los id y fecha_captura se asignan antes del commit y
+    no sirven de marca: una transacción larga puede confirmar un id menor al último exportado).
+    """
+    cur.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint;")
+    return cur.fetchone()[0]
+
+
+def _filas_nuevas(cur, estado, frontera):
+    # Las filas sin txid son anteriores a la columna (todas confirmadas): para ellas sirve el id
+    cur.execute("""
+        SELECT id, fecha_captura, run_id, categoria, titulo, url, url_imagen, precio
+        FROM productos
+        WHERE (txid IS NULL AND id > %s) OR (txid >= %s AND txid < %s)
+        ORDER BY id;
+    """, (estado.get("ultimo_id", 0), estado.get("txid", 0), frontera))
+    while True:
+        bloque = cur.fetchmany(FILAS_POR_LECTURA)
+        if not bloque:
+            return
+        for id_producto, fecha, run_id, categoria, titulo, url, url_imagen, precio in bloque:
+            valor, moneda = precio_numerico(precio)
+            yield {
+                "id": id_producto, "fecha_captura": fecha, "run_id": run_id, "categoria": categoria,
+                "titulo": titulo, "url": url, "url_imagen": url_imagen,
+                "precio": valor, "moneda": moneda, "precio_texto": precio,
+            }
+
+
+def pyarrow_disponible():
+    global _aviso_sin_pyarrow
+    if pyarrow is None and not _aviso_sin_pyarrow:
+        logger.warning("pyarrow no está instalado; se omite la exportación Parquet")
+        _aviso_sin_pyarrow = True
+    return pyarrow is not None
+
+
+@metricas.medido("exportacion_parquet")
+def exportar_productos_a_parquet(carpeta=CARPETA_PARQUET):
+    """
+    Agrega a `carpeta` los productos guardados desde la última exportación.
+    :return: Cantidad de filas exportadas (0 si no hay nuevas o falta pyarrow).
+    """
+    if not pyarrow_disponible():
+        return 0
+    conn = None
+    try:
+        from db.database import asegurar_tabla_productos, obtener_conexion
+
+        os.makedirs(carpeta, exist_ok=True)
+        estado = leer_estado(carpeta)
+        conn = obtener_conexion()
+        asegurar_tabla_productos()
+        cur = conn.cursor()
+        frontera = _frontera_txid(cur)
+        cur.close()
+        # Cursor con nombre: el historial se lee por bloques en el servidor, no entero en memoria
+        cur = conn.cursor(name="exportacion_parquet")
+        ultimo = {"id": estado.get("ultimo_id", 0)}
+
+        def recorrer():
+            for fila in _filas_nuevas(cur, estado, frontera):
+                ultimo["id"] = max(ultimo["id"], fila["id"])
+                yield fila
+
+        escritas = escribir_filas(recorrer(), carpeta)
+        cur.close()
+        # El estado se actualiza después de escribir: si algo falla antes, la próxima
+        # exportación repite las mismas filas y sobrescribe los mismos archivos
+        _guardar_estado(carpeta, {"ultimo_id": ultimo["id"], "txid": frontera, "fecha": datetime.now().isoformat()})
+        logger.info("Parquet: %d productos nuevos exportados a %s", escritas, carpeta)
+        metricas.contador("parquet_filas_exportadas", escritas)
+        return escritas
+    except Exception:
+        logger.exception("Error al exportar productos a Parquet")
+        return 0
+    finally:
+        if conn:
+            conn.close()
+
+
+def precio_en_el_tiempo(titulo=None, url=None, desde=None, hasta=None, carpeta=CARPETA_PARQUET):
+    """
+    Historial de precio de un producto, identificado por `url` o por `titulo` exacto.
+    Solo abre las particiones entre `desde` y `hasta` (fechas ISO, inclusivas) y solo lee las
+    columnas del resultado; las estadísticas por grupo de filas descartan el resto.
+    :return: Lista de dicts {fecha_captura, run_id, precio, moneda, titulo, url} ordenada por fecha.
+    """
+    _requerir_pyarrow("precio_en_el_tiempo")
+    if not titulo and not url:
+        raise ValueError("Indicar el título o la URL del producto")
+    if not os.path.isdir(carpeta):
+        return []  # Todavía no se exportó nada
+    campo = pyarrow.dataset.field
+    particiones = pyarrow.dataset.partitioning(pyarrow.schema([("fecha", pyarrow.string())]), flavor="hive")
+    # _estado.json y los temporales (".") quedan fuera por su prefijo
+    datos = pyarrow.dataset.dataset(carpeta, format="parquet", partitioning=particiones)
+    if not datos.files:
+        return []
+    filtro = campo("url") == url if url else campo("titulo") == titulo
+    if desde or hasta:
+        # Las filas sin fecha de captura no pertenecen a ningún rango
+        filtro &= campo("fecha") != SIN_FECHA
+    if desde:
+        filtro &= campo("fecha") >= desde
+    if hasta:
+        filtro &= campo("fecha") <= hasta
+    tabla = datos.to_table(columns=["fecha_captura", "run_id", "precio", "moneda", "titulo", "url"], filter=filtro)
+    return tabla.sort_by("fecha_captura").to_pylist()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Registro de cambios (change feed) para que el dashboard aplique deltas en lugar de recargar todo
+# Cada escritura de la ingesta agrega una fila a `cambios` en la MISMA transacción que el dato:
+#   version (creciente) | entidad ('producto' / 'archivo') | clave | operacion | datos (JSON)
+# El frontend pide "cambios desde la versión N" (o los recibe por SSE) y los aplica sobre su estado.
+import json
+
+from db.logger import logger
+
+ENTIDADES = ("producto", "archivo")
+OPERACIONES = ("insert", "update", "delete")
+LIMITE_POR_CONSULTA = 1000
+# Candado de transacción: las versiones se asignan en el mismo orden en que se hacen visibles,
+# así un lector que ya vio la versión N nunca se salta una N-1 que se confirmó después
+LLAVE_CANDADO = 7301
+
+_tabla_lista = False
+
+
+def asegurar_tabla_cambios():
+    """Crea la tabla e índice si no existen (una vez por proceso; la DDL se confirma aparte)."""
+    global _tabla_lista
+    if _tabla_lista:
+        return
+    from db.database import crear_esquema
+
+    crear_esquema("""
+        CREATE TABLE IF NOT EXISTS cambios (
+            version BIGSERIAL PRIMARY KEY,
+            entidad TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            operacion TEXT NOT NULL,
+            datos JSONB,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """, "CREATE INDEX IF NOT EXISTS idx_cambios_entidad_version ON cambios (entidad, version);")
+    _tabla_lista = True
+
+
+def _tabla_disponible(cur):
+    """Lecturas: no crean la tabla; si todavía no existe es que no hay cambios."""
+    global _tabla_lista
+    if not _tabla_lista:
+        from db.database import tabla_existe
+
+        # Una tabla visible desde otra conexión ya está confirmada, se puede recordar
+        _tabla_lista = tabla_existe(cur, "cambios")
+    return _tabla_lista
+
+
+def registrar_cambio(cur, entidad, clave, operacion, datos=None):
+    """
+    Agrega un cambio usando el cursor de la escritura que lo origina (sin commit propio).
+    :param datos: El registro tal como lo devuelve la API (None en los delete).
+    """
+    asegurar_tabla_cambios()
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (LLAVE_CANDADO,))
+    cur.execute(
+        "INSERT INTO cambios (entidad, clave, operacion, datos) VALUES (%s, %s, %s, %s);",
+        (entidad, str(clave), operacion, json.dumps(datos, ensure_ascii=False) if datos is not None else None)
+    )
+
+
+def version_actual(conn):
+    """Última versión registrada (0 si todavía no hay cambios)."""
+    cur = conn.cursor()
+    try:
+        if not _tabla_disponible(cur):
+            return 0
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM cambios;")
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+
+
+def cambios_desde(conn, version, entidades=None, limite=LIMITE_POR_CONSULTA):
+    """
+    Cambios con versión mayor a `version`, en orden.
+    :return: (lista de cambios, hay_mas) donde cada cambio es {version, entidad, clave, operacion, datos}.
+    """
+    cur = conn.cursor()
+    try:
+        if not _tabla_disponible(cur):
+            return [], False
+        consulta = "SELECT version, entidad, clave, operacion, datos FROM cambios WHERE version > %s"
+        parametros = [version]
+        if entidades:
+            consulta += " AND entidad = ANY(%s)"
+            parametros.append(list(entidades))
+        consulta += " ORDER BY version LIMIT %s;"
+        parametros.append(limite + 1)
+        cur.execute(consulta, parametros)
+        filas = cur.fetchall()
+    finally:
+        cur.close()
+    hay_mas = len(filas) > limite
+    cambios = [
+        {"version": fila[0], "entidad": fila[1], "clave": fila[2], "operacion": fila[3],
+         # psycopg2 ya convierte JSONB a dict; se acepta texto por si el adaptador no lo hace
+         "datos": json.loads(fila[4]) if isinstance(fila[4], str) else fila[4]}
+        for fila in filas[:limite]
+    ]
+    if hay_mas:
+        logger.debug("cambios_desde(%s): más de %d cambios, se devuelve la primera tanda", version, limite)
+    return cambios, hay_mas
+
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Catálogo único de archivos descargados (scraper estático, dinámico y guardar_archivo)
+# Tamaño, tipo MIME y hash se guardan una sola vez al descargar; el dashboard y la exportación
+# leen de aquí sin hacer stat ni adivinar el tipo en cada petición.
+# Las tablas de cada scraper (downloaded_files, archivos_dinamicos) siguen siendo su estado interno.
+import mimetypes
+import os
+
+from db.cambios import registrar_cambio
+
+LIMITE_PAGINA = 50
+LIMITE_PAGINA_MAXIMO = 500
+COLUMNAS = "id, origen, nombre_archivo, url, sha256, tamano, tipo_mime, extension, metodo, fecha_descarga, ultima_vista"
+
+_tabla_lista = False
+
+
+def asegurar_tabla_catalogo():
+    """Crea la tabla e índices si no existen (una vez por proceso; la DDL se confirma aparte)."""
+    global _tabla_lista
+    if _tabla_lista:
+        return
+    from db.database import crear_esquema
+
+    crear_esquema("""
+        CREATE TABLE IF NOT EXISTS catalogo_archivos (
+            id SERIAL PRIMARY KEY,
+            origen TEXT NOT NULL,
+            nombre_archivo TEXT NOT NULL,
+            url TEXT,
+            sha256 TEXT,
+            tamano BIGINT,
+            tipo_mime TEXT,
+            extension TEXT,
+            metodo TEXT,
+            fecha_descarga TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ultima_vista TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (origen, nombre_archivo)
+        );
+    """,
+        # Paginación por id descendente, con o sin filtro de tipo, y filtros por fecha
+        "CREATE INDEX IF NOT EXISTS idx_catalogo_extension_id ON catalogo_archivos (extension, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_catalogo_fecha ON catalogo_archivos (fecha_descarga DESC);")
+    _tabla_lista = True
+
+
+def tabla_disponible(cur):
+    """Lecturas: no crean la tabla; si todavía no existe el catálogo está vacío."""
+    global _tabla_lista
+    if not _tabla_lista:
+        from db.database import tabla_existe
+
+        # Una tabla visible desde otra conexión ya está confirmada, se puede recordar
+        _tabla_lista = tabla_existe(cur, "catalogo_archivos")
+    return _tabla_lista
+
+
+def tipo_mime(nombre_archivo, content_type=None):
+    """Content-Type de la respuesta si es útil; si no, el que corresponde a la extensión."""
+    if content_type:
+        tipo = content_type.split(";")[0].strip().lower()
+        if tipo and tipo not in ("application/octet-stream", "binary/octet-stream"):
+            return tipo
+    return mimetypes.guess_type(nombre_archivo)[0] or "application/octet-stream"
+
+
+def extension(nombre_archivo):
+    return os.path.splitext(nombre_archivo)[1].lstrip(".").upper()
+
+
+def datos_archivo(fila):
+    """Fila del catálogo (en el orden de COLUMNAS) al formato de la API y del feed de cambios."""
+    return {
+        "id": fila[0],
+        "origen": fila[1],
+        "nombre_archivo": fila[2],
+        "url": fila[3],
+        "sha256": fila[4],
+        "tamano": fila[5],
+        "tipo_mime": fila[6],
+        "tipo": fila[7],
+        "metodo": fila[8],
+        "fecha_descarga": fila[9].isoformat() if fila[9] else None,
+        "ultima_vista": fila[10].isoformat() if fila[10] else None,
+    }
+
+
+def registrar_en_catalogo(cur, origen, nombre_archivo, url, sha256, tamano, content_type=None, metodo=None):
+    """
+    Inserta o actualiza un archivo usando el cursor de la escritura que lo origina (sin commit propio).
+    Solo se registra un cambio en el feed si el archivo es nuevo o cambió su contenido o URL.
+    :return: "insert", "update" o None si no hubo cambios.
+    """
+    asegurar_tabla_catalogo()
+    cur.execute(
+        "SELECT sha256, url FROM catalogo_archivos WHERE origen = %s AND nombre_archivo = %s;",
+        (origen, nombre_archivo)
+    )
+    anterior = cur.fetchone()
+    mime = tipo_mime(nombre_archivo, content_type)
+    if anterior is None:
+        cur.execute(
+            "INSERT INTO catalogo_archivos (origen, nombre_archivo, url, sha256, tamano, tipo_mime, extension, metodo) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING " + COLUMNAS + ";",
+            (origen, nombre_archivo, url, sha256, tamano, mime, extension(nombre_archivo), metodo)
+        )
+        operacion = "insert"
+    elif anterior[0] != sha256 or anterior[1] != url:
+        cur.execute(
+            "UPDATE catalogo_archivos SET url = %s, sha256 = %s, tamano = %s, tipo_mime = %s, metodo = %s, "
+            "fecha_descarga = CURRENT_TIMESTAMP, ultima_vista = CURRENT_TIMESTAMP "
+            "WHERE origen = %s AND nombre_archivo = %s RETURNING " + COLUMNAS + ";",
+            (url, sha256, tamano, mime, metodo, origen, nombre_archivo)
+        )
+        operacion = "update"
+    else:
+        cur.execute(
+            "UPDATE catalogo_archivos SET ultima_vista = CURRENT_TIMESTAMP WHERE origen = %s AND nombre_archivo = %s;",
+            (origen, nombre_archivo)
+        )
+        return None
+    fila = cur.fetchone()
+    registrar_cambio(cur, "archivo", fila[0], operacion, datos_archivo(fila))
+    return operacion
+
+
+def quitar_del_catalogo(cur, origen, nombre_archivo):
+    """Elimina un archivo que ya no está disponible y lo anuncia en el feed de cambios."""
+    asegurar_tabla_catalogo()
+    cur.execute(
+        "DELETE FROM catalogo_archivos WHERE origen = %s AND nombre_archivo = %s RETURNING id;",
+        (origen, nombre_archivo)
+    )
+    fila = cur.fetchone()
+    if fila:
+        registrar_cambio(cur, "archivo", fila[0], "delete")
+
+
+def listar_catalogo(conn, tipo=None, origen=None, desde=None, hasta=None, buscar=None,
+                    despues=None, limite=LIMITE_PAGINA):
+    """
+    Una página del catálogo, del más reciente al más antiguo (paginación por id, sin OFFSET).
+    :param tipo: Extensión (PDF, JPG...) o tipo MIME con comodín ("image/*").
+    :param despues: Último id de la página anterior.
+    :return: (archivos, siguiente, total) donde `siguiente` es el cursor de la próxima página o None.
+    """
+    limite = max(1, min(int(limite), LIMITE_PAGINA_MAXIMO))
+    condiciones, parametros = [], []
+    if tipo:
+        if "/" in tipo:
+            condiciones.append("tipo_mime LIKE %s")
+            parametros.append(tipo.replace("*", "%"))
+        else:
+            condiciones.append("extension = %s")
+            parametros.append(tipo.upper())
+    if origen:
+        condiciones.append("origen = %s")
+        parametros.append(origen)
+    if desde:
+        condiciones.append("fecha_descarga >= %s")
+        parametros.append(desde)
+    if hasta:
+        condiciones.append("fecha_descarga < %s")
+        parametros.append(hasta)
+    if buscar:
+        condiciones.append("nombre_archivo ILIKE %s")
+        parametros.append("%" + buscar + "%")
+    filtro = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+
+    cur = conn.cursor()
+    try:
+        if not tabla_disponible(cur):
+            return [], None, 0
+        cur.execute("SELECT COUNT(*) FROM catalogo_archivos" + filtro + ";", parametros)
+        total = cur.fetchone()[0]
+        pagina = filtro + (" AND " if filtro else " WHERE ") + "id < %s" if despues else filtro
+        cur.execute(
+            "SELECT " + COLUMNAS + " FROM catalogo_archivos" + pagina + " ORDER BY id DESC LIMIT %s;",
+            parametros + ([despues] if despues else []) + [limite + 1]
+        )
+        filas = cur.fetchall()
+    finally:
+        cur.close()
+    archivos = [datos_archivo(fila) for fila in filas[:limite]]
+    siguiente = archivos[-1]["id"] if len(filas) > limite else None
+    return archivos, siguiente, total
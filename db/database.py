@@ -2,16 +2,21 @@
 # -*- coding: utf-8 -*-
 # Importaciones y referencias
 import psycopg2  # Adaptador para PostgreSQL
+from psycopg2.extras import execute_values
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
-from logger import logger
+from db.logger import logger, run_id_actual
+from db.metricas import registro as metricas
+from db.cambios import registrar_cambio
+from db.catalogo import registrar_en_catalogo
 
 # Obtener credenciales desde un archivo de texto (más seguro que hardcodear)
 def obtener_credenciales():
     try:
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        ruta_credenciales = os.path.join(base_dir, "..", "db_credentials.txt")
+        # DB_CREDENCIALES permite apuntar a otra base (p. ej. la temporal de los benchmarks)
+        ruta_credenciales = os.getenv("DB_CREDENCIALES") or os.path.join(base_dir, "..", "db_credentials.txt")
         with open(ruta_credenciales, "r") as f:
             lineas = f.read().splitlines()
             return {
@@ -36,25 +41,77 @@ def obtener_conexion():
         port=credenciales["port"]
     )
 
+# Crear tablas e índices en una conexión propia que se confirma enseguida
+# Así la DDL no depende de la transacción de quien la pide (si esa transacción se deshace o la
+# conexión se cierra sin commit, la tabla igual queda creada) y el indicador "tabla lista" de cada
+# módulo solo se marca cuando la tabla existe de verdad
+def crear_esquema(*sentencias):
+    conn = obtener_conexion()
+    try:
+        cur = conn.cursor()
+        for sentencia in sentencias:
+            cur.execute(sentencia)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+# Para las lecturas: consultar si la tabla existe en lugar de crearla
+def tabla_existe(cursor, tabla):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (tabla,))
+    return cursor.fetchone()[0]
+
+_tabla_productos_lista = False
+
+# Crear la tabla de productos (una vez por proceso; la DDL se confirma aparte, ver crear_esquema)
+# url, categoria, run_id y fecha_captura permiten seguir el precio de un producto entre ejecuciones
+# (exportación Parquet en db/analitica.py). fecha_captura se agrega sin valor por defecto y el
+# defecto se fija después: así las filas anteriores quedan en NULL (fecha desconocida) en lugar de
+# tomar todas la fecha de la migración. txid (la transacción que insertó la fila) marca qué falta
+# exportar a Parquet y sigue el mismo patrón. lote identifica qué guardó cada fila (ver guardar_productos)
+def asegurar_tabla_productos():
+    global _tabla_productos_lista
+    if _tabla_productos_lista:
+        return
+    crear_esquema("""
+        CREATE TABLE IF NOT EXISTS productos (
+            id SERIAL PRIMARY KEY,
+            titulo TEXT,
+            precio TEXT,
+            url_imagen TEXT
+        );
+    """, """
+        ALTER TABLE productos
+            ADD COLUMN IF NOT EXISTS url TEXT,
+            ADD COLUMN IF NOT EXISTS categoria TEXT,
+            ADD COLUMN IF NOT EXISTS run_id TEXT,
+            ADD COLUMN IF NOT EXISTS fecha_captura TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS lote TEXT,
+            ADD COLUMN IF NOT EXISTS txid BIGINT;
+    """, "ALTER TABLE productos ALTER COLUMN fecha_captura SET DEFAULT CURRENT_TIMESTAMP;",
+        "ALTER TABLE productos ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint;",
+        "CREATE INDEX IF NOT EXISTS idx_productos_txid ON productos (txid);",
+        "CREATE INDEX IF NOT EXISTS idx_productos_lote ON productos (lote) WHERE lote IS NOT NULL;")
+    _tabla_productos_lista = True
+
 # Guardar productos extraídos del sitio web
+@metricas.medido("db_guardar_producto")
 def guardar_producto(titulo, precio, url_imagen):
     conn = None
     cursor = None
     try:
         conn = obtener_conexion()
         cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS productos (
-                id SERIAL PRIMARY KEY,
-                titulo TEXT,
-                precio TEXT,
-                url_imagen TEXT
-            );
-        """)
+        asegurar_tabla_productos()
         cursor.execute(
-            "INSERT INTO productos (titulo, precio, url_imagen) VALUES (%s, %s, %s);",
+            "INSERT INTO productos (titulo, precio, url_imagen) VALUES (%s, %s, %s) RETURNING id;",
             (titulo, precio, url_imagen)
         )
+        id_producto = cursor.fetchone()[0]
+        # Mismo formato que /data/results.json
+        registrar_cambio(cursor, "producto", id_producto, "insert", {
+            "id": id_producto, "titulo": titulo, "descripcion": f"Precio: {precio}", "url_imagen": url_imagen
+        })
         conn.commit()
     except Exception as e:
         logger.exception("Error al guardar el producto en la base de datos")
@@ -64,8 +121,57 @@ def guardar_producto(titulo, precio, url_imagen):
         if conn:
             conn.close()
 
+# Guardar varios productos en una sola conexión y transacción (lo usa el escritor por lotes del pipeline)
+# run_id y fecha_captura son los de la ejecución actual salvo que se indiquen (p. ej. al reprocesar
+# un snapshot se conservan los de la captura original). Con `lote` el guardado es idempotente: si
+# ya hay filas de ese lote (un reintento de la misma tarea de la cola) no se vuelve a insertar
+@metricas.medido("db_guardar_productos")
+def guardar_productos(productos, categoria=None, run_id=None, fecha_captura=None, lote=None):
+    if not productos:
+        return 0
+    conn = None
+    cursor = None
+    try:
+        conn = obtener_conexion()
+        cursor = conn.cursor()
+        asegurar_tabla_productos()
+        if lote:
+            # El candado serializa dos intentos simultáneos del mismo lote hasta el commit
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (lote,))
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM productos WHERE lote = %s);", (lote,))
+            if cursor.fetchone()[0]:
+                logger.info("Los productos del lote %s ya estaban guardados", lote)
+                return len(productos)
+        if run_id is None and run_id_actual() != "-":
+            run_id = run_id_actual()
+        filas = [(p["titulo"], p["precio"], p["imagen_url"], p.get("url"), categoria, run_id, fecha_captura, lote)
+                 for p in productos]
+        # Un solo INSERT con todas las filas; los id vuelven en el mismo orden
+        ids = execute_values(
+            cursor,
+            "INSERT INTO productos (titulo, precio, url_imagen, url, categoria, run_id, fecha_captura, lote) "
+            "VALUES %s RETURNING id;",
+            filas, template="(%s, %s, %s, %s, %s, %s, COALESCE(%s::timestamp, CURRENT_TIMESTAMP), %s)",
+            page_size=len(filas), fetch=True
+        )
+        for (id_producto,), (titulo, precio, url_imagen, *_) in zip(ids, filas):
+            registrar_cambio(cursor, "producto", id_producto, "insert", {
+                "id": id_producto, "titulo": titulo, "descripcion": f"Precio: {precio}", "url_imagen": url_imagen
+            })
+        conn.commit()
+        return len(filas)
+    except Exception as e:
+        logger.exception("Error al guardar un lote de %d productos en la base de datos", len(productos))
+        return 0
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 # Guardar metadatos de archivos descargados
-def guardar_archivo(nombre_archivo, url, sha256):
+@metricas.medido("db_guardar_archivo")
+def guardar_archivo(nombre_archivo, url, sha256, tamano=None, content_type=None, origen="manual"):
     conn = None
     cursor = None
     try:
@@ -84,6 +190,7 @@ def guardar_archivo(nombre_archivo, url, sha256):
             "INSERT INTO archivos_descargados (nombre_archivo, url, sha256) VALUES (%s, %s, %s);",
             (nombre_archivo, url, sha256)
         )
+        registrar_en_catalogo(cursor, origen, nombre_archivo, url, sha256, tamano, content_type)
         conn.commit()
     except Exception as e:
         logger.exception("Error al guardar la información del archivo en la base de datos")
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Exportación de productos y archivos a los JSON que consume el dashboard web
+# No depende de Selenium ni del LLM para que exportar sea rápido y no pida credenciales de IA
+import json
+from datetime import datetime
+from db.metricas import registro as metricas
+from db.catalogo import COLUMNAS, datos_archivo, tabla_disponible
+
+# Función para exportar productos a JSON
+@metricas.medido("exportacion_json", archivo="results")
+def exportar_productos_a_json(ruta_salida="data/results.json"):
+    try:
+        from db.database import obtener_conexion
+        conn = obtener_conexion()
+        cur = conn.cursor()
+        cur.execute("SELECT titulo, precio FROM productos ORDER BY id DESC;")
+        filas = cur.fetchall()
+        cur.close()
+        conn.close()
+        resultados = []
+        for i, fila in enumerate(filas):
+            resultados.append({
+                "id": i + 1,
+                "title": fila[0],
+                "category": "Celulares",
+                "description": f"Precio: {fila[1]}",
+                "date": datetime.now().isoformat()
+            })
+        with open(ruta_salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"Archivo '{ruta_salida}' generado correctamente con {len(resultados)} productos.")
+    except Exception as e:
+        print("Error al generar results.json:", e)
+
+# Función para exportar archivos a JSON
+@metricas.medido("exportacion_json", archivo="files")
+def exportar_archivos_a_json(ruta_salida="data/files.json"):
+    try:
+        from db.database import obtener_conexion
+        conn = obtener_conexion()
+        cur = conn.cursor()
+        # Tamaño y tipo vienen del catálogo (se registran al descargar)
+        # Sin catálogo todavía (base nueva) se exporta una lista vacía; leer no crea tablas
+        filas = []
+        if tabla_disponible(cur):
+            cur.execute("SELECT " + COLUMNAS + " FROM catalogo_archivos ORDER BY id DESC;")
+            filas = cur.fetchall()
+        cur.close()
+        conn.close()
+        archivos = [datos_archivo(fila) for fila in filas]
+        with open(ruta_salida, "w", encoding="utf-8") as f:
+            json.dump(archivos, f, indent=2, ensure_ascii=False)
+        print(f"Archivo '{ruta_salida}' generado correctamente con {len(archivos)} archivos.")
+    except Exception as e:
+        print("Error al generar files.json rafa:", e)
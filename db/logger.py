@@ -1,17 +1,165 @@
+import atexit
+import contextvars
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
 log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs')
-os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, 'scraper.log')
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Valores por defecto, ajustables con variables de entorno sin tocar el código
+LOG_FORMATO = os.getenv("LOG_FORMATO", "texto")              # "texto" o "json" (JSON lines)
+LOG_ROTACION = os.getenv("LOG_ROTACION", "tamano")           # "tamano" o "diaria"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 5 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", 10))
 
 logger = logging.getLogger('scraper')
+
+# Identificador de ejecución y etapa actual, se agregan a cada registro
+_run_id = contextvars.ContextVar("run_id", default="-")
+_etapa = contextvars.ContextVar("etapa", default="-")
+
+_listener = None
+
+
+def nuevo_run_id():
+    """Genera un identificador de ejecución y lo fija en el contexto actual."""
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    _run_id.set(run_id)
+    return run_id
+
+
+def run_id_actual():
+    return _run_id.get()
+
+
+@contextmanager
+def etapa(nombre):
+    """Marca los registros emitidos dentro del bloque con la etapa indicada."""
+    token = _etapa.set(nombre)
+    try:
+        yield
+    finally:
+        _etapa.reset(token)
+
+
+class FiltroContexto(logging.Filter):
+    """Copia run_id y etapa al registro en el hilo que lo emite (antes de pasar por la cola)."""
+
+    def filter(self, record):
+        record.run_id = _run_id.get()
+        record.etapa = _etapa.get()
+        return True
+
+
+class FormatoJSON(logging.Formatter):
+    """Un objeto JSON por línea con los campos de contexto."""
+
+    def format(self, record):
+        datos = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "run_id": getattr(record, "run_id", "-"),
+            "etapa": getattr(record, "etapa", "-"),
+            "hilo": record.threadName,
+            "mensaje": record.getMessage(),
+        }
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False)
+
+
+class HandlerCola(logging.handlers.QueueHandler):
+    """QueueHandler para una cola entre hilos: no copia el registro ni descarta la excepción."""
+
+    def prepare(self, record):
+        # Se fija el mensaje ahora por si los argumentos cambian antes de que el listener lo escriba
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _nombre_comprimido(nombre):
+    return nombre + ".gz"
+
+
+def _rotar_comprimiendo(origen, destino):
+    """Comprime el archivo rotado con gzip y elimina el original."""
+    with open(origen, "rb") as f_origen, gzip.open(destino, "wb") as f_destino:
+        shutil.copyfileobj(f_origen, f_destino)
+    os.remove(origen)
+
+
+def _crear_handler_archivo(rotacion, max_bytes, backups):
+    if rotacion == "diaria":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when="midnight", backupCount=backups, encoding="utf-8"
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+    handler.namer = _nombre_comprimido
+    handler.rotator = _rotar_comprimiendo
+    return handler
+
+
+# Los handlers se configuran desde los puntos de entrada (cli.py, main.py, scheduler.py...)
+# para que importar un módulo no abra archivos de log ni toque el logger raíz.
+# Los hilos de scraping solo encolan el registro; un QueueListener escribe a disco y consola.
+def configurar_logging(nivel=logging.INFO, formato=None, rotacion=None, max_bytes=None, backups=None):
+    """Configura el logging no bloqueante (cola + listener) una sola vez por proceso."""
+    global _listener
+    if getattr(logger, "_configurado", False):
+        return logger
+    os.makedirs(log_dir, exist_ok=True)
+
+    formato = formato or LOG_FORMATO
+    if formato == "json":
+        formateador = FormatoJSON()
+    else:
+        formateador = logging.Formatter('%(asctime)s [%(levelname)s] [%(run_id)s/%(etapa)s] %(message)s')
+
+    handler_archivo = _crear_handler_archivo(
+        rotacion or LOG_ROTACION,
+        LOG_MAX_BYTES if max_bytes is None else max_bytes,
+        LOG_BACKUPS if backups is None else backups,
+    )
+    handler_consola = logging.StreamHandler()
+    for handler in (handler_archivo, handler_consola):
+        handler.setFormatter(formateador)
+
+    cola = queue.SimpleQueue()
+    handler_cola = HandlerCola(cola)
+    handler_cola.addFilter(FiltroContexto())
+
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    raiz.addHandler(handler_cola)
+
+    _listener = logging.handlers.QueueListener(
+        cola, handler_archivo, handler_consola, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(detener_logging)
+
+    logger._configurado = True
+    return logger
+
+
+def detener_logging():
+    """Vacía la cola de registros pendientes y cierra los handlers."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# Métricas de ejecución: contadores, valores instantáneos e histogramas con etiquetas
+# Se guardan como reporte JSON por ejecución y se exponen en formato Prometheus en /metrics
+import bisect
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from db.logger import logger, run_id_actual
+
+carpeta_reportes = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs', 'metricas')
+
+PREFIJO = "scraper_"
+# Límites superiores (segundos) de los buckets de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+
+def _etiquetas_prometheus(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    texto = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pares)
+    return "{" + texto + "}"
+
+
+class Histograma:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.cantidad = 0
+        self.suma = 0.0
+        self.minimo = None
+        self.maximo = None
+
+    def observar(self, valor):
+        self.buckets[bisect.bisect_left(BUCKETS, valor)] += 1
+        self.cantidad += 1
+        self.suma += valor
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+    def a_dict(self):
+        return {
+            "cantidad": self.cantidad,
+            "suma": round(self.suma, 6),
+            "promedio": round(self.suma / self.cantidad, 6) if self.cantidad else 0,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets)),
+        }
+
+
+class RegistroMetricas:
+    """Registro en memoria, seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.inicio = time.time()
+            self.contadores = {}
+            self.valores = {}
+            self.histogramas = {}
+
+    def contador(self, nombre, valor=1, **etiquetas):
+        """Suma `valor` al contador (p. ej. productos extraídos o bytes descargados)."""
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def valor(self, nombre, valor, **etiquetas):
+        """Fija un valor instantáneo (p. ej. profundidad de una cola)."""
+        with self._lock:
+            self.valores[_clave(nombre, etiquetas)] = valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        """Registra una observación en el histograma (p. ej. una duración en segundos)."""
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = Histograma()
+            histograma.observar(valor)
+
+    @contextmanager
+    def temporizador(self, etapa, **etiquetas):
+        """Mide la duración del bloque en el histograma etapa_duracion_segundos{etapa=...}."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar("etapa_duracion_segundos", time.perf_counter() - inicio, etapa=etapa, **etiquetas)
+
+    def medido(self, etapa, **etiquetas):
+        """Decorador equivalente a envolver la función completa en temporizador()."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.temporizador(etapa, **etiquetas):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def instantanea(self):
+        """Copia serializable del estado actual, con tasas por segundo de cada contador."""
+        with self._lock:
+            duracion = max(time.time() - self.inicio, 1e-9)
+            contadores = [
+                {"nombre": n, "etiquetas": dict(e), "valor": v,
+                 "por_segundo": round(v / duracion, 3)}
+                for (n, e), v in self.contadores.items()
+            ]
+            valores = [{"nombre": n, "etiquetas": dict(e), "valor": v} for (n, e), v in self.valores.items()]
+            histogramas = [
+                dict(nombre=n, etiquetas=dict(e), **h.a_dict()) for (n, e), h in self.histogramas.items()
+            ]
+        return {
+            "inicio": datetime.fromtimestamp(self.inicio).isoformat(),
+            "duracion_segundos": round(duracion, 3),
+            "contadores": contadores,
+            "valores": valores,
+            "histogramas": histogramas,
+        }
+
+    def exportar_prometheus(self):
+        """Texto en formato de exposición de Prometheus."""
+        lineas = []
+        with self._lock:
+            for (nombre, etiquetas), valor in sorted(self.contadores.items()):
+                lineas.append("%s%s_total%s %s" % (PREFIJO, nombre, _etiquetas_prometheus(etiquetas), valor))
+            for (nombre, etiquetas), valor in sorted(self.valores.items()):
+                lineas.append("%s%s%s %s" % (PREFIJO, nombre, _etiquetas_prometheus(etiquetas), valor))
+            for (nombre, etiquetas), h in sorted(self.histogramas.items()):
+                acumulado = 0
+                for limite, cantidad in zip(list(BUCKETS) + ["+Inf"], h.buckets):
+                    acumulado += cantidad
+                    lineas.append("%s%s_bucket%s %d" % (
+                        PREFIJO, nombre, _etiquetas_prometheus(etiquetas, [("le", limite)]), acumulado))
+                lineas.append("%s%s_sum%s %s" % (PREFIJO, nombre, _etiquetas_prometheus(etiquetas), h.suma))
+                lineas.append("%s%s_count%s %d" % (PREFIJO, nombre, _etiquetas_prometheus(etiquetas), h.cantidad))
+        return "\n".join(lineas) + "\n"
+
+    def guardar_reporte(self, ruta=None):
+        """Escribe el reporte JSON de la ejecución en logs/metricas/<run_id>.json."""
+        if ruta is None:
+            os.makedirs(carpeta_reportes, exist_ok=True)
+            run_id = run_id_actual()
+            if run_id == "-":
+                run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+            ruta = os.path.join(carpeta_reportes, "%s.json" % run_id)
+        reporte = dict(run_id=run_id_actual(), **self.instantanea())
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        logger.info("Reporte de métricas guardado en %s", ruta)
+        return ruta
+
+
+registro = RegistroMetricas()
+
+
+def ultimo_reporte():
+    """Devuelve el reporte JSON más reciente de logs/metricas, o None si no hay ninguno."""
+    reportes = glob.glob(os.path.join(carpeta_reportes, "*.json"))
+    if not reportes:
+        return None
+    with open(max(reportes, key=os.path.getmtime), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def reporte_a_prometheus(reporte):
+    """Expone los totales de la última ejecución como métricas scraper_ultima_ejecucion_*."""
+    if not reporte:
+        return ""
+    prefijo = PREFIJO + "ultima_ejecucion_"
+    lineas = ["%sduracion_segundos %s" % (prefijo, reporte["duracion_segundos"])]
+    for c in reporte["contadores"]:
+        etiquetas = _etiquetas_prometheus(sorted(c["etiquetas"].items()))
+        lineas.append("%s%s_total%s %s" % (prefijo, c["nombre"], etiquetas, c["valor"]))
+        lineas.append("%s%s_por_segundo%s %s" % (prefijo, c["nombre"], etiquetas, c["por_segundo"]))
+    for h in reporte["histogramas"]:
+        etiquetas = _etiquetas_prometheus(sorted(h["etiquetas"].items()))
+        lineas.append("%s%s_sum%s %s" % (prefijo, h["nombre"], etiquetas, h["suma"]))
+        lineas.append("%s%s_count%s %s" % (prefijo, h["nombre"], etiquetas, h["cantidad"]))
+    return "\n".join(lineas) + "\n"
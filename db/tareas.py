@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# Cola de trabajo en PostgreSQL para repartir el scraping entre varios procesos o máquinas
+# El programador solo encola; cada trabajador (scraper/trabajador.py) reclama tareas con
+# SELECT ... FOR UPDATE SKIP LOCKED, así dos trabajadores nunca toman la misma y ninguno espera
+# a otro. Una tarea reclamada queda "arrendada" por unos segundos y el trabajador renueva el
+# arriendo con latidos; si el proceso muere, el arriendo vence y otro trabajador la retoma.
+# La clave de cada tarea es única (p. ej. "pagina:<url>" o "archivo:<sitio>:<url>"): encolar
+# dos veces lo mismo no duplica trabajo. Las tareas se ejecutan al menos una vez.
+# Las tareas de un mismo recorrido llevan su identificador en carga["recorrido"]; con
+# recorrido_terminado el trabajador sabe cuándo terminó la última y puede encolar la exportación.
+import json
+
+from db.logger import logger
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+HECHA = "hecha"
+FALLIDA = "fallida"
+
+ARRIENDO_SEGUNDOS = 120
+MAX_INTENTOS = 5
+# Espera antes de reintentar: 30 s, 60 s, 120 s... hasta 30 minutos
+REINTENTO_BASE = 30
+REINTENTO_MAXIMO = 1800
+
+_tabla_lista = False
+
+
+def asegurar_tabla_tareas():
+    """Crea la tabla e índices si no existen (una vez por proceso; la DDL se confirma aparte)."""
+    global _tabla_lista
+    if _tabla_lista:
+        return
+    from db.database import crear_esquema
+
+    crear_esquema("""
+        CREATE TABLE IF NOT EXISTS crawl_tasks (
+            id BIGSERIAL PRIMARY KEY,
+            clave TEXT NOT NULL UNIQUE,
+            tipo TEXT NOT NULL,
+            carga JSONB NOT NULL DEFAULT '{}',
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            intentos INTEGER NOT NULL DEFAULT 0,
+            max_intentos INTEGER NOT NULL DEFAULT 5,
+            disponible_desde TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            trabajador TEXT,
+            arriendo_hasta TIMESTAMP,
+            ultimo_error TEXT,
+            creada TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            actualizada TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """,
+        # Índices parciales: reclamar solo recorre las pendientes y las arrendadas
+        "CREATE INDEX IF NOT EXISTS idx_crawl_tasks_pendientes ON crawl_tasks (disponible_desde, id) "
+        "WHERE estado = 'pendiente';",
+        "CREATE INDEX IF NOT EXISTS idx_crawl_tasks_arriendos ON crawl_tasks (arriendo_hasta) "
+        "WHERE estado = 'en_curso';",
+        "CREATE INDEX IF NOT EXISTS idx_crawl_tasks_recorrido ON crawl_tasks ((carga->>'recorrido')) "
+        "WHERE estado IN ('pendiente', 'en_curso');")
+    _tabla_lista = True
+
+
+def _con_cursor(conn, funcion):
+    """Ejecuta `funcion(cur)` y confirma; las operaciones de la cola no dependen de otra transacción."""
+    asegurar_tabla_tareas()
+    cur = conn.cursor()
+    try:
+        resultado = funcion(cur)
+        conn.commit()
+        return resultado
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def encolar(conn, tipo, clave, carga=None, max_intentos=MAX_INTENTOS, demora=0):
+    """
+    Agrega una tarea. Si la clave ya existe pendiente o en curso no hace nada; si ya terminó
+    (hecha o fallida) la vuelve a dejar pendiente, para los recorridos periódicos.
+    :param demora: Segundos hasta que la tarea pueda reclamarse.
+    :return: True si la tarea quedó pendiente por esta llamada.
+    """
+    def _encolar(cur):
+        cur.execute("""
+            INSERT INTO crawl_tasks (clave, tipo, carga, max_intentos, disponible_desde)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+            ON CONFLICT (clave) DO UPDATE SET
+                tipo = EXCLUDED.tipo, carga = EXCLUDED.carga, max_intentos = EXCLUDED.max_intentos,
+                estado = 'pendiente', intentos = 0, ultimo_error = NULL, trabajador = NULL,
+                arriendo_hasta = NULL, disponible_desde = EXCLUDED.disponible_desde,
+                actualizada = CURRENT_TIMESTAMP
+            WHERE crawl_tasks.estado IN ('hecha', 'fallida')
+            RETURNING id;
+        """, (clave, tipo, json.dumps(carga or {}, ensure_ascii=False), max_intentos, demora))
+        return cur.fetchone() is not None
+    return _con_cursor(conn, _encolar)
+
+
+def reclamar(conn, trabajador, tipos=None, arriendo=ARRIENDO_SEGUNDOS):
+    """
+    Toma la siguiente tarea disponible (pendiente o con el arriendo vencido) y la arrienda.
+    :return: dict {id, tipo, clave, carga, intentos, max_intentos} o None si no hay trabajo.
+    """
+    def _reclamar(cur):
+        filtro_tipo = " AND tipo = ANY(%s)" if tipos else ""
+        cur.execute("""
+            UPDATE crawl_tasks SET estado = 'en_curso', trabajador = %s, intentos = intentos + 1,
+                arriendo_hasta = CURRENT_TIMESTAMP + %s * INTERVAL '1 second', actualizada = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM crawl_tasks
+                WHERE ((estado = 'pendiente' AND disponible_desde <= CURRENT_TIMESTAMP)
+                       OR (estado = 'en_curso' AND arriendo_hasta < CURRENT_TIMESTAMP))""" + filtro_tipo + """
+                ORDER BY disponible_desde, id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, tipo, clave, carga, intentos, max_intentos;
+        """, [trabajador, arriendo] + ([list(tipos)] if tipos else []))
+        return cur.fetchone()
+
+    while True:
+        fila = _con_cursor(conn, _reclamar)
+        if fila is None:
+            return None
+        tarea = {"id": fila[0], "tipo": fila[1], "clave": fila[2],
+                 # psycopg2 ya convierte JSONB a dict; se acepta texto por si el adaptador no lo hace
+                 "carga": json.loads(fila[3]) if isinstance(fila[3], str) else fila[3],
+                 "intentos": fila[4], "max_intentos": fila[5]}
+        if tarea["intentos"] <= tarea["max_intentos"]:
+            return tarea
+        # Solo llega aquí una tarea cuyo arriendo venció después de agotar sus intentos:
+        # el trabajador murió con ella demasiadas veces
+        logger.error("Tarea %s sin intentos restantes tras arriendos vencidos", tarea["clave"])
+        fallar(conn, tarea["id"], trabajador, "arriendo vencido %d veces" % tarea["max_intentos"])
+
+
+def renovar_arriendo(conn, id_tarea, trabajador, arriendo=ARRIENDO_SEGUNDOS):
+    """Latido: extiende el arriendo. Devuelve False si la tarea ya no es de este trabajador."""
+    def _renovar(cur):
+        cur.execute("""
+            UPDATE crawl_tasks SET arriendo_hasta = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+            WHERE id = %s AND trabajador = %s AND estado = 'en_curso' RETURNING id;
+        """, (arriendo, id_tarea, trabajador))
+        return cur.fetchone() is not None
+    return _con_cursor(conn, _renovar)
+
+
+def completar(conn, id_tarea, trabajador):
+    """Marca la tarea como hecha. Devuelve False si el arriendo se perdió y otro la tomó."""
+    def _completar(cur):
+        cur.execute("""
+            UPDATE crawl_tasks SET estado = 'hecha', arriendo_hasta = NULL, ultimo_error = NULL,
+                actualizada = CURRENT_TIMESTAMP
+            WHERE id = %s AND trabajador = %s AND estado = 'en_curso' RETURNING id;
+        """, (id_tarea, trabajador))
+        return cur.fetchone() is not None
+    return _con_cursor(conn, _completar)
+
+
+def fallar(conn, id_tarea, trabajador, error):
+    """
+    Registra un error: la tarea vuelve a pendiente con espera exponencial, o queda fallida
+    si ya agotó sus intentos.
+    :return: El nuevo estado, o None si la tarea ya no era de este trabajador.
+    """
+    def _fallar(cur):
+        cur.execute("""
+            UPDATE crawl_tasks SET
+                estado = CASE WHEN intentos >= max_intentos THEN 'fallida' ELSE 'pendiente' END,
+                disponible_desde = CURRENT_TIMESTAMP
+                    + LEAST(%s * POWER(2, GREATEST(intentos - 1, 0)), %s) * INTERVAL '1 second',
+                arriendo_hasta = NULL, ultimo_error = %s, actualizada = CURRENT_TIMESTAMP
+            WHERE id = %s AND trabajador = %s AND estado = 'en_curso' RETURNING estado;
+        """, (REINTENTO_BASE, REINTENTO_MAXIMO, str(error)[:2000], id_tarea, trabajador))
+        fila = cur.fetchone()
+        return fila[0] if fila else None
+    return _con_cursor(conn, _fallar)
+
+
+def recorrido_terminado(conn, recorrido, ignorar_tipos=()):
+    """
+    True si no queda ninguna tarea del recorrido pendiente o en curso (sin contar `ignorar_tipos`).
+    Llamarla después de confirmar el fin de la propia tarea: si dos trabajadores terminan las
+    últimas a la vez, al menos el que confirma después ve las dos terminadas.
+    """
+    def _terminado(cur):
+        cur.execute("""
+            SELECT NOT EXISTS (
+                SELECT 1 FROM crawl_tasks
+                WHERE carga->>'recorrido' = %s AND estado IN ('pendiente', 'en_curso')
+                  AND NOT (tipo = ANY(%s::text[]))
+            );
+        """, (recorrido, list(ignorar_tipos)))
+        return cur.fetchone()[0]
+    return _con_cursor(conn, _terminado)
+
+
+def resumen(conn):
+    """Cantidad de tareas por tipo y estado: {tipo: {estado: n}}."""
+    def _resumen(cur):
+        cur.execute("SELECT tipo, estado, COUNT(*) FROM crawl_tasks GROUP BY tipo, estado;")
+        conteo = {}
+        for tipo, estado, cantidad in cur.fetchall():
+            conteo.setdefault(tipo, {})[estado] = cantidad
+        return conteo
+    resultado = _con_cursor(conn, _resumen)
+    logger.debug("Estado de la cola: %s", resultado)
+    return resultado
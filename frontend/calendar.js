@@ -85,7 +85,9 @@ function initCalendar() {
 function loadCalendarEvents(info, successCallback, failureCallback) {
     console.log('Cargando eventos para:', info.startStr, 'a', info.endStr);
     
-    fetch('data/events.json')
+    // Solo los eventos del rango visible; el navegador revalida con ETag (304 si no cambió nada)
+    const parametros = new URLSearchParams({ start: info.startStr, end: info.endStr });
+    fetch(`data/events.json?${parametros}`, { cache: 'no-cache' })
         .then(response => {
             if (!response.ok) {
                 throw new Error('Error en la red al cargar eventos');
@@ -94,17 +96,18 @@ function loadCalendarEvents(info, successCallback, failureCallback) {
         })
         .then(data => {
             // Procesar y formatear los eventos
+            // Compatibilidad con campos en español y en inglés (events.json usa los segundos)
             const eventosFormateados = data.map(evento => ({
                 id: evento.id || generarIdUnico(),
-                title: evento.titulo || 'Evento sin título',
-                start: evento.inicio || new Date(),
-                end: evento.fin || null,
-                allDay: evento.todoElDia || false,
-                color: evento.color || getEventColor(evento.categoria),
+                title: evento.titulo || evento.title || 'Evento sin título',
+                start: evento.inicio || evento.start || new Date(),
+                end: evento.fin || evento.end || null,
+                allDay: evento.todoElDia || evento.allDay || false,
+                color: evento.color || getEventColor(evento.categoria || evento.category || 'general'),
                 extendedProps: {
-                    descripcion: evento.descripcion || 'No hay descripción disponible',
-                    ubicacion: evento.ubicacion || 'Ubicación no especificada',
-                    categoria: evento.categoria || 'general',
+                    descripcion: evento.descripcion || evento.description || 'No hay descripción disponible',
+                    ubicacion: evento.ubicacion || evento.location || 'Ubicación no especificada',
+                    categoria: evento.categoria || evento.category || 'general',
                     participantes: evento.participantes || []
                 }
             }));
@@ -3,36 +3,81 @@
 /**
  * Componente de Archivos JavaScript
  * Este archivo maneja la funcionalidad de la sección de archivos incluyendo:
- * - Carga de metadatos de archivos desde files.json
+ * - Carga paginada (por cursor) y filtrada por tipo del catálogo de archivos (files.json)
  * - Visualización de tarjetas de archivos con iconos apropiados
  * - Manejo de acciones de descarga/visualización
+ * - Aplicación de cambios en vivo (feed de cambios) sin volver a descargar todo
  */
 
+// Estado local de archivos (se actualiza con los cambios del feed)
+// Solo se tienen en memoria las páginas ya pedidas; el catálogo completo queda en el servidor
+const ARCHIVOS_POR_PAGINA = 48;
+let datosArchivos = [];
+let versionArchivos = 0;
+let renderArchivosPendiente = null;
+let cursorArchivos = null;
+let totalArchivos = 0;
+let filtroTipoArchivos = '';
+let suscritoArchivos = false;
+
 /**
  * Inicializa el componente de archivos
  */
 function initFiles() {
-    // Cargar los datos de archivos
+    // Cargar la primera página de archivos
     cargarArchivos();
     
+    // Filtro por tipo: vuelve a pedir desde la primera página
+    const selectorTipo = document.getElementById('files-type');
+    if (selectorTipo) {
+        selectorTipo.addEventListener('change', function() {
+            filtroTipoArchivos = this.value;
+            cargarArchivos();
+        });
+    }
+    
+    // Paginación por cursor: agrega la página siguiente a las ya cargadas
+    const botonMas = document.getElementById('files-more');
+    if (botonMas) {
+        botonMas.addEventListener('click', function(e) {
+            e.preventDefault();
+            cargarArchivos(cursorArchivos);
+        });
+    }
+    
     console.log('Componente de archivos inicializado');
 }
 
 /**
- * Carga archivos desde el archivo JSON
+ * Carga una página del catálogo de archivos
+ * @param {number|null} despues - Cursor de la página anterior (null para empezar de nuevo)
  */
-function cargarArchivos() {
-    // Obtener archivos desde el JSON
-    fetch('data/files.json')
+function cargarArchivos(despues = null) {
+    const parametros = new URLSearchParams({ limite: ARCHIVOS_POR_PAGINA });
+    if (filtroTipoArchivos) parametros.set('tipo', filtroTipoArchivos);
+    if (despues) parametros.set('despues', despues);
+    
+    fetch(`data/files.json?${parametros}`)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Error al cargar archivos');
             }
+            if (!despues) {
+                versionArchivos = parseInt(response.headers.get('X-Version-Cambios') || '0', 10);
+            }
+            totalArchivos = parseInt(response.headers.get('X-Total-Archivos') || '0', 10);
+            cursorArchivos = response.headers.get('X-Siguiente');
             return response.json();
         })
         .then(data => {
-            // Mostrar los archivos
-            mostrarArchivos(data);
+            datosArchivos = despues ? datosArchivos.concat(data) : data;
+            mostrarArchivos(datosArchivos);
+            actualizarControlesArchivos();
+            // Una sola suscripción: los cambios se aplican sobre lo que esté cargado
+            if (!suscritoArchivos) {
+                suscritoArchivos = true;
+                suscribirCambios('archivo', versionArchivos, aplicarCambioArchivo);
+            }
         })
         .catch(error => {
             console.error('Error al cargar archivos:', error);
@@ -52,6 +97,63 @@ function cargarArchivos() {
         });
 }
 
+/**
+ * Muestra el total del catálogo y el botón "Cargar más" si quedan páginas
+ */
+function actualizarControlesArchivos() {
+    const total = document.getElementById('files-total');
+    if (total) {
+        total.textContent = `(${datosArchivos.length} de ${totalArchivos})`;
+    }
+    const botonMas = document.getElementById('files-more');
+    if (botonMas) {
+        botonMas.classList.toggle('d-none', !cursorArchivos);
+    }
+}
+
+/**
+ * Indica si un archivo entra en el filtro de tipo activo (extensión o tipo MIME con comodín)
+ * @param {Object} archivo - Objeto de archivo del catálogo
+ * @returns {boolean}
+ */
+function coincideFiltroArchivos(archivo) {
+    if (!filtroTipoArchivos) return true;
+    if (filtroTipoArchivos.includes('/')) {
+        const prefijo = filtroTipoArchivos.replace('*', '');
+        return (archivo.tipo_mime || '').startsWith(prefijo);
+    }
+    return archivo.tipo === filtroTipoArchivos;
+}
+
+/**
+ * Aplica un cambio del feed (insert/update/delete) sobre los archivos en memoria
+ * @param {Object} cambio - {version, clave, operacion, datos}; la clave es el id del catálogo
+ */
+function aplicarCambioArchivo(cambio) {
+    versionArchivos = cambio.version;
+    const indice = datosArchivos.findIndex(a => String(a.id) === String(cambio.clave));
+    if (cambio.operacion === 'delete') {
+        if (indice >= 0) {
+            datosArchivos.splice(indice, 1);
+            totalArchivos = Math.max(totalArchivos - 1, 0);
+        }
+    } else if (indice >= 0) {
+        datosArchivos[indice] = cambio.datos;
+    } else if (cambio.operacion === 'insert' && coincideFiltroArchivos(cambio.datos)) {
+        // Solo un archivo nuevo suma al total: un update de uno no cargado está en otra página
+        // Los archivos van del más nuevo al más antiguo
+        datosArchivos.unshift(cambio.datos);
+        totalArchivos += 1;
+    }
+    if (!renderArchivosPendiente) {
+        renderArchivosPendiente = setTimeout(() => {
+            renderArchivosPendiente = null;
+            mostrarArchivos(datosArchivos);
+            actualizarControlesArchivos();
+        }, 250);
+    }
+}
+
 /**
  * Muestra los archivos en el contenedor
  * @param {Array} archivos - Array de objetos de archivos
@@ -92,24 +194,24 @@ function mostrarArchivos(archivos) {
         tarjetaArchivo.className = 'col-md-3 col-sm-6 mb-4';
         
         // Obtener extensión del archivo
-        const extension = archivo.filename.split('.').pop().toLowerCase();
+        const extension = archivo.nombre_archivo.split('.').pop().toLowerCase();
         
         // Obtener icono apropiado para el tipo de archivo
         const claseIcono = obtenerIconoArchivo(extension);
         
         // Formatear tamaño del archivo
-        const tamañoFormateado = formatearTamañoArchivo(archivo.size);
+        const tamañoFormateado = formatearTamañoArchivo(archivo.tamano);
         
         // Crear HTML de la tarjeta
         tarjetaArchivo.innerHTML = `
             <div class="card file-card text-center h-100">
                 <div class="card-body">
                     <i class="bi ${claseIcono} file-icon"></i>
-                    <h5 class="file-name">${archivo.filename}</h5>
-                    <p class="file-type">${archivo.type}</p>
+                    <h5 class="file-name">${archivo.nombre_archivo}</h5>
+                    <p class="file-type" title="${archivo.tipo_mime || ''}">${archivo.tipo}</p>
                     <p class="file-size">${tamañoFormateado}</p>
                     <a href="${archivo.url}" class="btn btn-sm btn-outline-primary" 
-                       target="_blank" download="${archivo.filename}">
+                       target="_blank" download="${archivo.nombre_archivo}">
                         Descargar
                     </a>
                     ${esVisualizable(extension) ? 
@@ -139,7 +241,7 @@ function mostrarArchivos(archivos) {
  */
 function manejarClickTarjetaArchivo(archivo) {
     // Obtener extensión del archivo
-    const extension = archivo.filename.split('.').pop().toLowerCase();
+    const extension = archivo.nombre_archivo.split('.').pop().toLowerCase();
     
     // Si el archivo es visualizable, abrirlo en nueva pestaña
     if (esVisualizable(extension)) {
@@ -148,7 +250,7 @@ function manejarClickTarjetaArchivo(archivo) {
         // De lo contrario, iniciar descarga
         const link = document.createElement('a');
         link.href = archivo.url;
-        link.download = archivo.filename;
+        link.download = archivo.nombre_archivo;
         link.click();
     }
 }
@@ -209,6 +311,7 @@ function obtenerIconoArchivo(extension) {
  * @returns {string} Tamaño formateado
  */
 function formatearTamañoArchivo(bytes) {
+    if (bytes === null || bytes === undefined) return 'Tamaño desconocido';
     if (bytes === 0) return '0 Bytes';
     
     const k = 1024;
@@ -234,6 +337,7 @@ if (typeof module !== 'undefined' && module.exports) {
     module.exports = {
         initFiles,
         cargarArchivos,
-        mostrarArchivos
+        mostrarArchivos,
+        aplicarCambioArchivo
     };
 }
\ No newline at end of file
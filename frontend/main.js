@@ -30,6 +30,36 @@ function agregarEventListeners() {
     }
 }
 
+/**
+ * Se suscribe al feed de cambios de una entidad a partir de una versión
+ * Usa Server-Sent Events (el navegador reconecta solo y reenvía Last-Event-ID);
+ * si EventSource no está disponible, consulta data/cambios periódicamente.
+ * @param {string} entidad - 'producto' o 'archivo'
+ * @param {number} version - Versión de los datos ya cargados (cabecera X-Version-Cambios)
+ * @param {Function} aplicar - Recibe cada cambio {version, entidad, clave, operacion, datos}
+ */
+function suscribirCambios(entidad, version, aplicar) {
+    if (window.EventSource) {
+        const fuente = new EventSource(`data/cambios/stream?entidad=${entidad}&desde=${version}`);
+        fuente.addEventListener('cambio', evento => aplicar(JSON.parse(evento.data)));
+        fuente.onerror = () => console.warn(`Feed de cambios (${entidad}) desconectado, reintentando...`);
+        return fuente;
+    }
+    let ultimaVersion = version;
+    const consultar = () => {
+        fetch(`data/cambios?entidad=${entidad}&desde=${ultimaVersion}`)
+            .then(response => response.json())
+            .then(data => {
+                (data.cambios || []).forEach(aplicar);
+                ultimaVersion = data.version;
+                setTimeout(consultar, data.hay_mas ? 0 : 30000);
+            })
+            .catch(() => setTimeout(consultar, 30000));
+    };
+    setTimeout(consultar, 30000);
+    return null;
+}
+
 /**
  * Muestra un mensaje de notificación al usuario
  * @param {string} mensaje - El mensaje a mostrar
@@ -132,6 +162,7 @@ function actualizarElementosPorPagina(cantidad) {
 // Exportar funciones si es necesario
 if (typeof module !== 'undefined' && module.exports) {
     module.exports = {
+        suscribirCambios,
         mostrarNotificacion,
         formatearFecha,
         formatearTamanoArchivo,
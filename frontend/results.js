@@ -4,6 +4,7 @@
  * - Carga de resultados desde results.json
  * - Implementación de paginación
  * - Actualización del número de elementos por página
+ * - Aplicación de cambios en vivo (feed de cambios) sin volver a descargar todo
  */
 
 // Variables de estado para resultados
@@ -11,6 +12,8 @@ let datosResultados = [];
 let paginaActual = 1;
 let elementosPorPagina = 10;
 let paginasTotales = 0;
+let versionResultados = 0;
+let renderPendiente = null;
 
 /**
  * Inicializa el componente de resultados
@@ -35,12 +38,17 @@ function cargarResultados() {
             if (!response.ok) {
                 throw new Error('Error al cargar resultados');
             }
+            // Versión del feed de cambios que corresponde a estos datos
+            versionResultados = parseInt(response.headers.get('X-Version-Cambios') || '0', 10);
             return response.json();
         })
         .then(data => {
             // Almacenar los datos de resultados
             datosResultados = data;
             
+            // A partir de aquí solo se reciben los cambios
+            suscribirCambios('producto', versionResultados, aplicarCambioResultado);
+            
             // Calcular el total de páginas
             paginasTotales = Math.ceil(datosResultados.length / elementosPorPagina);
             
@@ -68,6 +76,33 @@ function cargarResultados() {
         });
 }
 
+/**
+ * Aplica un cambio del feed (insert/update/delete) sobre los resultados en memoria
+ * @param {Object} cambio - {version, clave, operacion, datos}
+ */
+function aplicarCambioResultado(cambio) {
+    versionResultados = cambio.version;
+    const indice = datosResultados.findIndex(r => String(r.id) === String(cambio.clave));
+    if (cambio.operacion === 'delete') {
+        if (indice >= 0) datosResultados.splice(indice, 1);
+    } else if (indice >= 0) {
+        datosResultados[indice] = cambio.datos;
+    } else {
+        // Los resultados van del más nuevo al más antiguo
+        datosResultados.unshift(cambio.datos);
+    }
+    // Un solo redibujado por ráfaga de cambios
+    if (!renderPendiente) {
+        renderPendiente = setTimeout(() => {
+            renderPendiente = null;
+            paginasTotales = Math.ceil(datosResultados.length / elementosPorPagina);
+            if (paginasTotales > 0) {
+                mostrarResultados(Math.min(paginaActual, paginasTotales));
+            }
+        }, 250);
+    }
+}
+
 /**
  * Muestra una página específica de resultados
  * @param {number} pagina - El número de página a mostrar
@@ -0,0 +1,127 @@
+# llm/agrupador_plantillas.py
+# Agrupa fragmentos HTML por plantilla para pedir selectores al LLM una sola vez por estructura
+import hashlib
+import re
+import time
+from collections import defaultdict
+from bs4 import BeautifulSoup, Tag
+from db.logger import logger
+
+# Proporción mínima de miembros de una plantilla en los que el selector debe encontrar algo
+UMBRAL_VALIDACION = 0.8
+# Clases con dígitos suelen ser identificadores únicos (product-item-1234) y romperían la agrupación
+CLASE_VARIABLE = re.compile(r"\d")
+# Tras un fallo del LLM (error o respuesta sin JSON) la plantilla no se vuelve a consultar hasta
+# pasado este tiempo: las demás páginas con la misma maqueta fallarían igual
+ESPERA_TRAS_FALLO = 15 * 60
+
+# {(firma, objetivos): instante del último fallo}, compartido por todo el proceso
+_fallos = {}
+
+
+def _como_elemento(fragmento):
+    """Convierte un fragmento (str o Tag) en el primer elemento HTML que contiene."""
+    if isinstance(fragmento, Tag):
+        return fragmento
+    sopa = BeautifulSoup(fragmento, "html.parser")
+    return sopa.find(True)
+
+
+def _esqueleto(elemento):
+    """Esqueleto de etiquetas y clases del elemento, sin texto ni atributos variables."""
+    clases = sorted(c for c in elemento.get("class", []) if not CLASE_VARIABLE.search(c))
+    hijos = "".join(_esqueleto(hijo) for hijo in elemento.find_all(True, recursive=False))
+    return f"<{elemento.name}.{'.'.join(clases)}>{hijos}</{elemento.name}>"
+
+
+def firma_estructural(fragmento) -> str:
+    """
+    Calcula la firma estructural de un fragmento HTML.
+    Dos tarjetas de producto con la misma maqueta y distinto contenido comparten firma.
+    """
+    elemento = _como_elemento(fragmento)
+    if elemento is None:
+        return ""
+    return hashlib.sha1(_esqueleto(elemento).encode("utf-8")).hexdigest()[:16]
+
+
+def agrupar_por_firma(fragmentos) -> dict:
+    """Agrupa los fragmentos por firma estructural: {firma: [elementos]}."""
+    grupos = defaultdict(list)
+    for fragmento in fragmentos:
+        elemento = _como_elemento(fragmento)
+        if elemento is not None:
+            grupos[firma_estructural(elemento)].append(elemento)
+    return dict(grupos)
+
+
+def detectar_fragmentos_repetidos(html, minimo=3, maximo_grupos=5) -> dict:
+    """
+    Busca hermanos que comparten firma (tarjetas de un listado) en un documento completo.
+    :return: Los grupos más numerosos como {firma: [elementos]}.
+    """
+    sopa = html if isinstance(html, Tag) else BeautifulSoup(html, "html.parser")
+    grupos = {}
+    for padre in sopa.find_all(True):
+        hijos = padre.find_all(True, recursive=False)
+        if len(hijos) < minimo:
+            continue
+        for firma, miembros in agrupar_por_firma(hijos).items():
+            # Descartar hojas sin estructura interna (p. ej. <br>, <span> sueltos)
+            if len(miembros) >= minimo and miembros[0].find(True) is not None:
+                grupos.setdefault(firma, []).extend(miembros)
+    ordenados = sorted(grupos.items(), key=lambda par: len(par[1]), reverse=True)
+    return dict(ordenados[:maximo_grupos])
+
+
+def validar_selector(selector, miembros, umbral=UMBRAL_VALIDACION) -> bool:
+    """Comprueba con BeautifulSoup que el selector CSS encuentra algo en casi todos los miembros."""
+    if not selector or not miembros:
+        return False
+    try:
+        aciertos = sum(1 for miembro in miembros if miembro.select_one(selector) is not None)
+    except Exception:
+        # Selector con sintaxis que soupsieve no entiende
+        return False
+    return aciertos / len(miembros) >= umbral
+
+
+def inferir_selectores(grupos, objetivos, cache=None) -> dict:
+    """
+    Pide al LLM los selectores de cada plantilla una sola vez y valida el resultado.
+    :param grupos: {firma: [elementos]} de agrupar_por_firma o detectar_fragmentos_repetidos.
+    :param objetivos: Lista de descripciones a extraer, o {clave: descripcion}; todas se envían
+        juntas en un único prompt por plantilla.
+    :param cache: {firma: {clave: selector}} ya conocidos; se actualiza en sitio.
+    :return: {firma: {clave: selector}} solo con selectores validados.
+    """
+    from llm.llm_selector import generar_selectores_lote
+
+    if not isinstance(objetivos, dict):
+        objetivos = {objetivo: objetivo for objetivo in objetivos}
+    claves = {descripcion: clave for clave, descripcion in objetivos.items()}
+    cache = {} if cache is None else cache
+    llamadas = 0
+    for firma, miembros in grupos.items():
+        if firma in cache:
+            continue
+        clave_fallo = (firma, tuple(sorted(claves)))
+        fallo = _fallos.get(clave_fallo)
+        if fallo is not None and time.monotonic() - fallo < ESPERA_TRAS_FALLO:
+            logger.debug("La plantilla %s falló hace menos de %d s; no se consulta al LLM", firma, ESPERA_TRAS_FALLO)
+            continue
+        try:
+            llamadas += 1
+            sugeridos = generar_selectores_lote(str(miembros[0]), list(claves), modo="css")
+        except Exception as e:
+            logger.warning("No se pudieron inferir selectores para la plantilla %s: %s", firma, e)
+            _fallos[clave_fallo] = time.monotonic()
+            continue
+        _fallos.pop(clave_fallo, None)
+        cache[firma] = {
+            claves[descripcion]: selector
+            for descripcion, selector in sugeridos.items()
+            if validar_selector(selector, miembros)
+        }
+    logger.info("Selectores inferidos para %d plantillas con %s llamadas al LLM", len(grupos), llamadas)
+    return {firma: cache[firma] for firma in grupos if firma in cache}
@@ -1,21 +1,30 @@
 # llm/llm_selector.py
 import os
+import json
 from pathlib import Path
-from dotenv import load_dotenv
-from mistralai import Mistral
 
 # Cargar el .env desde la raíz del proyecto para evitar que se produscan errores de la licencia de la ia
 ENV_PATH = Path(__file__).resolve().parent.parent / ".env"
-load_dotenv(dotenv_path=ENV_PATH)
 
-API_KEY = os.getenv("MISTRAL_API_KEY")
-MODEL = os.getenv("MISTRAL_MODEL", "mistral-small-latest")
+MODEL = None
 
-if not API_KEY:
-    raise ValueError("MISTRAL_API_KEY no está definida en el archivo .env")
+# Cliente Mistral, se crea en la primera llamada para que importar el módulo no exija credenciales
+client = None
 
-# Crear cliente Mistral
-client = Mistral(api_key=API_KEY)
+def obtener_cliente():
+    """Crea el cliente Mistral la primera vez que se usa y lo reutiliza después."""
+    global client, MODEL
+    if client is None:
+        from dotenv import load_dotenv
+        from mistralai import Mistral
+
+        load_dotenv(dotenv_path=ENV_PATH)
+        api_key = os.getenv("MISTRAL_API_KEY")
+        MODEL = os.getenv("MISTRAL_MODEL", "mistral-small-latest")
+        if not api_key:
+            raise ValueError("MISTRAL_API_KEY no está definida en el archivo .env")
+        client = Mistral(api_key=api_key)
+    return client
 
 def generar_selector(fragmento_html: str, objetivo: str, modo: str = "css") -> str:
     """
@@ -32,7 +41,8 @@ def generar_selector(fragmento_html: str, objetivo: str, modo: str = "css") -> s
     )
 
     try:
-        resp = client.chat.complete(
+        cliente = obtener_cliente()
+        resp = cliente.chat.complete(
             model=MODEL,
             messages=[
                 {
@@ -54,6 +64,57 @@ def generar_selector(fragmento_html: str, objetivo: str, modo: str = "css") -> s
         raise RuntimeError(f"Error llamando a Mistral: {e}") from e
 
 
+def generar_selectores_lote(fragmento_html: str, objetivos: list, modo: str = "css") -> dict:
+    """
+    Pide a Mistral un selector por cada objetivo en una única llamada.
+    :param fragmento_html: Fragmento HTML representativo de una plantilla.
+    :param objetivos: Lista de descripciones del contenido a extraer.
+    :param modo: "css" o "xpath".
+    :return: Diccionario {objetivo: selector}; los objetivos sin respuesta se omiten.
+    """
+    lista_objetivos = "\n".join(f"- {objetivo}" for objetivo in objetivos)
+    prompt = (
+        f"Eres un experto en scraping web. Dado el siguiente fragmento HTML, "
+        f"proporciona un selector válido {modo.upper()} relativo al fragmento para cada uno de estos objetivos:\n"
+        f"{lista_objetivos}\n\n"
+        f"Responde únicamente con un objeto JSON cuyas claves sean exactamente los objetivos "
+        f"y cuyos valores sean los selectores. Sin explicaciones ni bloques de código.\n\n{fragmento_html}"
+    )
+
+    try:
+        cliente = obtener_cliente()
+        resp = cliente.chat.complete(
+            model=MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Eres un experto en HTML, scraping web y automatización. Responde solo con JSON."
+                },
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.2,
+            max_tokens=100 * len(objetivos),
+        )
+        contenido = resp.choices[0].message.content.strip()
+    except Exception as e:
+        raise RuntimeError(f"Error llamando a Mistral: {e}") from e
+
+    # El modelo a veces envuelve el JSON en un bloque ```json ... ```
+    inicio, fin = contenido.find("{"), contenido.rfind("}")
+    if inicio == -1 or fin == -1:
+        raise RuntimeError(f"Respuesta de Mistral sin JSON: {contenido[:200]}")
+    try:
+        selectores = json.loads(contenido[inicio:fin + 1])
+    except ValueError as e:
+        raise RuntimeError(f"Respuesta de Mistral con JSON inválido: {e}") from e
+
+    return {
+        objetivo: str(selectores[objetivo]).strip()
+        for objetivo in objetivos
+        if selectores.get(objetivo)
+    }
+
+
 # Prueba rápida directa (si ejecutas este módulo solo)
 if __name__ == "__main__":
     html = """
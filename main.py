@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import traceback
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -7,17 +8,63 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from time import sleep
-from db.logger import logger
-from db.database import guardar_producto
-import json
-from datetime import datetime
+from db.logger import logger, configurar_logging, nuevo_run_id, etapa
+from db.database import guardar_productos
+from db.metricas import registro as metricas
+from db.exportar import exportar_productos_a_json, exportar_archivos_a_json
+from db.analitica import exportar_productos_a_parquet
 from scraper.static_scraper import scrapear_sitio_estatico
-from llm import llm_selector
+from scraper.pipeline import Pipeline
+from scraper.productos import extraer_productos_de_html, inferir_selectores_respaldo, normalizar_producto
+from scraper.snapshots import guardar_snapshot
+
+URL_CATEGORIA = "https://www.tiendamonge.com/productos/celulares-y-tablets/celulares"
+# Etiquetas de las métricas de esta categoría
+SITIO = "tiendamonge"
+CATEGORIA = "celulares"
+ETIQUETAS = {"sitio": SITIO, "categoria": CATEGORIA}
+# Páginas renderizadas en espera de extracción (cada una es un HTML completo) y productos por transacción
+TAMANO_COLA_PAGINAS = 4
+TAMANO_LOTE_PRODUCTOS = 100
+# Parámetro de la query con el número de página en los enlaces de paginación de Algolia
+PARAMETRO_PAGINA = "page"
+
+def urls_paginas_listado(url_actual, enlaces):
+    """
+    URLs de las páginas 2..N del listado a partir de los href de la paginación, donde N es la
+    mayor página enlazada. Devuelve [] si los enlaces no llevan el número de página.
+    """
+    paginas = {}
+    for href in enlaces:
+        if not href:
+            continue
+        partes = urlsplit(urljoin(url_actual, href))
+        numero = dict(parse_qsl(partes.query)).get(PARAMETRO_PAGINA, "")
+        if numero.isdigit():
+            paginas[int(numero)] = partes
+    if not paginas:
+        return []
+    plantilla = paginas[max(paginas)]
+    query = parse_qsl(plantilla.query)
+    return [
+        urlunsplit(plantilla._replace(query=urlencode(
+            [(clave, str(numero) if clave == PARAMETRO_PAGINA else valor) for clave, valor in query])))
+        for numero in range(2, max(paginas) + 1)
+    ]
+
+def crear_driver():
+    """Chrome sin interfaz, como lo usan el scraping directo y los trabajadores de la cola."""
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    return webdriver.Chrome(options=options)
 
 # Clase principal para el scraping de Tienda Monge
 class ScraperTiendaMonge:
     def __init__(self):
         self.logger = logger
+        # Selectores inferidos por plantilla {firma: {campo: selector}}, compartidos entre páginas
+        self.selectores_respaldo = {}
 
     def hacer_scroll(self, driver):
         """Realiza scroll hasta el final de la página."""
@@ -30,102 +77,146 @@ class ScraperTiendaMonge:
                 break
             altura_final = nueva_altura
 
-    def siguiente_pagina(self, driver):
-        """Hace clic en el botón de siguiente página si existe."""
+    def url_siguiente_pagina(self, driver):
+        """URL del botón de siguiente página, o None si es la última."""
         try:
             boton_siguiente = driver.find_element(By.CSS_SELECTOR, "li.ais-Pagination-item--nextPage a")
-            url_siguiente = boton_siguiente.get_attribute("href")
-            if url_siguiente:
-                driver.get(url_siguiente)
-                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                return True
+            return boton_siguiente.get_attribute("href") or None
+        except Exception:
+            return None
+
+    def urls_paginas(self, driver):
+        """URLs de las páginas siguientes según la paginación visible (ver urls_paginas_listado)."""
+        try:
+            enlaces = driver.find_elements(By.CSS_SELECTOR, "li.ais-Pagination-item a")
+            return urls_paginas_listado(driver.current_url, [enlace.get_attribute("href") for enlace in enlaces])
+        except Exception:
+            return []
+
+    def siguiente_pagina(self, driver):
+        """Hace clic en el botón de siguiente página si existe."""
+        url_siguiente = self.url_siguiente_pagina(driver)
+        if not url_siguiente:
             return False
+        try:
+            driver.get(url_siguiente)
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            return True
         except Exception:
             return False
 
-    def extraer_productos(self, driver):
-        """Extrae los productos de la página actual."""
-        productos = []
-
-        # Estructura Magento
-        magento_items = driver.find_elements(By.CSS_SELECTOR, "li.product-item")
-        for item in magento_items:
-            try:
-                titulo = item.find_element(By.CSS_SELECTOR, ".product-item-name a").text.strip()
-                precio = item.find_element(By.CSS_SELECTOR, ".special-price .price").text.strip()
-                imagen = item.find_element(By.CSS_SELECTOR, "img.product-image-photo").get_attribute("src")
-                url = item.find_element(By.CSS_SELECTOR, "a.product-item-link").get_attribute("href")
-                productos.append({"titulo": titulo, "precio": precio, "imagen_url": imagen, "url": url})
-            except Exception as e:
-                self.logger.warning(f"[MAGENTO] Producto con error: {e}")
-
-        # Estructura SPA (Algolia)
-        spa_items = driver.find_elements(By.CSS_SELECTOR, "li.ais-Hits-item")
-        for item in spa_items:
-            try:
-                titulo = item.find_element(By.CSS_SELECTOR, "h3.result-title").text.strip()
-                precio = item.find_element(By.CSS_SELECTOR, ".after_special").text.strip()
-                imagen = item.find_element(By.CSS_SELECTOR, ".result-thumbnail img").get_attribute("src")
-                url = item.find_element(By.CSS_SELECTOR, "a.result").get_attribute("href")
-                productos.append({"titulo": titulo, "precio": precio, "imagen_url": imagen, "url": url})
-            except Exception as e:
-                self.logger.warning(f"[SPA] Producto con error: {e}")
+    def cargar_pagina(self, driver, url):
+        """Abre una página del listado y la recorre hasta el final (la usa el trabajador de la cola)."""
+        with metricas.temporizador("carga_pagina", **ETIQUETAS):
+            driver.get(url)
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        with metricas.temporizador("scroll", **ETIQUETAS):
+            self.hacer_scroll(driver)
 
+    def extraer_productos(self, pagina):
+        """Extrae los productos de una página (url, html) ya cargada; corre fuera del hilo del navegador."""
+        url, html = pagina
+        # Se archiva el listado para poder reprocesarlo sin navegador (cli.py reprocess)
+        guardar_snapshot(url, html, tipo="listado", categoria=CATEGORIA)
+        with metricas.temporizador("extraccion", **ETIQUETAS):
+            productos = extraer_productos_de_html(html, url, self.selectores_respaldo)
+
+            # Si las estructuras conocidas (Magento/SPA) no encuentran nada, el sitio cambió de maqueta:
+            # se infieren selectores una vez por plantilla y se reutilizan en las páginas siguientes
+            if not productos:
+                self.logger.warning("Ninguna estructura conocida encontró productos, infiriendo selectores con LLM...")
+                inferir_selectores_respaldo(html, cache=self.selectores_respaldo)
+                productos = extraer_productos_de_html(html, url, self.selectores_respaldo)
+
+        metricas.contador("productos_extraidos", len(productos), **ETIQUETAS)
+        self.logger.debug("%s: %d productos", url, len(productos))
         return productos
 
+    def normalizar(self, producto):
+        """Etapa de normalización: descarta productos sin título."""
+        normalizado = normalizar_producto(producto)
+        return [normalizado] if normalizado else []
+
+    def guardar_lote(self, productos):
+        """Escribe un lote de productos en una sola transacción."""
+        with metricas.temporizador("guardado", **ETIQUETAS):
+            guardar_productos(productos, categoria=CATEGORIA)
+
     def scrapear_sitio_web(self):
         """Inicia el scraping en el sitio web de Tienda Monge."""
         self.logger.info("Iniciando scraping en Tienda Importadora Monge...")
 
-        options = Options()
-        options.add_argument("--headless=new")
-        options.add_argument("--disable-gpu")
-        driver = webdriver.Chrome(options=options)
-        driver.get("https://www.tiendamonge.com/productos/celulares-y-tablets/celulares")
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        # El navegador solo navega; extracción, normalización y guardado corren en otros hilos
+        pipeline = (Pipeline("productos")
+                    .etapa("extraccion", self.extraer_productos, capacidad=TAMANO_COLA_PAGINAS)
+                    .etapa("normalizacion", self.normalizar)
+                    .escritor("guardado", self.guardar_lote, tamano_lote=TAMANO_LOTE_PRODUCTOS))
 
-        while True:
-            self.hacer_scroll(driver)
-            productos_en_pagina = self.extraer_productos(driver)
-            for producto in productos_en_pagina:
-                guardar_producto(producto["titulo"], producto["precio"], producto["imagen_url"])
-            if not self.siguiente_pagina(driver):
-                break
-
-        driver.quit()
+        driver = crear_driver()
+        try:
+            with pipeline:
+                with metricas.temporizador("carga_pagina", **ETIQUETAS):
+                    driver.get(URL_CATEGORIA)
+                    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+
+                pagina = 1
+                while True:
+                    with metricas.temporizador("scroll", **ETIQUETAS):
+                        self.hacer_scroll(driver)
+                    # Si la extracción se atrasa, poner() espera a que haya lugar en la cola
+                    pipeline.poner((driver.current_url, driver.page_source))
+                    metricas.contador("paginas_procesadas", **ETIQUETAS)
+                    self.logger.debug("Página %d enviada a extracción", pagina)
+                    with metricas.temporizador("carga_pagina", **ETIQUETAS):
+                        hay_siguiente = self.siguiente_pagina(driver)
+                    if not hay_siguiente:
+                        break
+                    pagina += 1
+        finally:
+            driver.quit()
         self.logger.info("Scraping finalizado.")
 
     def ejecutar_scraping_completo(self):
         """Ejecuta todo el proceso de scraping y generación de archivos."""
-        self.logger.info("=== INICIO: Ejecución completa del sistema ===")
+        run_id = nuevo_run_id()
+        metricas.reiniciar()
+        self.logger.info("=== INICIO: Ejecución completa del sistema (run %s) ===", run_id)
         try:
             # 1. Scraping real con Selenium
-            self.logger.info("Iniciando scraping con Selenium desde Tienda Monge...")
-            self.scrapear_sitio_web()
-            self.logger.info("Scraping con Selenium completado.")
+            with etapa("productos"):
+                self.logger.info("Iniciando scraping con Selenium desde Tienda Monge...")
+                self.scrapear_sitio_web()
+                self.logger.info("Scraping con Selenium completado.")
 
             # 2. Scraping de archivos locales (si aplica)
-            self.logger.info("Iniciando scraping de archivos estáticos (localhost)...")
-            scrapear_sitio_estatico()
-            self.logger.info("Scraping de archivos estáticos completado.")
+            with etapa("archivos"):
+                self.logger.info("Iniciando scraping de archivos estáticos (localhost)...")
+                scrapear_sitio_estatico()
+                self.logger.info("Scraping de archivos estáticos completado.")
 
             # 3. Generar archivos JSON para el dashboard web
-            self.logger.info("Generando results.json desde la base de datos...")
-            exportar_productos_a_json()
+            with etapa("exportacion"):
+                self.logger.info("Generando results.json desde la base de datos...")
+                exportar_productos_a_json()
+
+                self.logger.info("Generando files.json desde la base de datos...")
+                exportar_archivos_a_json()
 
-            self.logger.info("Generando files.json desde la base de datos...")
-            exportar_archivos_a_json()
+                # Historial de precios para análisis (solo las filas nuevas; requiere pyarrow)
+                exportar_productos_a_parquet()
 
             # 4. Probar selector con LLM (opcional / demo)
-            self.logger.info("Probando generación de selector LLM (OpenAI)...")
-            fragmento_html = """
-            <div class='product-card'>
-                <div class='product-title'>iPhone 13</div>
-                <div class='product-price'>₡850000</div>
-            </div>
-            """
-            selector_css = llm_selector.generar_selector(fragmento_html, "product price", modo="css")
-            print(f"Selector sugerido (CSS): {selector_css}")
+            with etapa("llm"):
+                self.logger.info("Probando generación de selector LLM (OpenAI)...")
+                from llm import llm_selector
+                fragmento_html = """
+                <div class='product-card'>
+                    <div class='product-title'>iPhone 13</div>
+                    <div class='product-price'>₡850000</div>
+                </div>
+                """
+                selector_css = llm_selector.generar_selector(fragmento_html, "product price", modo="css")
+                print(f"Selector sugerido (CSS): {selector_css}")
 
 
             self.logger.info("=== FIN: Ejecución completa del sistema ===")
@@ -134,62 +225,12 @@ class ScraperTiendaMonge:
             self.logger.error("Ocurrió un error crítico durante la ejecución.")
             traceback.print_exc()
 
+        finally:
+            metricas.guardar_reporte()
 
-# Función para exportar productos a JSON
-def exportar_productos_a_json(ruta_salida="data/results.json"):
-    try:
-        from db.database import obtener_conexion
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        cur.execute("SELECT titulo, precio FROM productos ORDER BY id DESC;")
-        filas = cur.fetchall()
-        cur.close()
-        conn.close()
-        resultados = []
-        for i, fila in enumerate(filas):
-            resultados.append({
-                "id": i + 1,
-                "title": fila[0],
-                "category": "Celulares",
-                "description": f"Precio: {fila[1]}",
-                "date": datetime.now().isoformat()
-            })
-        with open(ruta_salida, "w", encoding="utf-8") as f:
-            json.dump(resultados, f, indent=2, ensure_ascii=False)
-        print(f"Archivo '{ruta_salida}' generado correctamente con {len(resultados)} productos.")
-    except Exception as e:
-        print("Error al generar results.json:", e)
-
-# Función para exportar archivos a JSON
-def exportar_archivos_a_json(ruta_salida="data/files.json"):
-    try:
-        from db.database import obtener_conexion
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        cur.execute("SELECT filename, url FROM downloaded_files ORDER BY id DESC;")
-        filas = cur.fetchall()
-        cur.close()
-        conn.close()
-        archivos = []
-        for i, fila in enumerate(filas):
-            nombre_archivo = fila[0]
-            url = fila[1]
-            ext = nombre_archivo.split('.')[-1].lower()
-            tamano = 1024000  # Puedes calcularlo si los archivos son locales, o dejar un valor fijo
-            archivos.append({
-                "id": i + 1,
-                "nombre_archivo": nombre_archivo,
-                "tipo": ext.upper(),
-                "tamano": tamano,
-                "url": url
-            })
-        with open(ruta_salida, "w", encoding="utf-8") as f:
-            json.dump(archivos, f, indent=2, ensure_ascii=False)
-        print(f"Archivo '{ruta_salida}' generado correctamente con {len(archivos)} archivos.")
-    except Exception as e:
-        print("Error al generar files.json rafa:", e)
 
 if __name__ == "__main__":
+    configurar_logging()
     print("Lanzando: Reto Técnico Completo VoiceFlip...")
     scraper = ScraperTiendaMonge()
     scraper.ejecutar_scraping_completo()
@@ -1,30 +1,40 @@
 # -*- coding: utf-8 -*-
-from apscheduler.schedulers.blocking import BlockingScheduler
-from main import ScraperTiendaMonge, exportar_productos_a_json, exportar_archivos_a_json
-
-def ejecutar_scraping_y_actualizar_json():
-    """Ejecuta el scraping básico y actualiza los archivos JSON"""
-    print("Iniciando scraping programado...")
-    scraper = ScraperTiendaMonge()
-    scraper.scrapear_sitio_web()  # Solo scraping del sitio web principal
-    exportar_productos_a_json()
-    exportar_archivos_a_json()
-    print("Scraping y exportación completados.")
-
-def ejecutar_proceso_completo():
-    """Ejecuta todo el flujo completo de scraping"""
-    print("Iniciando proceso completo de scraping...")
-    scraper = ScraperTiendaMonge()
-    scraper.ejecutar_scraping_completo()  # Todo el proceso (web + estático + LLM)
-    print("Proceso completo de scraping finalizado.")
+# El programador solo encola: el trabajo lo hacen los trabajadores de la cola crawl_tasks
+# (cli.py worker), que pueden correr en esta máquina o en otras contra la misma base.
+from db.logger import configurar_logging
+
+def encolar_scraping_y_exportacion():
+    """Encola la primera página de la categoría y la exportación de los JSON."""
+    from scraper.trabajador import encolar_recorrido
+
+    print("Encolando scraping programado...")
+    print("Estado de la cola:", encolar_recorrido())
+
+def encolar_proceso_completo():
+    """Encola el recorrido completo: productos, archivos del sitio estático y exportación."""
+    from scraper.trabajador import encolar_recorrido
+
+    print("Encolando proceso completo de scraping...")
+    print("Estado de la cola:", encolar_recorrido(completo=True))
 
 # Configuración del programador de tareas
-programador = BlockingScheduler()
-programador.add_job(ejecutar_scraping_y_actualizar_json, 'interval', hours=1)  # Cada hora
-programador.add_job(ejecutar_proceso_completo, 'interval', hours=6)  # Cada 6 horas
+def crear_programador():
+    """Crea el programador con las tareas periódicas (solo escriben en la cola)."""
+    from apscheduler.schedulers.blocking import BlockingScheduler
+
+    programador = BlockingScheduler()
+    programador.add_job(encolar_scraping_y_exportacion, 'interval', hours=1)  # Cada hora
+    programador.add_job(encolar_proceso_completo, 'interval', hours=6)  # Cada 6 horas
+    return programador
+
+def iniciar_programador():
+    """Encola el scraping inmediatamente y arranca el programador bloqueante."""
+    configurar_logging()
+    programador = crear_programador()
+    print("Programador iniciado. Los trabajadores se inician con: python cli.py worker")
+    encolar_scraping_y_exportacion()  # Encolar inmediatamente al iniciar
+    programador.start()
 
 # Iniciar el programador
 if __name__ == "__main__":
-    print("Programador iniciado. Ejecutando tareas programadas...")
-    ejecutar_scraping_y_actualizar_json()  # Ejecutar inmediatamente al iniciar
-    programador.start()
\ No newline at end of file
+    iniciar_programador()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Descarga de archivos reanudable
+# Mientras se descarga, el archivo vive como <destino>.part y sus validadores (ETag / Last-Modified)
+# en <destino>.part.json. Si la conexión se corta, el siguiente intento (en esta ejecución o en la
+# próxima) pide solo lo que falta con Range + If-Range; si el servidor no soporta rangos o el archivo
+# cambió, responde 200 y se descarga completo. El SHA-256 se calcula sobre el archivo terminado.
+import hashlib
+import json
+import os
+import re
+
+import requests
+import urllib3
+
+from db.logger import logger
+from scraper import http_cliente
+
+TAMANO_BLOQUE = 256 * 1024
+# Lecturas de red sin read1 (urllib3 1.x): un bloque a medio llenar se pierde si la conexión se corta
+TAMANO_BLOQUE_RED = 16 * 1024
+SUFIJO_PARCIAL = ".part"
+_RE_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+_RE_RANGO_INSATISFACIBLE = re.compile(r"bytes\s+\*/(\d+)")
+
+
+class DescargaIncompleta(Exception):
+    """El servidor cerró la respuesta antes de enviar todos los bytes anunciados."""
+
+
+def _ruta_parcial(ruta_destino):
+    return ruta_destino + SUFIJO_PARCIAL
+
+
+def _ruta_validadores(ruta_destino):
+    return ruta_destino + SUFIJO_PARCIAL + ".json"
+
+
+def _leer_validadores(ruta_destino, url):
+    try:
+        with open(_ruta_validadores(ruta_destino), "r", encoding="utf-8") as f:
+            validadores = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    # Un .part de otra URL con el mismo nombre no sirve para reanudar
+    return validadores if validadores.get("url") == url else None
+
+
+def _guardar_validadores(ruta_destino, url, respuesta, total):
+    etag = respuesta.headers.get("ETag")
+    if etag and etag.startswith("W/"):
+        etag = None  # If-Range solo admite ETags fuertes
+    with open(_ruta_validadores(ruta_destino), "w", encoding="utf-8") as f:
+        json.dump({"url": url, "etag": etag, "last_modified": respuesta.headers.get("Last-Modified"),
+                   "content_type": respuesta.headers.get("Content-Type"), "total": total}, f)
+
+
+def _descartar_parcial(ruta_destino):
+    for ruta in (_ruta_parcial(ruta_destino), _ruta_validadores(ruta_destino)):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+
+def _total_anunciado(respuesta, inicio):
+    """Tamaño completo del archivo según Content-Range (206) o Content-Length (200)."""
+    if respuesta.status_code == 206:
+        rango = _RE_CONTENT_RANGE.match(respuesta.headers.get("Content-Range", ""))
+        if rango and rango.group(3) != "*":
+            return int(rango.group(3))
+        return None
+    longitud = respuesta.headers.get("Content-Length")
+    # Con Content-Encoding, Content-Length es el tamaño comprimido y no sirve para verificar
+    if longitud and not respuesta.headers.get("Content-Encoding"):
+        return inicio + int(longitud)
+    return None
+
+
+def _bloques(respuesta):
+    """
+    Cuerpo de la respuesta en bloques a medida que llegan. read1 devuelve lo que ya está en el
+    socket sin esperar a llenar el bloque, así un corte solo pierde lo que estaba en tránsito.
+    """
+    leer = getattr(respuesta.raw, "read1", None)
+    if leer is None:
+        yield from respuesta.iter_content(TAMANO_BLOQUE_RED)
+        return
+    try:
+        while True:
+            bloque = leer(TAMANO_BLOQUE, decode_content=True)
+            if not bloque:
+                return
+            yield bloque
+    # Las mismas excepciones que iter_content, para que descargar_archivo reintente igual
+    except urllib3.exceptions.ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e)
+    except urllib3.exceptions.ReadTimeoutError as e:
+        raise requests.ConnectionError(e)
+    except urllib3.exceptions.DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e)
+
+
+def _intentar(url, ruta_destino, cliente, progreso):
+    """Un intento de descarga (o de reanudación) sobre el .part; deja el .part completo o lanza."""
+    parcial = _ruta_parcial(ruta_destino)
+    inicio = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+    validadores = _leer_validadores(ruta_destino, url) if inicio else None
+    cabeceras = {}
+    if validadores and (validadores.get("etag") or validadores.get("last_modified")):
+        cabeceras["Range"] = "bytes=%d-" % inicio
+        cabeceras["If-Range"] = validadores.get("etag") or validadores["last_modified"]
+    else:
+        inicio = 0
+
+    respuesta = cliente.get(url, headers=cabeceras, stream=True)
+    try:
+        if respuesta.status_code == 416 and inicio:
+            # El .part ya podría estar completo; si no coincide con el tamaño real se empieza de cero
+            rango = _RE_RANGO_INSATISFACIBLE.match(respuesta.headers.get("Content-Range", ""))
+            if rango and int(rango.group(1)) == inicio:
+                progreso["content_type"] = validadores.get("content_type")
+                return
+            _descartar_parcial(ruta_destino)
+            raise DescargaIncompleta("Rango no válido para %s; se descarga completo" % url)
+        respuesta.raise_for_status()
+
+        rango = _RE_CONTENT_RANGE.match(respuesta.headers.get("Content-Range", ""))
+        if respuesta.status_code == 206:
+            if not rango or int(rango.group(1)) != inicio:
+                # Un rango que no empieza donde termina el .part no se puede pegar; se empieza de cero
+                _descartar_parcial(ruta_destino)
+                raise DescargaIncompleta("%s: Content-Range %r no empieza en el byte %d"
+                                         % (url, respuesta.headers.get("Content-Range"), inicio))
+            modo = "ab" if inicio else "wb"
+            if inicio:
+                progreso["reanudado"] = True
+                logger.info("Reanudando %s desde el byte %d", url, inicio)
+        else:
+            # 200: el servidor ignoró el rango o el archivo cambió desde el corte
+            inicio, modo = 0, "wb"
+        total = _total_anunciado(respuesta, inicio)
+        progreso["content_type"] = respuesta.headers.get("Content-Type")
+        _guardar_validadores(ruta_destino, url, respuesta, total)
+
+        with open(parcial, modo) as f:
+            for bloque in _bloques(respuesta):
+                f.write(bloque)
+                progreso["bytes_transferidos"] += len(bloque)
+    finally:
+        respuesta.close()
+
+    tamano = os.path.getsize(parcial)
+    if total is not None and tamano != total:
+        raise DescargaIncompleta("%s: %d de %d bytes" % (url, tamano, total))
+
+
+def hash_archivo_en_disco(ruta):
+    sha256 = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b""):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+
+def descargar_archivo(url, ruta_destino, intentos=3, cliente=None):
+    """
+    Descarga `url` en `ruta_destino`, reanudando un .part previo si existe.
+    :param intentos: Reanudaciones dentro de esta llamada ante cortes de conexión.
+    :return: {"sha256", "bytes", "bytes_transferidos", "reanudado", "content_type"}.
+    :raises requests.HTTPError: Si el servidor responde con error (el .part se conserva).
+    """
+    cliente = cliente or http_cliente.obtener_cliente()
+    progreso = {"bytes_transferidos": 0, "reanudado": False, "content_type": None}
+    for intento in range(1, intentos + 1):
+        try:
+            _intentar(url, ruta_destino, cliente, progreso)
+            break
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                DescargaIncompleta) as e:
+            if intento == intentos:
+                raise
+            logger.warning("Descarga de %s interrumpida (%s); intento %d de %d", url, e, intento + 1, intentos)
+
+    parcial = _ruta_parcial(ruta_destino)
+    sha256 = hash_archivo_en_disco(parcial)
+    tamano = os.path.getsize(parcial)
+    os.replace(parcial, ruta_destino)
+    _descartar_parcial(ruta_destino)
+    return {"sha256": sha256, "bytes": tamano, "bytes_transferidos": progreso["bytes_transferidos"],
+            "reanudado": progreso["reanudado"], "content_type": progreso["content_type"]}
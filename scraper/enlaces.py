@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Descubrimiento de enlaces a archivos descargables en HTML ya renderizado
+# No depende de Selenium: se usa tanto en el raspado en vivo como al reprocesar snapshots.
+# Recorre el documento una sola vez en modo streaming (parser con "target" de lxml, sin construir
+# el árbol); si lxml no está instalado se usa html.parser de la biblioteca estándar, también en
+# una sola pasada.
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin, urlparse
+from db.logger import logger
+
+try:
+    from lxml import etree
+except ImportError:  # lxml es opcional
+    etree = None
+
+EXTENSIONES_ARCHIVO = [".pdf", ".jpg", ".png", ".docx", ".zip", ".xlsx"]
+ATRIBUTOS_DATA = ('data-file', 'data-url', 'data-download')
+
+_patrones = {}
+
+
+def patron_extensiones(extensiones=None):
+    """Expresión regular precompilada (y cacheada) que reconoce las extensiones al final de la cadena."""
+    clave = tuple(extensiones or EXTENSIONES_ARCHIVO)
+    patron = _patrones.get(clave)
+    if patron is None:
+        alternativas = "|".join(re.escape(ext.lstrip(".")) for ext in clave)
+        patron = _patrones[clave] = re.compile(r"\.(?:%s)$" % alternativas, re.IGNORECASE)
+    return patron
+
+
+def normalizar_url(url_base, valor):
+    """URL absoluta sin espacios alrededor ni fragmento (#...)."""
+    return urldefrag(urljoin(url_base, valor.strip()))[0]
+
+
+class _Recolector:
+    """
+    Target del parser: recibe las etiquetas de apertura y guarda los archivos por método.
+    Sin end()/data(): lxml solo llama a los métodos que el target define, así el texto no cruza a Python.
+    """
+
+    def __init__(self, url_base, patron):
+        self.url_base = url_base
+        self.patron = patron
+        self.archivos_html = {}
+        self.archivos_data = {}
+
+    def start(self, tag, attrib):
+        # Mismo criterio que antes: el href debe terminar en la extensión; en data-* se mira el nombre
+        if tag == "a":
+            href = attrib.get("href")
+            if href and self.patron.search(href.strip()):
+                url_completa = normalizar_url(self.url_base, href)
+                nombre_archivo = os.path.basename(urlparse(url_completa).path)
+                if nombre_archivo:  # Asegurar que tenga nombre
+                    self.archivos_html[nombre_archivo] = {'url': url_completa, 'metodo': 'HTML_RENDERIZADO'}
+        for attr in ATRIBUTOS_DATA:
+            valor = attrib.get(attr)
+            if valor:
+                url_archivo = normalizar_url(self.url_base, valor)
+                nombre = os.path.basename(urlparse(url_archivo).path)
+                if nombre and self.patron.search(nombre):
+                    self.archivos_data[nombre] = {'url': url_archivo, 'metodo': 'DATA_ATTRIBUTES'}
+
+    def close(self):
+        return self
+
+
+class _ParserEstandar(HTMLParser):
+    """Adaptador de html.parser para el mismo recolector (cuando lxml no está disponible)."""
+
+    def __init__(self, recolector):
+        super().__init__(convert_charrefs=True)
+        self.recolector = recolector
+
+    def handle_starttag(self, tag, attrs):
+        self.recolector.start(tag, {k: v for k, v in attrs if v is not None})
+
+
+def descubrir_enlaces(html, url_base, extensiones=None):
+    """
+    Recorre el documento una sola vez.
+    :return: (archivos en <a href>, archivos en data-file/data-url/data-download),
+        cada uno como {nombre: {'url', 'metodo'}}.
+    """
+    recolector = _Recolector(url_base, patron_extensiones(extensiones))
+    if html:
+        if etree is not None:
+            parser = etree.HTMLParser(target=recolector)
+        else:
+            parser = _ParserEstandar(recolector)
+        parser.feed(html)
+        parser.close()
+    logger.debug("Descubiertos %d enlaces y %d data-attributes",
+                 len(recolector.archivos_html), len(recolector.archivos_data))
+    return recolector.archivos_html, recolector.archivos_data
+
+
+def extraer_enlaces_archivos(html, url_base, extensiones=None):
+    """Todos los archivos del HTML (enlaces y data-attributes); los data-* tienen prioridad."""
+    archivos, archivos_data = descubrir_enlaces(html, url_base, extensiones)
+    archivos = dict(archivos)
+    archivos.update(archivos_data)
+    return archivos
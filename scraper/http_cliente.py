@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# Cliente HTTP compartido por los scrapers y la descarga de archivos
+# - Límite de peticiones por host con una cubeta de tokens (ritmo sostenido + ráfaga)
+# - Reintentos con backoff exponencial y jitter, respetando Retry-After
+# - Cortacircuitos por host: tras varios fallos seguidos deja de insistir durante un tiempo
+# Configurable por entorno: HTTP_TASA_POR_HOST (peticiones/s), HTTP_RAFAGA, HTTP_REINTENTOS.
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from db.logger import logger
+from db.metricas import registro as metricas
+
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+ESPERA_MAXIMA_RETRY_AFTER = 120  # Segundos; un Retry-After mayor se recorta
+
+
+class CircuitoAbierto(Exception):
+    """El host acumuló demasiados fallos seguidos y está en enfriamiento."""
+
+
+class CubetaTokens:
+    """Permite `tasa` peticiones por segundo con ráfagas de hasta `capacidad`."""
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad)
+        self.tokens = float(capacidad)
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self):
+        """Bloquea hasta que haya un token disponible."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.tasa
+            time.sleep(espera)
+
+
+class Cortacircuitos:
+    """
+    Cerrado: deja pasar todo. Abierto: rechaza durante `enfriamiento` segundos.
+    Semiabierto: deja pasar una petición de prueba; si funciona se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, umbral_fallos, enfriamiento):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.fallos = 0
+        self.abierto_desde = None
+        self.probando = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.abierto_desde is None:
+                return True
+            if time.monotonic() - self.abierto_desde < self.enfriamiento or self.probando:
+                return False
+            self.probando = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_desde = None
+            self.probando = False
+
+    def fallo(self):
+        """Registra un fallo; devuelve True si el circuito se acaba de abrir."""
+        with self._lock:
+            self.fallos += 1
+            reabierto = self.probando
+            self.probando = False
+            if reabierto or (self.abierto_desde is None and self.fallos >= self.umbral_fallos):
+                self.abierto_desde = time.monotonic()
+                return True
+            return False
+
+
+def _segundos_retry_after(valor):
+    """Retry-After puede venir en segundos o como fecha HTTP."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ClienteHTTP:
+    """Sesión con pool de conexiones, límite por host, reintentos y cortacircuitos."""
+
+    def __init__(self, tasa_por_host=None, rafaga=None, reintentos=None, backoff_base=0.5,
+                 backoff_maximo=30, umbral_fallos=5, enfriamiento=60, timeout=30, conexiones_por_host=10):
+        self.tasa_por_host = tasa_por_host or float(os.getenv("HTTP_TASA_POR_HOST", "5"))
+        self.rafaga = rafaga or int(os.getenv("HTTP_RAFAGA", "10"))
+        self.reintentos = reintentos if reintentos is not None else int(os.getenv("HTTP_REINTENTOS", "4"))
+        self.backoff_base = backoff_base
+        self.backoff_maximo = backoff_maximo
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.timeout = timeout
+
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=conexiones_por_host, pool_maxsize=conexiones_por_host)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+
+        self._cubetas = {}
+        self._circuitos = {}
+        self._lock = threading.Lock()
+
+    def _por_host(self, host):
+        with self._lock:
+            if host not in self._cubetas:
+                self._cubetas[host] = CubetaTokens(self.tasa_por_host, self.rafaga)
+                self._circuitos[host] = Cortacircuitos(self.umbral_fallos, self.enfriamiento)
+            return self._cubetas[host], self._circuitos[host]
+
+    def _espera(self, intento, respuesta=None):
+        if respuesta is not None:
+            retry_after = _segundos_retry_after(respuesta.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, ESPERA_MAXIMA_RETRY_AFTER)
+        # Backoff exponencial con "full jitter"
+        return random.uniform(0, min(self.backoff_maximo, self.backoff_base * (2 ** intento)))
+
+    def peticion(self, metodo, url, **kwargs):
+        """
+        Igual que requests.Session.request, con límite, reintentos y cortacircuitos.
+        Si se agotan los reintentos con un estado reintentable devuelve la última respuesta
+        (el llamador decide con raise_for_status); los errores de red se relanzan.
+        :raises CircuitoAbierto: Si el host está en enfriamiento.
+        """
+        host = urlparse(url).netloc
+        cubeta, circuito = self._por_host(host)
+        kwargs.setdefault("timeout", self.timeout)
+
+        for intento in range(self.reintentos + 1):
+            if not circuito.permitir():
+                metricas.contador("http_rechazos_circuito", host=host)
+                raise CircuitoAbierto("Circuito abierto para %s" % host)
+            cubeta.tomar()
+
+            respuesta, error = None, None
+            try:
+                respuesta = self.sesion.request(metodo, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception:
+                # Cualquier otro error (redirecciones, URL inválida...) también cierra la prueba
+                # del estado semiabierto; si no, el host quedaría rechazado para siempre
+                circuito.fallo()
+                raise
+
+            if error is None and respuesta.status_code not in ESTADOS_REINTENTABLES:
+                circuito.exito()
+                return respuesta
+
+            # 429 indica que vamos demasiado rápido, no que el host esté caído
+            if error is None and respuesta.status_code == 429:
+                circuito.exito()
+            elif circuito.fallo():
+                metricas.contador("http_circuitos_abiertos", host=host)
+                logger.warning("Circuito abierto para %s durante %ss", host, self.enfriamiento)
+            if intento == self.reintentos:
+                if error is not None:
+                    raise error
+                return respuesta
+
+            espera = self._espera(intento, respuesta)
+            metricas.contador("http_reintentos", host=host)
+            logger.info("Reintento %d/%d de %s en %.1fs (%s)", intento + 1, self.reintentos, url, espera,
+                        error if error is not None else respuesta.status_code)
+            if respuesta is not None:
+                # Devuelve la conexión al pool (importa con stream=True)
+                respuesta.close()
+            time.sleep(espera)
+
+    def get(self, url, **kwargs):
+        return self.peticion("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.peticion("HEAD", url, **kwargs)
+
+
+_cliente = None
+_lock_cliente = threading.Lock()
+
+
+def obtener_cliente():
+    """Cliente compartido del proceso (se crea en el primer uso)."""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is None:
+            _cliente = ClienteHTTP()
+        return _cliente
+
+
+def configurar_cliente(**opciones):
+    """Reemplaza el cliente compartido (p. ej. otra tasa por host); devuelve el nuevo cliente."""
+    global _cliente
+    with _lock_cliente:
+        _cliente = ClienteHTTP(**opciones)
+        return _cliente
+
+
+def get(url, **kwargs):
+    """Atajo para obtener_cliente().get(...), con la misma firma que requests.get."""
+    return obtener_cliente().get(url, **kwargs)
+
+
+def get_lista_paginada(url, limite=500, **kwargs):
+    """
+    Lista JSON completa de un endpoint paginado por cursor como /data/files.json: sigue la
+    cabecera X-Siguiente (?despues=) hasta la última página. Un archivo estático sin cabecera
+    se lee en una sola petición.
+    :raises requests.HTTPError: Si alguna página responde con error (nunca devuelve una lista a medias).
+    """
+    elementos = []
+    parametros = {"limite": limite}
+    vistos = set()
+    while True:
+        respuesta = get(url, params=parametros, **kwargs)
+        respuesta.raise_for_status()
+        elementos.extend(respuesta.json())
+        siguiente = respuesta.headers.get("X-Siguiente")
+        if not siguiente or siguiente in vistos:
+            return elementos
+        vistos.add(siguiente)
+        parametros = {"limite": limite, "despues": siguiente}
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Recuerda por URL qué nivel de obtención funcionó: "http" (requests + parseo) o "navegador" (Selenium)
+# El estado se guarda en data/niveles_obtencion.json, así la siguiente ejecución va directo al nivel correcto:
+#   {"http://localhost:5500/": {"nivel": "http", "archivos": 7, "fecha": "2026-10-19T10:00:00"}}
+# Las páginas que solo funcionan con JavaScript se pueden marcar con PAGINAS_SOLO_JS (prefijos separados por comas).
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from db.logger import logger
+
+NIVEL_HTTP = "http"
+NIVEL_NAVEGADOR = "navegador"
+
+RUTA_ESTADO = os.getenv("NIVELES_ESTADO") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'niveles_obtencion.json')
+PAGINAS_SOLO_JS = [p.strip() for p in os.getenv("PAGINAS_SOLO_JS", "").split(",") if p.strip()]
+# Una página que necesitó navegador se vuelve a intentar por HTTP pasado este tiempo
+REVALIDAR_DIAS = 7
+
+_lock_estado = threading.Lock()
+
+
+def cargar_estado(ruta=RUTA_ESTADO):
+    """Devuelve el estado guardado, o un diccionario vacío si no existe o está dañado."""
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning("No se pudo leer el estado de niveles %s: %s", ruta, e)
+        return {}
+
+
+def guardar_estado(estado, ruta=RUTA_ESTADO):
+    """Escritura atómica del estado; un fallo solo se registra, nunca interrumpe el scraping."""
+    try:
+        with _lock_estado:
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+            temporal = ruta + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(estado, f, indent=2, ensure_ascii=False)
+            os.replace(temporal, ruta)
+    except Exception as e:
+        logger.warning("No se pudo guardar el estado de niveles %s: %s", ruta, e)
+
+
+def es_solo_js(url, paginas_solo_js=None):
+    paginas = PAGINAS_SOLO_JS if paginas_solo_js is None else paginas_solo_js
+    return any(url.startswith(prefijo) for prefijo in paginas)
+
+
+def nivel_preferido(url, estado, paginas_solo_js=None):
+    """Nivel con el que conviene empezar para esta URL."""
+    if es_solo_js(url, paginas_solo_js):
+        return NIVEL_NAVEGADOR
+    registro = estado.get(url)
+    if not registro or registro.get("nivel") != NIVEL_NAVEGADOR:
+        return NIVEL_HTTP
+    try:
+        vencido = datetime.now() - datetime.fromisoformat(registro["fecha"]) > timedelta(days=REVALIDAR_DIAS)
+    except (KeyError, TypeError, ValueError):
+        vencido = True
+    return NIVEL_HTTP if vencido else NIVEL_NAVEGADOR
+
+
+def archivos_esperados(url, estado):
+    """Cantidad de archivos vista en la última ejecución (0 si no hay registro)."""
+    return (estado.get(url) or {}).get("archivos", 0)
+
+
+def registrar_nivel(url, nivel, archivos, estado):
+    estado[url] = {"nivel": nivel, "archivos": archivos, "fecha": datetime.now().isoformat()}
+    logger.info("Nivel '%s' registrado para %s (%d archivos)", nivel, url, archivos)
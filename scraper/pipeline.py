@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# Pipeline productor/consumidor por etapas
+# Cada etapa corre en sus propios hilos y se comunica con la siguiente por una cola acotada; la
+# última es un escritor que agrupa elementos y los guarda por lotes. Así el navegador sigue
+# navegando mientras se parsea y se escribe en la base, y el tiempo total se acerca al de la
+# etapa más lenta en lugar de la suma de todas. Si una etapa se atrasa, su cola se llena y la
+# anterior se bloquea al poner (contrapresión) en vez de acumular memoria sin límite.
+#
+#     pipeline = (Pipeline("productos")
+#                 .etapa("extraccion", extraer)            # elemento -> lista de elementos
+#                 .etapa("normalizacion", normalizar)
+#                 .escritor("guardado", guardar_lote, tamano_lote=100))
+#     with pipeline:
+#         pipeline.poner(pagina)
+#
+# Al salir del `with` (también por excepción) las colas se vacían en orden y se escribe el último lote.
+import contextvars
+import queue
+import threading
+import time
+
+from db.logger import logger
+from db.metricas import registro as metricas
+
+CAPACIDAD_COLA = 100
+_FIN = object()
+
+
+class Etapa:
+    """Hilos que aplican `funcion` a cada elemento de su cola y pasan los resultados a la etapa siguiente."""
+
+    def __init__(self, pipeline, nombre, funcion, hilos=1, capacidad=CAPACIDAD_COLA):
+        self.pipeline = pipeline
+        self.nombre = nombre
+        self.funcion = funcion
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.destino = None
+        self.cantidad_hilos = hilos
+        self.hilos = []
+
+    def _medir_cola(self):
+        metricas.valor("pipeline_cola", self.cola.qsize(), pipeline=self.pipeline, etapa=self.nombre)
+
+    def poner(self, elemento):
+        """Encola un elemento; si la cola está llena espera a que la etapa avance."""
+        try:
+            self.cola.put_nowait(elemento)
+        except queue.Full:
+            inicio = time.perf_counter()
+            self.cola.put(elemento)
+            metricas.observar("pipeline_espera_segundos", time.perf_counter() - inicio,
+                              pipeline=self.pipeline, etapa=self.nombre)
+        self._medir_cola()
+
+    def iniciar(self):
+        # Cada hilo corre en una copia del contexto de quien inicia: run_id y etapa llegan a los
+        # registros del log y a lo que se guarda en la base desde las etapas
+        self.hilos = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._trabajar,),
+                             name="%s-%s-%d" % (self.pipeline, self.nombre, i), daemon=True)
+            for i in range(self.cantidad_hilos)
+        ]
+        for hilo in self.hilos:
+            hilo.start()
+
+    def _trabajar(self):
+        while True:
+            elemento = self.cola.get()
+            self._medir_cola()
+            if elemento is _FIN:
+                return
+            try:
+                # La función devuelve un iterable; None o [] descartan el elemento
+                resultados = self.funcion(elemento)
+            except Exception:
+                # Un elemento que falla no detiene el pipeline
+                logger.exception("[%s] Error en la etapa %s", self.pipeline, self.nombre)
+                metricas.contador("pipeline_errores", pipeline=self.pipeline, etapa=self.nombre)
+                continue
+            metricas.contador("pipeline_procesados", pipeline=self.pipeline, etapa=self.nombre)
+            if resultados and self.destino is not None:
+                for resultado in resultados:
+                    self.destino.poner(resultado)
+
+    def cerrar(self):
+        """Procesa lo que quede en la cola y termina los hilos."""
+        for _ in self.hilos:
+            self.cola.put(_FIN)
+        for hilo in self.hilos:
+            hilo.join()
+
+
+class EscritorPorLotes(Etapa):
+    """
+    Última etapa: junta hasta `tamano_lote` elementos (o lo que llegue en `espera_maxima` segundos)
+    y llama a `escribir_lote(lista)` una vez por lote, p. ej. una sola transacción en la base.
+    """
+
+    def __init__(self, pipeline, nombre, escribir_lote, tamano_lote=50, espera_maxima=1.0,
+                 capacidad=CAPACIDAD_COLA * 5):
+        super().__init__(pipeline, nombre, escribir_lote, hilos=1, capacidad=capacidad)
+        self.tamano_lote = tamano_lote
+        self.espera_maxima = espera_maxima
+
+    def _escribir(self, lote):
+        if not lote:
+            return
+        inicio = time.perf_counter()
+        try:
+            self.funcion(lote)
+        except Exception:
+            logger.exception("[%s] Error escribiendo un lote de %d elementos", self.pipeline, len(lote))
+            metricas.contador("pipeline_errores", pipeline=self.pipeline, etapa=self.nombre)
+            return
+        metricas.contador("pipeline_procesados", len(lote), pipeline=self.pipeline, etapa=self.nombre)
+        metricas.observar("pipeline_lote_segundos", time.perf_counter() - inicio, pipeline=self.pipeline, etapa=self.nombre)
+
+    def _trabajar(self):
+        lote, vence = [], None
+        while True:
+            espera = None if not lote else max(vence - time.monotonic(), 0)
+            try:
+                elemento = self.cola.get(timeout=espera)
+            except queue.Empty:
+                # Venció la espera máxima: se escribe el lote incompleto
+                self._escribir(lote)
+                lote, vence = [], None
+                continue
+            self._medir_cola()
+            if elemento is _FIN:
+                self._escribir(lote)
+                return
+            if not lote:
+                vence = time.monotonic() + self.espera_maxima
+            lote.append(elemento)
+            if len(lote) >= self.tamano_lote:
+                self._escribir(lote)
+                lote, vence = [], None
+
+
+class Pipeline:
+    def __init__(self, nombre, capacidad=CAPACIDAD_COLA):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.etapas = []
+        self.iniciado = False
+
+    def _agregar(self, etapa):
+        if self.iniciado:
+            raise RuntimeError("No se pueden agregar etapas a un pipeline en marcha")
+        if self.etapas:
+            if isinstance(self.etapas[-1], EscritorPorLotes):
+                raise RuntimeError("El escritor por lotes debe ser la última etapa")
+            self.etapas[-1].destino = etapa
+        self.etapas.append(etapa)
+        return self
+
+    def etapa(self, nombre, funcion, hilos=1, capacidad=None):
+        """Agrega una etapa; `funcion(elemento)` devuelve la lista de elementos para la siguiente."""
+        return self._agregar(Etapa(self.nombre, nombre, funcion, hilos, capacidad or self.capacidad))
+
+    def escritor(self, nombre, escribir_lote, tamano_lote=50, espera_maxima=1.0, capacidad=None):
+        """Agrega la etapa final que escribe por lotes."""
+        return self._agregar(EscritorPorLotes(self.nombre, nombre, escribir_lote, tamano_lote, espera_maxima,
+                                              capacidad or self.capacidad * 5))
+
+    def iniciar(self):
+        if not self.etapas:
+            raise RuntimeError("El pipeline no tiene etapas")
+        for etapa in self.etapas:
+            etapa.iniciar()
+        self.iniciado = True
+
+    def poner(self, elemento):
+        """Entrega un elemento a la primera etapa (bloquea si está llena)."""
+        self.etapas[0].poner(elemento)
+
+    def cerrar(self):
+        """Vacía las etapas en orden (cada una termina antes de cerrar la siguiente) y escribe el último lote."""
+        if not self.iniciado:
+            return
+        inicio = time.perf_counter()
+        for etapa in self.etapas:
+            etapa.cerrar()
+        self.iniciado = False
+        logger.debug("[%s] Pipeline vaciado en %.3f s", self.nombre, time.perf_counter() - inicio)
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
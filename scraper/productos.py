@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Extracción de productos a partir del HTML renderizado de un listado
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from db.logger import logger
+
+# Selectores conocidos por estructura: contenedor de la tarjeta y un selector por campo
+SELECTORES_MAGENTO = {
+    "contenedor": "li.product-item",
+    "titulo": ".product-item-name a",
+    "precio": ".special-price .price",
+    "imagen_url": "img.product-image-photo",
+    "url": "a.product-item-link",
+}
+SELECTORES_SPA = {
+    "contenedor": "li.ais-Hits-item",
+    "titulo": "h3.result-title",
+    "precio": ".after_special",
+    "imagen_url": ".result-thumbnail img",
+    "url": "a.result",
+}
+ESTRUCTURAS = {"MAGENTO": SELECTORES_MAGENTO, "SPA": SELECTORES_SPA}
+
+# Campos que se piden al LLM cuando las estructuras conocidas dejan de funcionar
+OBJETIVOS_PRODUCTO = {
+    "titulo": "nombre del producto",
+    "precio": "precio final del producto",
+    "imagen_url": "imagen principal del producto (etiqueta img)",
+    "url": "enlace a la página del producto (etiqueta a)",
+}
+# Atributo de donde se lee cada campo; el resto se lee como texto
+ATRIBUTOS = {"imagen_url": "src", "url": "href"}
+
+
+def _leer_campo(tarjeta, campo, selector, url_base):
+    """Lee un campo de la tarjeta; lanza ValueError si el selector no encuentra nada."""
+    elemento = tarjeta.select_one(selector)
+    if elemento is None:
+        raise ValueError(f"'{selector}' no encontrado para {campo}")
+    if campo in ATRIBUTOS:
+        valor = elemento.get(ATRIBUTOS[campo]) or ""
+        return urljoin(url_base, valor) if url_base and valor else valor
+    return elemento.get_text(" ", strip=True)
+
+
+def extraer_de_tarjeta(tarjeta, selectores, url_base=None):
+    """Extrae un producto de una tarjeta con un juego de selectores {campo: selector}."""
+    return {
+        campo: _leer_campo(tarjeta, campo, selectores[campo], url_base)
+        for campo in OBJETIVOS_PRODUCTO
+    }
+
+
+def extraer_productos_de_html(html, url_base=None, selectores_respaldo=None):
+    """
+    Extrae los productos de un listado usando las estructuras conocidas (Magento y SPA/Algolia).
+    :param selectores_respaldo: {firma: {campo: selector}} inferidos por el LLM; solo se usan
+        si ninguna estructura conocida encuentra productos.
+    """
+    sopa = BeautifulSoup(html, "html.parser")
+    productos = []
+
+    for estructura, selectores in ESTRUCTURAS.items():
+        for tarjeta in sopa.select(selectores["contenedor"]):
+            try:
+                productos.append(extraer_de_tarjeta(tarjeta, selectores, url_base))
+            except Exception as e:
+                logger.warning("[%s] Producto con error: %s", estructura, e)
+
+    if not productos and selectores_respaldo:
+        productos = extraer_con_respaldo(sopa, selectores_respaldo, url_base)
+
+    return productos
+
+
+
+def normalizar_producto(producto):
+    """Colapsa espacios en los campos de texto; devuelve None si el producto no tiene título."""
+    normalizado = {
+        campo: " ".join(valor.split()) if isinstance(valor, str) else valor
+        for campo, valor in producto.items()
+    }
+    if not normalizado.get("titulo"):
+        return None
+    return normalizado
+
+def extraer_con_respaldo(sopa, selectores_respaldo, url_base=None):
+    """Aplica los selectores inferidos a cada tarjeta cuya plantilla tenga selectores completos."""
+    from llm.agrupador_plantillas import detectar_fragmentos_repetidos
+
+    productos = []
+    for firma, tarjetas in detectar_fragmentos_repetidos(sopa).items():
+        selectores = selectores_respaldo.get(firma)
+        if not selectores or any(campo not in selectores for campo in OBJETIVOS_PRODUCTO):
+            continue
+        for tarjeta in tarjetas:
+            try:
+                productos.append(extraer_de_tarjeta(tarjeta, selectores, url_base))
+            except Exception as e:
+                logger.warning("[RESPALDO] Producto con error: %s", e)
+    return productos
+
+
+def inferir_selectores_respaldo(html, cache=None):
+    """
+    Infiere selectores de producto para las plantillas repetidas del listado.
+    Hace una llamada al LLM por maqueta distinta, no por tarjeta.
+    :param cache: {firma: {campo: selector}} de llamadas anteriores; evita repetir plantillas.
+    :return: {firma: {campo: selector}} con los campos validados.
+    """
+    from llm.agrupador_plantillas import detectar_fragmentos_repetidos, inferir_selectores
+
+    grupos = detectar_fragmentos_repetidos(html)
+    return inferir_selectores(grupos, OBJETIVOS_PRODUCTO, cache=cache)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Reprocesa snapshots archivados sin navegador, repartiendo el parseo entre varios procesos
+# Útil tras corregir un selector: el trabajo pasa a ser CPU y escala con los núcleos.
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from db.logger import logger
+from scraper.snapshots import CARPETA_SNAPSHOTS, leer_snapshot, listar_snapshots
+
+TIPOS_PRODUCTOS = ("listado", "spa")
+TIPOS_ARCHIVOS = ("archivos", "spa")
+
+
+def _procesar(trabajo):
+    """Se ejecuta en un proceso hijo: extrae productos y/o archivos de un snapshot."""
+    # Importaciones dentro del proceso hijo para no cargar nada innecesario en el padre
+    from scraper.productos import extraer_productos_de_html
+    from scraper.enlaces import extraer_enlaces_archivos
+
+    entrada, carpeta, selectores_respaldo = trabajo
+    html = leer_snapshot(entrada, carpeta)
+    resultado = {"sha256": entrada["sha256"], "productos": [], "archivos": {}}
+    if entrada["tipo"] in TIPOS_PRODUCTOS:
+        resultado["productos"] = extraer_productos_de_html(html, entrada["url"], selectores_respaldo)
+    if entrada["tipo"] in TIPOS_ARCHIVOS:
+        resultado["archivos"] = extraer_enlaces_archivos(html, entrada["url"])
+    return resultado
+
+
+def reprocesar_snapshots(desde=None, hasta=None, url=None, tipos=None, procesos=None,
+                         selectores_respaldo=None, carpeta=CARPETA_SNAPSHOTS):
+    """
+    Vuelve a extraer productos y archivos de los snapshots que cumplen los filtros.
+    Cada contenido distinto se parsea una sola vez aunque se haya capturado en varias ejecuciones.
+    :return: Lista de {"entrada", "productos", "archivos"} en el orden del índice.
+    """
+    entradas = listar_snapshots(desde, hasta, url, tipos, carpeta)
+    unicas = {}
+    for entrada in entradas:
+        unicas.setdefault(entrada["sha256"], entrada)
+
+    procesos = procesos or os.cpu_count() or 1
+    logger.info("Reprocesando %d snapshots (%d contenidos distintos) con %d procesos",
+                len(entradas), len(unicas), procesos)
+
+    trabajos = [(entrada, carpeta, selectores_respaldo) for entrada in unicas.values()]
+    por_sha = {}
+    if procesos == 1:
+        for trabajo in trabajos:
+            resultado = _procesar(trabajo)
+            por_sha[resultado["sha256"]] = resultado
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            # Lotes para no pagar un viaje entre procesos por cada página pequeña
+            lote = max(1, len(trabajos) // (procesos * 4))
+            for resultado in pool.map(_procesar, trabajos, chunksize=lote):
+                por_sha[resultado["sha256"]] = resultado
+
+    return [
+        {"entrada": entrada, "productos": por_sha[entrada["sha256"]]["productos"],
+         "archivos": por_sha[entrada["sha256"]]["archivos"]}
+        for entrada in entradas
+    ]
+
+
+def resumir(resultados):
+    """Totales por tipo de snapshot para mostrar al terminar."""
+    resumen = Counter()
+    for resultado in resultados:
+        resumen["snapshots"] += 1
+        resumen["productos"] += len(resultado["productos"])
+        resumen["archivos"] += len(resultado["archivos"])
+    return dict(resumen)
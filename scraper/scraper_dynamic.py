@@ -4,23 +4,33 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import requests, hashlib, os, time, json
+import hashlib, os, time, json
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from db.database import obtener_conexion, guardar_archivo
-from db.logger import logger
+from db.catalogo import quitar_del_catalogo, registrar_en_catalogo
+from db.logger import logger, configurar_logging
+from db.metricas import registro as metricas
+from scraper import http_cliente
+from scraper.descargas import descargar_archivo
+from scraper.enlaces import descubrir_enlaces
+from scraper.pipeline import Pipeline
+from scraper.niveles import (NIVEL_HTTP, NIVEL_NAVEGADOR, archivos_esperados, cargar_estado,
+                             guardar_estado, nivel_preferido, registrar_nivel)
+from scraper.snapshots import guardar_snapshot
 from datetime import datetime
 
 BASE_URL = "http://localhost:5500/"  # Puerto donde corre el frontend Flask EN EL CUAL ESTA CORRIENDO EL FRONTEND
 CARPETA_DESCARGAS = "descargas_dinamicas"
 TIEMPO_ESPERA = 10  # Segundos para esperar elementos
 SCROLL_PAUSA = 2    # Pausa entre scrolls para cargar contenido lazy
+HILOS_DESCARGA = 4  # Descargas simultáneas (el límite por host lo sigue poniendo http_cliente)
+TAMANO_LOTE_REGISTRO = 20
 
 # Configuración de Chrome para Selenium
 def configurar_driver():
@@ -46,7 +56,7 @@ def configurar_driver():
         driver = webdriver.Chrome(options=chrome_options)
         return driver
     except Exception as e:
-        logger.error(f"Error configurando Chrome driver: {e}")
+        logger.error("Error configurando Chrome driver: %s", e)
         return None
 
 # Generar hash SHA-256 del contenido del archivo
@@ -72,7 +82,7 @@ def hacer_scroll_completo(driver):
         
         # Obtener nueva altura
         altura_actual = driver.execute_script("return document.body.scrollHeight")
-        logger.debug(f"Altura de página: {altura_actual}")
+        logger.debug("Altura de página: %s", altura_actual)
     
     # Volver al inicio
     driver.execute_script("window.scrollTo(0, 0);")
@@ -99,13 +109,13 @@ def esperar_elementos_dinamicos(driver):
         for selector in selectores:
             try:
                 wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                logger.debug(f"Elementos encontrados con selector: {selector}")
+                logger.debug("Elementos encontrados con selector: %s", selector)
                 break
             except TimeoutException:
                 continue
                 
     except Exception as e:
-        logger.warning(f"Timeout esperando elementos dinámicos: {e}")
+        logger.warning("Timeout esperando elementos dinámicos: %s", e)
 
 # Extraer archivos de JavaScript/AJAX responses
 def extraer_archivos_ajax(driver):
@@ -130,89 +140,91 @@ def extraer_archivos_ajax(driver):
                 resultado = driver.execute_script(script)
                 if resultado and isinstance(resultado, list):
                     archivos_ajax.extend(resultado)
-                    logger.info(f"Encontrados {len(resultado)} archivos via JavaScript")
+                    logger.info("Encontrados %d archivos via JavaScript", len(resultado))
             except Exception as e:
-                logger.debug(f"Script fallido: {script[:50]}... Error: {e}")
+                logger.debug("Script fallido: %s... Error: %s", script[:50], e)
                 
     except Exception as e:
-        logger.warning(f"Error extrayendo archivos AJAX: {e}")
+        logger.warning("Error extrayendo archivos AJAX: %s", e)
     
     return archivos_ajax
 
-# Función principal para raspar sitio dinámico
-def raspar_sitio_dinamico():
-    """Función principal para realizar scraping dinámico"""
-    
-    # Crear carpeta de descargas
-    if not os.path.exists(CARPETA_DESCARGAS):
-        os.makedirs(CARPETA_DESCARGAS)
-    
-    # Crear tabla de base de datos
+# Nivel 1: obtener los archivos sin navegador
+def obtener_archivos_http(url):
+    """
+    Descarga el HTML sin ejecutar JavaScript y busca enlaces, data-attributes y el endpoint data/files.json.
+    :return: {nombre: {'url', 'metodo'}}; vacío si la página necesita navegador o falla la descarga.
+    """
+    archivos_encontrados = {}
     try:
-        conn = obtener_conexion()
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS archivos_dinamicos (
-                id SERIAL PRIMARY KEY,
-                nombre_archivo TEXT,
-                url TEXT,
-                sha256 TEXT,
-                metodo_extraccion TEXT,
-                fecha_descarga TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ultima_vista TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-        conn.commit()
-        cur.close()
-        conn.close()
+        with metricas.temporizador("carga_pagina", sitio="dinamico", nivel=NIVEL_HTTP):
+            respuesta = http_cliente.get(url, timeout=30)
+            respuesta.raise_for_status()
+        html = respuesta.text
+        guardar_snapshot(url, html, tipo="archivos")
+        with metricas.temporizador("parseo_html", sitio="dinamico", nivel=NIVEL_HTTP):
+            archivos_html, archivos_data = descubrir_enlaces(html, url)
+        archivos_encontrados.update(archivos_html)
+        archivos_encontrados.update(archivos_data)
     except Exception as e:
-        logger.exception("Error creando tabla archivos_dinamicos")
-        return
-    
-    # Configurar driver
+        logger.warning("No se pudo obtener %s por HTTP: %s", url, e)
+        return {}
+
+    # Mismo endpoint que consulta el frontend con JavaScript (paginado: se recorren todas las páginas)
+    try:
+        for archivo_info in http_cliente.get_lista_paginada(urljoin(url, "data/files.json"), timeout=30):
+            if isinstance(archivo_info, dict) and archivo_info.get('url'):
+                url_archivo = urljoin(url, archivo_info['url'])
+                nombre = archivo_info.get('name') or os.path.basename(urlparse(url_archivo).path)
+                if nombre:
+                    archivos_encontrados.setdefault(nombre, {'url': url_archivo, 'metodo': 'JSON_ENDPOINT'})
+    except Exception as e:
+        logger.debug("Sin endpoint data/files.json en %s: %s", url, e)
+
+    logger.info("Nivel HTTP: %d archivos encontrados en %s", len(archivos_encontrados), url)
+    return archivos_encontrados
+
+# Nivel 2: renderizar con Chrome y consultar el estado de JavaScript
+def obtener_archivos_navegador(url):
+    """
+    Carga la página con Selenium, hace scroll y extrae enlaces, data-attributes y archivos AJAX.
+    :return: {nombre: {'url', 'metodo'}}, o None si no se pudo iniciar Chrome o cargar la página.
+    """
     driver = configurar_driver()
     if not driver:
         logger.error("No se pudo configurar el driver de Chrome")
-        return
+        return None
     
     archivos_encontrados = {}
     
     try:
-        logger.info("Iniciando raspado dinámico...")
+        logger.info("Iniciando raspado dinámico con navegador...")
         
         # Cargar página principal
-        driver.get(BASE_URL)
-        logger.info(f"Página cargada: {BASE_URL}")
-        
-        # Esperar elementos dinámicos
-        esperar_elementos_dinamicos(driver)
+        with metricas.temporizador("carga_pagina", sitio="dinamico", nivel=NIVEL_NAVEGADOR):
+            driver.get(url)
+            logger.info("Página cargada: %s", url)
+            
+            # Esperar elementos dinámicos
+            esperar_elementos_dinamicos(driver)
         
         # Hacer scroll completo
-        hacer_scroll_completo(driver)
+        with metricas.temporizador("scroll", sitio="dinamico"):
+            hacer_scroll_completo(driver)
         
         # Esperar un poco más para asegurar carga completa
         time.sleep(3)
         
-        # Obtener HTML renderizado
+        # Obtener HTML renderizado y archivarlo para poder reprocesarlo sin navegador
         html_renderizado = driver.page_source
-        soup = BeautifulSoup(html_renderizado, "html.parser")
+        guardar_snapshot(url, html_renderizado, tipo="archivos")
+        # Una sola pasada sobre el HTML para enlaces y data-attributes
+        with metricas.temporizador("parseo_html", sitio="dinamico", nivel=NIVEL_NAVEGADOR):
+            archivos_html, archivos_data = descubrir_enlaces(html_renderizado, url)
         
         # 1. Extraer enlaces estáticos del HTML renderizado
         logger.info("Extrayendo enlaces del HTML renderizado...")
-        enlaces = soup.find_all("a", href=True)
-        
-        for enlace in enlaces:
-            href = enlace["href"]
-            if any(href.lower().endswith(ext) for ext in [".pdf", ".jpg", ".png", ".docx", ".zip", ".xlsx"]):
-                url_completa = urljoin(BASE_URL, href)
-                nombre_archivo = os.path.basename(urlparse(url_completa).path)
-                
-                if nombre_archivo:  # Asegurar que tenga nombre
-                    archivos_encontrados[nombre_archivo] = {
-                        'url': url_completa,
-                        'metodo': 'HTML_RENDERIZADO'
-                    }
-                    logger.debug(f"Archivo encontrado en HTML: {nombre_archivo}")
+        archivos_encontrados.update(archivos_html)
         
         # 2. Extraer archivos de respuestas AJAX/JavaScript
         logger.info("Extrayendo archivos de JavaScript/AJAX...")
@@ -228,119 +240,213 @@ def raspar_sitio_dinamico():
                         'url': url_archivo,
                         'metodo': 'AJAX_JS'
                     }
-                    logger.debug(f"Archivo encontrado en AJAX: {nombre}")
+                    logger.debug("Archivo encontrado en AJAX: %s", nombre)
         
         # 3. Buscar elementos con atributos data-* que contengan URLs
         logger.info("Buscando elementos con data-attributes...")
-        elementos_data = soup.find_all(attrs={"data-file": True})
-        elementos_data.extend(soup.find_all(attrs={"data-url": True}))
-        elementos_data.extend(soup.find_all(attrs={"data-download": True}))
-        
-        for elemento in elementos_data:
-            for attr in ['data-file', 'data-url', 'data-download']:
-                if elemento.get(attr):
-                    url_archivo = urljoin(BASE_URL, elemento[attr])
-                    nombre = os.path.basename(urlparse(url_archivo).path)
-                    
-                    if nombre and any(nombre.lower().endswith(ext) for ext in [".pdf", ".jpg", ".png", ".docx", ".zip", ".xlsx"]):
-                        archivos_encontrados[nombre] = {
-                            'url': url_archivo,
-                            'metodo': 'DATA_ATTRIBUTES'
-                        }
-                        logger.debug(f"Archivo encontrado en data-attr: {nombre}")
+        archivos_encontrados.update(archivos_data)
         
-        # 4. Procesar todos los archivos encontrados
-        logger.info(f"Procesando {len(archivos_encontrados)} archivos encontrados...")
+    except Exception as e:
+        logger.exception("Error durante raspado con navegador")
+        # Una carga fallida no es "sin archivos": None evita que la limpieza borre todo
+        return None
         
-        for nombre_archivo, info_archivo in archivos_encontrados.items():
-            try:
-                url_archivo = info_archivo['url']
-                metodo = info_archivo['metodo']
-                ruta_local = os.path.join(CARPETA_DESCARGAS, nombre_archivo)
-                
-                # Descargar archivo
-                response = requests.get(url_archivo, timeout=30)
-                response.raise_for_status()
-                
-                contenido = response.content
-                sha256 = hash_archivo(contenido)
-                
-                # Verificar en base de datos
-                conn = obtener_conexion()
-                cur = conn.cursor()
-                cur.execute("SELECT sha256 FROM archivos_dinamicos WHERE nombre_archivo = %s;", (nombre_archivo,))
-                resultado = cur.fetchone()
-                
-                if resultado is None:
-                    # Archivo nuevo
-                    with open(ruta_local, "wb") as f:
-                        f.write(contenido)
-                    
-                    cur.execute(
-                        "INSERT INTO archivos_dinamicos (nombre_archivo, url, sha256, metodo_extraccion) VALUES (%s, %s, %s, %s);",
-                        (nombre_archivo, url_archivo, sha256, metodo)
-                    )
-                    logger.info(f"[NUEVO][{metodo}] {nombre_archivo} descargado")
-                    
-                elif resultado[0] != sha256:
-                    # Archivo modificado
-                    with open(ruta_local, "wb") as f:
-                        f.write(contenido)
-                    
-                    cur.execute(
-                        "UPDATE archivos_dinamicos SET sha256 = %s, ultima_vista = CURRENT_TIMESTAMP WHERE nombre_archivo = %s;",
-                        (sha256, nombre_archivo)
-                    )
-                    logger.warning(f"[CAMBIADO][{metodo}] {nombre_archivo} actualizado")
-                    
-                else:
-                    # Archivo sin cambios
-                    cur.execute(
-                        "UPDATE archivos_dinamicos SET ultima_vista = CURRENT_TIMESTAMP WHERE nombre_archivo = %s;",
-                        (nombre_archivo,)
-                    )
-                    logger.debug(f"[SIN_CAMBIOS][{metodo}] {nombre_archivo}")
+    finally:
+        # Cerrar driver
+        driver.quit()
+        logger.info("Driver de Chrome cerrado")
+    
+    return archivos_encontrados
+
+def descargar_archivo_dinamico(nombre_archivo, info_archivo):
+    """Descarga un archivo (reanudable: si se corta, se retoma desde el .part); lanza si falla."""
+    metodo = info_archivo['metodo']
+    with metricas.temporizador("descarga_archivo", sitio="dinamico", origen=metodo):
+        descarga = descargar_archivo(info_archivo['url'], os.path.join(CARPETA_DESCARGAS, nombre_archivo))
+    metricas.contador("archivos_descargados", sitio="dinamico", origen=metodo)
+    metricas.contador("bytes_descargados", descarga["bytes_transferidos"], sitio="dinamico", origen=metodo)
+    return descarga
+
+def _descargar(elemento):
+    """Etapa de descarga del pipeline: un archivo que falla se registra en el log y se omite."""
+    nombre_archivo, info_archivo = elemento
+    try:
+        descarga = descargar_archivo_dinamico(nombre_archivo, info_archivo)
+    except Exception as e:
+        logger.error("Error procesando %s: %s", nombre_archivo, e)
+        return []
+    return [(nombre_archivo, info_archivo, descarga)]
+
+def procesar_archivo_dinamico(nombre_archivo, info_archivo):
+    """Descarga y registra un solo archivo (lo usa el trabajador de la cola)."""
+    descarga = descargar_archivo_dinamico(nombre_archivo, info_archivo)
+    _registrar_descargas([(nombre_archivo, info_archivo, descarga)])
+    return descarga["sha256"]
+
+def _registrar_descargas(lote):
+    """Escritor del pipeline: registra un lote de descargas con una sola conexión y transacción."""
+    conn = obtener_conexion()
+    cur = conn.cursor()
+    try:
+        for nombre_archivo, info_archivo, descarga in lote:
+            url_archivo = info_archivo['url']
+            metodo = info_archivo['metodo']
+            sha256 = descarga["sha256"]
+            
+            cur.execute("SELECT sha256 FROM archivos_dinamicos WHERE nombre_archivo = %s;", (nombre_archivo,))
+            resultado = cur.fetchone()
+            
+            if resultado is None:
+                # Archivo nuevo (ya quedó en la carpeta de descargas)
+                cur.execute(
+                    "INSERT INTO archivos_dinamicos (nombre_archivo, url, sha256, metodo_extraccion) VALUES (%s, %s, %s, %s);",
+                    (nombre_archivo, url_archivo, sha256, metodo)
+                )
+                logger.info("[NUEVO][%s] %s descargado", metodo, nombre_archivo)
                 
-                conn.commit()
-                cur.close()
-                conn.close()
+            elif resultado[0] != sha256:
+                # Archivo modificado (ya quedó en la carpeta de descargas)
+                cur.execute(
+                    "UPDATE archivos_dinamicos SET sha256 = %s, ultima_vista = CURRENT_TIMESTAMP WHERE nombre_archivo = %s;",
+                    (sha256, nombre_archivo)
+                )
+                logger.warning("[CAMBIADO][%s] %s actualizado", metodo, nombre_archivo)
                 
-            except Exception as e:
-                logger.error(f"Error procesando {nombre_archivo}: {e}")
+            else:
+                # Archivo sin cambios
+                cur.execute(
+                    "UPDATE archivos_dinamicos SET ultima_vista = CURRENT_TIMESTAMP WHERE nombre_archivo = %s;",
+                    (nombre_archivo,)
+                )
+                logger.debug("[SIN_CAMBIOS][%s] %s", metodo, nombre_archivo)
+            
+            # Catálogo unificado: tamaño y tipo MIME se toman de esta descarga
+            registrar_en_catalogo(cur, "dinamico", nombre_archivo, url_archivo, sha256, descarga["bytes"],
+                                  descarga["content_type"], metodo)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+def asegurar_tabla_dinamica():
+    """Crea la carpeta de descargas y la tabla archivos_dinamicos; devuelve False si no se pudo."""
+    if not os.path.exists(CARPETA_DESCARGAS):
+        os.makedirs(CARPETA_DESCARGAS)
+    try:
+        conn = obtener_conexion()
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS archivos_dinamicos (
+                id SERIAL PRIMARY KEY,
+                nombre_archivo TEXT,
+                url TEXT,
+                sha256 TEXT,
+                metodo_extraccion TEXT,
+                fecha_descarga TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ultima_vista TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+        conn.commit()
+        cur.close()
+        conn.close()
+        return True
+    except Exception as e:
+        logger.exception("Error creando tabla archivos_dinamicos")
+        return False
+
+def descubrir_archivos_dinamicos(url=BASE_URL):
+    """
+    Lista de archivos del sitio con el nivel más barato que funcione.
+    Nivel 1: HTTP simple; nivel 2: Chrome solo si hace falta (o si la página está marcada como solo JS).
+    :return: ({nombre: {"url", "metodo"}}, nivel) o (None, nivel) si no se pudo obtener nada.
+    """
+    estado = cargar_estado()
+    nivel = nivel_preferido(url, estado)
+    archivos_encontrados = {}
+    if nivel == NIVEL_HTTP:
+        archivos_encontrados = obtener_archivos_http(url)
+        esperados = archivos_esperados(url, estado)
+        if not archivos_encontrados or len(archivos_encontrados) < esperados:
+            logger.info("HTTP encontró %d archivos (esperados al menos %d); se usa el navegador",
+                        len(archivos_encontrados), max(esperados, 1))
+            nivel = NIVEL_NAVEGADOR
+    if nivel == NIVEL_NAVEGADOR:
+        archivos_navegador = obtener_archivos_navegador(url)
+        if archivos_navegador is None and not archivos_encontrados:
+            return None, nivel
+        if archivos_navegador and len(archivos_navegador) > len(archivos_encontrados):
+            archivos_encontrados = archivos_navegador
+        elif archivos_encontrados:
+            # El navegador no encontró más que HTTP (p. ej. se borró un archivo): la página no
+            # necesita Chrome y se conserva lo obtenido por HTTP
+            nivel = NIVEL_HTTP
+    metricas.contador("nivel_obtencion", sitio="dinamico", nivel=nivel)
+    registrar_nivel(url, nivel, len(archivos_encontrados), estado)
+    guardar_estado(estado)
+    return archivos_encontrados, nivel
+
+def limpiar_archivos_dinamicos(archivos_vigentes):
+    """Borra de disco y de la base los archivos que ya no están disponibles."""
+    try:
+        conn = obtener_conexion()
+        cur = conn.cursor()
+        cur.execute("SELECT nombre_archivo FROM archivos_dinamicos;")
+        archivos_bd = [fila[0] for fila in cur.fetchall()]
+        
+        for archivo_bd in archivos_bd:
+            if archivo_bd not in archivos_vigentes:
+                logger.warning("[ELIMINADO] %s ya no está disponible", archivo_bd)
+                try:
+                    os.remove(os.path.join(CARPETA_DESCARGAS, archivo_bd))
+                except:
+                    pass
+                cur.execute("DELETE FROM archivos_dinamicos WHERE nombre_archivo = %s;", (archivo_bd,))
+                quitar_del_catalogo(cur, "dinamico", archivo_bd)
+        
+        conn.commit()
+        cur.close()
+        conn.close()
+        
+    except Exception as e:
+        logger.exception("Error en limpieza de archivos")
+
+# Función principal para raspar sitio dinámico
+@metricas.medido("sitio_dinamico")
+def raspar_sitio_dinamico():
+    """Función principal para realizar scraping dinámico"""
+    
+    # Crear carpeta y tabla de base de datos
+    if not asegurar_tabla_dinamica():
+        return
+    
+    archivos_encontrados, nivel = descubrir_archivos_dinamicos(BASE_URL)
+    if archivos_encontrados is None:
+        return
+    if not archivos_encontrados:
+        # Sin resultados no se limpia: más probable un sitio caído que un sitio vacío
+        logger.warning("No se encontraron archivos; se omite la limpieza")
+        return
+
+    try:
+        # 4. Procesar todos los archivos encontrados
+        logger.info("Procesando %d archivos encontrados...", len(archivos_encontrados))
+        
+        # Las descargas corren en varios hilos y el registro en la base se hace por lotes en otro,
+        # así la red no espera a la base ni la base a la red
+        pipeline = (Pipeline("descargas_dinamicas")
+                    .etapa("descarga", _descargar, hilos=HILOS_DESCARGA)
+                    .escritor("registro", _registrar_descargas, tamano_lote=TAMANO_LOTE_REGISTRO))
+        with pipeline:
+            for nombre_archivo, info_archivo in archivos_encontrados.items():
+                pipeline.poner((nombre_archivo, info_archivo))
         
         # 5. Limpiar archivos eliminados
-        try:
-            conn = obtener_conexion()
-            cur = conn.cursor()
-            cur.execute("SELECT nombre_archivo FROM archivos_dinamicos;")
-            archivos_bd = [fila[0] for fila in cur.fetchall()]
-            
-            for archivo_bd in archivos_bd:
-                if archivo_bd not in archivos_encontrados:
-                    logger.warning(f"[ELIMINADO] {archivo_bd} ya no está disponible")
-                    try:
-                        os.remove(os.path.join(CARPETA_DESCARGAS, archivo_bd))
-                    except:
-                        pass
-                    cur.execute("DELETE FROM archivos_dinamicos WHERE nombre_archivo = %s;", (archivo_bd,))
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-        except Exception as e:
-            logger.exception("Error en limpieza de archivos")
+        limpiar_archivos_dinamicos(archivos_encontrados)
         
     except Exception as e:
         logger.exception("Error durante raspado dinámico")
-        
-    finally:
-        # Cerrar driver
-        if driver:
-            driver.quit()
-            logger.info("Driver de Chrome cerrado")
     
-    logger.info("Raspado dinámico completado")
+    logger.info("Raspado dinámico completado (nivel %s)", nivel)
 
 # Función para raspar sitio específico con SPA (Single Page Application)
 def raspar_spa(url_base, selectores_personalizados=None):
@@ -351,7 +457,7 @@ def raspar_spa(url_base, selectores_personalizados=None):
         return
     
     try:
-        logger.info(f"Raspando SPA: {url_base}")
+        logger.info("Raspando SPA: %s", url_base)
         driver.get(url_base)
         
         # Esperar por selector personalizado si se proporciona
@@ -360,7 +466,7 @@ def raspar_spa(url_base, selectores_personalizados=None):
             for selector in selectores_personalizados:
                 try:
                     wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                    logger.info(f"Elemento SPA cargado: {selector}")
+                    logger.info("Elemento SPA cargado: %s", selector)
                     break
                 except TimeoutException:
                     continue
@@ -376,18 +482,21 @@ def raspar_spa(url_base, selectores_personalizados=None):
                 except:
                     continue
         except Exception as e:
-            logger.debug(f"Error en simulación de clicks: {e}")
+            logger.debug("Error en simulación de clicks: %s", e)
         
         # Continuar con extracción normal
         hacer_scroll_completo(driver)
-        return driver.page_source
+        html_renderizado = driver.page_source
+        guardar_snapshot(url_base, html_renderizado, tipo="spa")
+        return html_renderizado
         
     except Exception as e:
-        logger.error(f"Error raspando SPA: {e}")
+        logger.error("Error raspando SPA: %s", e)
         return None
     finally:
         if driver:
             driver.quit()
 
 if __name__ == "__main__":
+    configurar_logging()
     raspar_sitio_dinamico()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Archivo de snapshots del HTML renderizado
+# Cada página se guarda comprimida (zstd si está instalado, si no gzip) y deduplicada por contenido:
+#   snapshots/objetos/ab/abcdef....html.zst   <- un blob por contenido distinto (sha256)
+#   snapshots/indice.jsonl                    <- una línea por captura (url, run_id, fecha, sha256...)
+# Así un selector corregido se puede volver a aplicar sobre capturas anteriores sin abrir Chrome.
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from db.logger import logger, run_id_actual
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional; gzip viene con Python
+    zstandard = None
+
+CARPETA_SNAPSHOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'snapshots')
+# Poner SNAPSHOTS_DESACTIVADOS=1 para no archivar (p. ej. en máquinas con poco disco)
+SNAPSHOTS_DESACTIVADOS = os.getenv("SNAPSHOTS_DESACTIVADOS") == "1"
+
+EXTENSIONES = {"zstd": ".html.zst", "gzip": ".html.gz"}
+
+_lock_indice = threading.Lock()
+
+
+def _ruta_indice(carpeta):
+    return os.path.join(carpeta, "indice.jsonl")
+
+
+def _ruta_objeto(carpeta, sha256, codec):
+    return os.path.join(carpeta, "objetos", sha256[:2], sha256 + EXTENSIONES[codec])
+
+
+def _comprimir(datos):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(datos)
+    return "gzip", gzip.compress(datos, compresslevel=6)
+
+
+def _descomprimir(datos, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("El snapshot está comprimido con zstd y el paquete zstandard no está instalado")
+        return zstandard.ZstdDecompressor().decompress(datos)
+    return gzip.decompress(datos)
+
+
+def _buscar_objeto(carpeta, sha256):
+    """Devuelve (codec, ruta) si el contenido ya está archivado con cualquier codec."""
+    for codec in EXTENSIONES:
+        ruta = _ruta_objeto(carpeta, sha256, codec)
+        if os.path.exists(ruta):
+            return codec, ruta
+    return None, None
+
+
+def guardar_snapshot(url, html, tipo="listado", carpeta=CARPETA_SNAPSHOTS, categoria=None):
+    """
+    Archiva el HTML renderizado de una URL.
+    :param tipo: "listado" (productos), "archivos" (enlaces descargables) o "spa" (ambos).
+    :param categoria: Categoría de los productos del listado, para guardarlos al reprocesar.
+    :return: sha256 del contenido, o None si el archivado está desactivado o falla.
+    """
+    if SNAPSHOTS_DESACTIVADOS or not html:
+        return None
+    try:
+        datos = html.encode("utf-8")
+        sha256 = hashlib.sha256(datos).hexdigest()
+        codec, ruta = _buscar_objeto(carpeta, sha256)
+        nuevo = codec is None
+        if nuevo:
+            codec, comprimido = _comprimir(datos)
+            ruta = _ruta_objeto(carpeta, sha256, codec)
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            # Escritura atómica: un lector nunca ve un blob a medias
+            temporal = "%s.%d.tmp" % (ruta, threading.get_ident())
+            with open(temporal, "wb") as f:
+                f.write(comprimido)
+            os.replace(temporal, ruta)
+
+        entrada = {
+            "url": url,
+            "tipo": tipo,
+            "run_id": run_id_actual(),
+            "fecha": datetime.now().isoformat(),
+            "sha256": sha256,
+            "codec": codec,
+            "bytes": len(datos),
+            "bytes_comprimidos": os.path.getsize(ruta),
+        }
+        if categoria:
+            entrada["categoria"] = categoria
+        with _lock_indice:
+            os.makedirs(carpeta, exist_ok=True)
+            with open(_ruta_indice(carpeta), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        logger.debug("Snapshot %s de %s (%s)", sha256[:12], url, "nuevo" if nuevo else "duplicado")
+        return sha256
+    except Exception as e:
+        # Archivar nunca debe interrumpir el scraping
+        logger.warning("No se pudo archivar el snapshot de %s: %s", url, e)
+        return None
+
+
+def listar_snapshots(desde=None, hasta=None, url=None, tipos=None, carpeta=CARPETA_SNAPSHOTS):
+    """
+    Lee el índice filtrando por fecha ISO (desde/hasta), prefijo de URL y tipos.
+    :return: Lista de entradas del índice en orden de captura.
+    """
+    ruta = _ruta_indice(carpeta)
+    if not os.path.exists(ruta):
+        return []
+    entradas = []
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            entrada = json.loads(linea)
+            if desde and entrada["fecha"] < desde:
+                continue
+            # `hasta` es inclusivo con la precisión que se pase: "2025-07-31" incluye todo ese día
+            if hasta and entrada["fecha"][:len(hasta)] > hasta:
+                continue
+            if url and not entrada["url"].startswith(url):
+                continue
+            if tipos and entrada["tipo"] not in tipos:
+                continue
+            entradas.append(entrada)
+    return entradas
+
+
+def leer_snapshot(entrada, carpeta=CARPETA_SNAPSHOTS):
+    """Devuelve el HTML de una entrada del índice."""
+    ruta = _ruta_objeto(carpeta, entrada["sha256"], entrada["codec"])
+    with open(ruta, "rb") as f:
+        return _descomprimir(f.read(), entrada["codec"]).decode("utf-8")
@@ -1,24 +1,26 @@
 
 # -*- coding: utf-8 -*-
 # Scraper para un sitio web estático local
-import requests, hashlib, os
-from bs4 import BeautifulSoup
+import hashlib, os
 from urllib.parse import urljoin
 from db.database import obtener_conexion
+from db.catalogo import quitar_del_catalogo, registrar_en_catalogo
 from db.logger import logger
+from db.metricas import registro as metricas
+from scraper import http_cliente
+from scraper.descargas import descargar_archivo
+from scraper.enlaces import descubrir_enlaces
 from datetime import datetime
 # Configuración de localhost para la web
 #BASE_URL = "http://localhost:8000/"
 BASE_URL = "http://localhost:5500/"
 CARPETA_DESCARGAS = "downloads"
+EXTENSIONES_ESTATICAS = [".pdf", ".jpg", ".png", ".docx"]
 # Genera el hash SHA-256 del contenido de un archivo
 def hash_archivo(contenido):
     return hashlib.sha256(contenido).hexdigest()
-# Función principal para scrapear un sitio estático
-def scrapear_sitio_estatico():
-    if not os.path.exists(CARPETA_DESCARGAS):
-        os.makedirs(CARPETA_DESCARGAS)
-    # Crear la tabla en la base de datos si no existe
+# Crear la tabla en la base de datos si no existe
+def asegurar_tabla_estatica():
     try:
         conn = obtener_conexion()
         cur = conn.cursor()
@@ -37,115 +39,75 @@ def scrapear_sitio_estatico():
         conn.close()
     except Exception as e:
         logger.exception("No se pudo crear la tabla downloaded_files")
-    # Log del inicio del scraping
-    logger.info("Iniciando scraping desde el sitio local")
-    respuesta = requests.get(BASE_URL)
-    sopa = BeautifulSoup(respuesta.content, "html.parser")
-    # Diccionario para almacenar archivos encontrados y sus hashes
-    archivos_encontrados = {}
-    # Scraping de enlaces HTML estáticos
+# Archivos publicados en el sitio: {nombre: {"url", "origen"}} desde los enlaces HTML y el endpoint JSON
+def descubrir_archivos_estaticos():
+    archivos = {}
+    # Scraping de enlaces HTML estáticos (una sola descarga y una sola pasada sobre la página)
     try:
         logger.info("Iniciando scraping HTML desde el sitio local")
-        respuesta = requests.get(BASE_URL)
-        sopa = BeautifulSoup(respuesta.content, "html.parser")
-        archivos = sopa.find_all("a", href=True)
+        respuesta = http_cliente.get(BASE_URL)
         # Filtrar enlaces para encontrar archivos con extensiones específicas
-        for enlace_archivo in archivos:
-            href = enlace_archivo["href"]
-            if any(href.lower().endswith(ext) for ext in [".pdf", ".jpg", ".png", ".docx"]):
-                url_completa = urljoin(BASE_URL, href)
-                nombre_archivo = os.path.basename(href)
-                ruta_local = os.path.join(CARPETA_DESCARGAS, nombre_archivo)
-                # Verificar si el archivo ya fue procesado
-                respuesta_archivo = requests.get(url_completa)
-                contenido = respuesta_archivo.content
-                sha256 = hash_archivo(contenido)
-                archivos_encontrados[nombre_archivo] = sha256
-                # Verificar si el archivo existe en la base de datos
-                conn = obtener_conexion()
-                cur = conn.cursor()
-                cur.execute("SELECT sha256 FROM downloaded_files WHERE filename = %s;", (nombre_archivo,))
-                resultado = cur.fetchone()
-                # Si el archivo es nuevo o cambió, guardarlo
-                if resultado is None:
-                    with open(ruta_local, "wb") as f:
-                        f.write(contenido)
-                    cur.execute(
-                        "INSERT INTO downloaded_files (filename, url, sha256) VALUES (%s, %s, %s);",
-                        (nombre_archivo, url_completa, sha256)
-                    )
-                    logger.info(f"[NUEVO][HTML] {nombre_archivo} descargado")
-                elif resultado[0] != sha256:
-                    with open(ruta_local, "wb") as f:
-                        f.write(contenido)
-                    cur.execute(
-                        "UPDATE downloaded_files SET sha256 = %s, last_seen = CURRENT_TIMESTAMP WHERE filename = %s;",
-                        (sha256, nombre_archivo)
-                    )
-                    logger.warning(f"[CAMBIO][HTML] {nombre_archivo} actualizado (hash diferente)")
-                else:
-                    cur.execute(
-                        "UPDATE downloaded_files SET last_seen = CURRENT_TIMESTAMP WHERE filename = %s;",
-                        (nombre_archivo,)
-                    )
-                # Guardar cambios en la base de datos
-                conn.commit()
-                cur.close()
-                conn.close()
+        enlaces, _ = descubrir_enlaces(respuesta.text, BASE_URL, EXTENSIONES_ESTATICAS)
+        for nombre_archivo, info_archivo in enlaces.items():
+            archivos[nombre_archivo] = {"url": info_archivo["url"], "origen": "HTML"}
     except Exception as e:
         logger.exception("Error procesando archivos desde HTML")
     # Scraping desde el endpoint de datos JSON
     try:
         logger.info("Obteniendo archivos desde la API JSON...")
         url_json = urljoin(BASE_URL, "data/files.json")
-        respuesta = requests.get(url_json)
-        if respuesta.status_code == 200:
-            datos_archivos = respuesta.json()
-            for archivo in datos_archivos:
-                url_archivo = archivo.get("url")
-                nombre_archivo = os.path.basename(url_archivo)
-                ruta_local = os.path.join(CARPETA_DESCARGAS, nombre_archivo)
-                # Verificar si el archivo ya fue procesado
-                respuesta_archivo = requests.get(url_archivo)
-                contenido = respuesta_archivo.content
-                sha256 = hash_archivo(contenido)
-                archivos_encontrados[nombre_archivo] = sha256
-                # Verificar si el archivo existe en la base de datos
-                conn = obtener_conexion()
-                cur = conn.cursor()
-                cur.execute("SELECT sha256 FROM downloaded_files WHERE filename = %s;", (nombre_archivo,))
-                resultado = cur.fetchone()
-                # Si el archivo es nuevo o cambió, guardarlo
-                if resultado is None:
-                    with open(ruta_local, "wb") as f:
-                        f.write(contenido)
-                    cur.execute(
-                        "INSERT INTO downloaded_files (filename, url, sha256) VALUES (%s, %s, %s);",
-                        (nombre_archivo, url_archivo, sha256)
-                    )
-                    logger.info(f"[NUEVO][JSON] {nombre_archivo} descargado desde JSON")
-                elif resultado[0] != sha256:
-                    with open(ruta_local, "wb") as f:
-                        f.write(contenido)
-                    cur.execute(
-                        "UPDATE downloaded_files SET sha256 = %s, last_seen = CURRENT_TIMESTAMP WHERE filename = %s;",
-                        (sha256, nombre_archivo)
-                    )
-                    logger.warning(f"[CAMBIO][JSON] {nombre_archivo} actualizado (hash diferente)")
-                else:
-                    cur.execute(
-                        "UPDATE downloaded_files SET last_seen = CURRENT_TIMESTAMP WHERE filename = %s;",
-                        (nombre_archivo,)
-                    )
-                # Guardar cambios en la base de datos
-                conn.commit()
-                cur.close()
-                conn.close()
-        else:
-            logger.error(f"No se pudieron obtener archivos JSON: {respuesta.status_code}")
+        # El endpoint pagina por cursor: se recorren todas las páginas, si no la limpieza
+        # borraría los archivos que no entran en la primera
+        for archivo in http_cliente.get_lista_paginada(url_json):
+            url_archivo = archivo.get("url")
+            archivos[os.path.basename(url_archivo)] = {"url": url_archivo, "origen": "JSON"}
     except Exception as e:
         logger.exception("Error procesando archivos desde JSON")
-    # Limpiar archivos que ya no están presentes
+    return archivos
+# Descarga un archivo y lo registra en downloaded_files y en el catálogo
+# Lanza la excepción de la descarga para que quien llama decida si sigue o reintenta
+def procesar_archivo_estatico(nombre_archivo, url_archivo, origen):
+    ruta_local = os.path.join(CARPETA_DESCARGAS, nombre_archivo)
+    with metricas.temporizador("descarga_archivo", sitio="estatico", origen=origen):
+        descarga = descargar_archivo(url_archivo, ruta_local)
+    metricas.contador("archivos_descargados", sitio="estatico", origen=origen)
+    metricas.contador("bytes_descargados", descarga["bytes_transferidos"], sitio="estatico", origen=origen)
+    sha256 = descarga["sha256"]
+    # Verificar si el archivo existe en la base de datos
+    conn = obtener_conexion()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT sha256 FROM downloaded_files WHERE filename = %s;", (nombre_archivo,))
+        resultado = cur.fetchone()
+        # Si el archivo es nuevo o cambió, registrarlo (ya quedó en ruta_local)
+        if resultado is None:
+            cur.execute(
+                "INSERT INTO downloaded_files (filename, url, sha256) VALUES (%s, %s, %s);",
+                (nombre_archivo, url_archivo, sha256)
+            )
+            logger.info("[NUEVO][%s] %s descargado", origen, nombre_archivo)
+        elif resultado[0] != sha256:
+            cur.execute(
+                "UPDATE downloaded_files SET sha256 = %s, last_seen = CURRENT_TIMESTAMP WHERE filename = %s;",
+                (sha256, nombre_archivo)
+            )
+            logger.warning("[CAMBIO][%s] %s actualizado (hash diferente)", origen, nombre_archivo)
+        else:
+            cur.execute(
+                "UPDATE downloaded_files SET last_seen = CURRENT_TIMESTAMP WHERE filename = %s;",
+                (nombre_archivo,)
+            )
+        # Catálogo unificado: tamaño y tipo MIME se toman de esta descarga
+        registrar_en_catalogo(cur, "estatico", nombre_archivo, url_archivo, sha256, descarga["bytes"],
+                              descarga["content_type"], origen)
+        # Guardar cambios en la base de datos
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    return sha256
+# Borra de disco y de la base los archivos que ya no publica el sitio
+def limpiar_archivos_estaticos(archivos_vigentes):
     try:
         conn = obtener_conexion()
         cur = conn.cursor()
@@ -153,18 +115,41 @@ def scrapear_sitio_estatico():
         todos_archivos_db = [row[0] for row in cur.fetchall()]
         # Verificar archivos que ya no se encuentran
         for archivo_db in todos_archivos_db:
-            if archivo_db not in archivos_encontrados:
-                logger.warning(f"[ELIMINADO] {archivo_db} ya no se encuentra")
+            if archivo_db not in archivos_vigentes:
+                logger.warning("[ELIMINADO] %s ya no se encuentra", archivo_db)
                 try:
                     os.remove(os.path.join(CARPETA_DESCARGAS, archivo_db))
                 except:
                     pass
                 cur.execute("DELETE FROM downloaded_files WHERE filename = %s;", (archivo_db,))
+                quitar_del_catalogo(cur, "estatico", archivo_db)
         # Finalizar conexión a la base de datos
         conn.commit()
         cur.close()
         conn.close()
     except Exception as e:
         logger.exception("Error durante la verificación de eliminación")
+# Función principal para scrapear un sitio estático
+@metricas.medido("sitio_estatico")
+def scrapear_sitio_estatico():
+    if not os.path.exists(CARPETA_DESCARGAS):
+        os.makedirs(CARPETA_DESCARGAS)
+    asegurar_tabla_estatica()
+    # Log del inicio del scraping
+    logger.info("Iniciando scraping desde el sitio local")
+    archivos = descubrir_archivos_estaticos()
+    for nombre_archivo, info_archivo in archivos.items():
+        try:
+            procesar_archivo_estatico(nombre_archivo, info_archivo["url"], info_archivo["origen"])
+        except Exception as e:
+            # Un archivo que falla no detiene al resto; su .part queda para reanudar
+            logger.error("[%s] Error descargando %s: %s", info_archivo["origen"], nombre_archivo, e)
+    # Limpiar archivos que ya no están presentes: se compara contra lo publicado, no contra lo
+    # descargado, para no borrar la copia buena de un archivo que falló por un error pasajero
+    if archivos:
+        limpiar_archivos_estaticos(archivos)
+    else:
+        # Sin resultados no se limpia: más probable un sitio caído que un sitio vacío
+        logger.warning("No se encontraron archivos; se omite la limpieza")
     # Log del fin del scraping
     logger.info("Scraping finalizado.")
\ No newline at end of file
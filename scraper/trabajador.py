@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+# Trabajador de la cola crawl_tasks (db/tareas.py)
+# Reclama una tarea, la ejecuta con la lógica de siempre (extracción de productos, descubrimiento
+# y descarga de archivos, exportación) y la marca como hecha o fallida. Mientras trabaja, un hilo
+# renueva el arriendo cada LATIDO_SEGUNDOS. Se pueden levantar varios en una máquina
+# (cli.py worker --procesos N) o en varias contra la misma base: cada página de la categoría y
+# cada archivo es una tarea, así que el trabajo se reparte entre todos. La primera página encola
+# todas las demás en cuanto ve la paginación, así la categoría no se recorre en cadena.
+# Los archivos se descargan en el disco del nodo que toma la tarea (usar una carpeta compartida
+# si hay más de una máquina).
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import uuid
+
+from db import tareas
+from db.database import obtener_conexion
+from db.logger import logger, nuevo_run_id
+from db.metricas import registro as metricas
+
+LATIDO_SEGUNDOS = 30
+ESPERA_SIN_TAREAS = 5
+
+TAREA_PAGINA = "pagina_categoria"
+TAREA_DESCUBRIR = "descubrir_archivos"
+TAREA_ARCHIVO = "archivo"
+TAREA_EXPORTAR = "exportar"
+
+
+def clave_pagina(url):
+    return "pagina:" + url
+
+
+def clave_archivo(sitio, url):
+    return "archivo:%s:%s" % (sitio, url)
+
+
+def _encolar_pagina(trabajador, carga, url, **opciones):
+    tareas.encolar(trabajador.conn, TAREA_PAGINA, clave_pagina(url),
+                   dict(opciones, url=url, categoria=carga.get("categoria"), recorrido=carga.get("recorrido")))
+
+
+def _tarea_pagina(trabajador, carga):
+    """
+    Una página del listado. La primera (`expandir`) encola todas las páginas que muestra la
+    paginación antes de extraer, así los demás trabajadores las toman en paralelo; si la
+    paginación no dice cuántas hay, cada página encola la siguiente (`encadenar`).
+    """
+    from db.database import guardar_productos
+    from scraper.productos import normalizar_producto
+    from selenium.common.exceptions import WebDriverException
+
+    scraper, driver = trabajador.navegador()
+    try:
+        scraper.cargar_pagina(driver, carga["url"])
+        urls_paginas = scraper.urls_paginas(driver) if carga.get("expandir") else []
+        url_siguiente = None if urls_paginas else scraper.url_siguiente_pagina(driver)
+        url_actual, html = driver.current_url, driver.page_source
+    except WebDriverException:
+        # Chrome se cayó o la sesión murió: el próximo intento (de esta u otra tarea) abre uno nuevo
+        trabajador.descartar_navegador()
+        raise
+    for posicion, url in enumerate(urls_paginas, 1):
+        # La última enlazada sigue la cadena por si la paginación solo muestra una ventana de páginas
+        _encolar_pagina(trabajador, carga, url, encadenar=posicion == len(urls_paginas))
+    if urls_paginas:
+        logger.info("%d páginas de %s encoladas", len(urls_paginas), carga["url"])
+    elif url_siguiente and carga.get("encadenar", True):
+        _encolar_pagina(trabajador, carga, url_siguiente, encadenar=True)
+    productos = scraper.extraer_productos((url_actual, html))
+    productos = [p for p in map(normalizar_producto, productos) if p]
+    metricas.contador("paginas_procesadas", sitio="tiendamonge")
+    # Un reintento de la página en el mismo recorrido no vuelve a insertar sus productos
+    lote = "%s:%s" % (carga["recorrido"], clave_pagina(carga["url"])) if carga.get("recorrido") else None
+    if productos and not guardar_productos(productos, categoria=carga.get("categoria"), lote=lote):
+        raise RuntimeError("No se pudieron guardar %d productos de %s" % (len(productos), carga["url"]))
+
+
+def _tarea_descubrir(trabajador, carga):
+    """Lista los archivos de un sitio, encola una tarea por archivo y limpia los que ya no están."""
+    sitio = carga["sitio"]
+    if sitio == "estatico":
+        from scraper.static_scraper import asegurar_tabla_estatica, descubrir_archivos_estaticos, limpiar_archivos_estaticos
+
+        asegurar_tabla_estatica()
+        archivos = descubrir_archivos_estaticos()
+        limpiar = limpiar_archivos_estaticos
+    elif sitio == "dinamico":
+        from scraper.scraper_dynamic import asegurar_tabla_dinamica, descubrir_archivos_dinamicos, limpiar_archivos_dinamicos
+
+        if not asegurar_tabla_dinamica():
+            raise RuntimeError("No se pudo crear la tabla archivos_dinamicos")
+        archivos, _ = descubrir_archivos_dinamicos()
+        if archivos is None:
+            raise RuntimeError("No se pudo obtener la lista de archivos del sitio dinámico")
+        limpiar = limpiar_archivos_dinamicos
+    else:
+        raise ValueError("Sitio desconocido: %s" % sitio)
+
+    if not archivos:
+        # Sin resultados no se limpia: más probable un sitio caído que un sitio vacío
+        logger.warning("[%s] No se encontraron archivos; se omite la limpieza", sitio)
+        return
+    for nombre_archivo, info_archivo in archivos.items():
+        tareas.encolar(trabajador.conn, TAREA_ARCHIVO, clave_archivo(sitio, info_archivo["url"]),
+                       dict(info_archivo, sitio=sitio, nombre_archivo=nombre_archivo,
+                            recorrido=carga.get("recorrido")))
+    logger.info("[%s] %d archivos encolados", sitio, len(archivos))
+    limpiar(archivos)
+
+
+def _tarea_archivo(trabajador, carga):
+    """Descarga y registra un archivo; si falla, la cola lo reintenta (el .part permite reanudar)."""
+    if carga["sitio"] == "estatico":
+        from scraper.static_scraper import CARPETA_DESCARGAS, procesar_archivo_estatico
+
+        os.makedirs(CARPETA_DESCARGAS, exist_ok=True)
+        procesar_archivo_estatico(carga["nombre_archivo"], carga["url"], carga.get("origen", "HTML"))
+    else:
+        from scraper.scraper_dynamic import CARPETA_DESCARGAS, procesar_archivo_dinamico
+
+        os.makedirs(CARPETA_DESCARGAS, exist_ok=True)
+        procesar_archivo_dinamico(carga["nombre_archivo"], {"url": carga["url"], "metodo": carga["metodo"]})
+
+
+def _tarea_exportar(trabajador, carga):
+    from db.analitica import exportar_productos_a_parquet
+    from db.exportar import exportar_productos_a_json, exportar_archivos_a_json
+
+    exportar_productos_a_json()
+    exportar_archivos_a_json()
+    exportar_productos_a_parquet()
+
+
+MANEJADORES = {
+    TAREA_PAGINA: _tarea_pagina,
+    TAREA_DESCUBRIR: _tarea_descubrir,
+    TAREA_ARCHIVO: _tarea_archivo,
+    TAREA_EXPORTAR: _tarea_exportar,
+}
+
+
+def encolar_recorrido(completo=False, dinamico=False):
+    """
+    Lo que antes ejecutaba el programador, como tareas: primera página de la categoría; el
+    recorrido completo suma los archivos del sitio estático y `dinamico` los del sitio con
+    Selenium. La exportación la encola el trabajador que termina la última tarea del recorrido.
+    :return: Estado de la cola ({tipo: {estado: n}}).
+    """
+    from main import CATEGORIA, URL_CATEGORIA
+
+    recorrido = uuid.uuid4().hex[:12]
+    conn = obtener_conexion()
+    try:
+        nuevas = [tareas.encolar(conn, TAREA_PAGINA, clave_pagina(URL_CATEGORIA),
+                                 {"url": URL_CATEGORIA, "categoria": CATEGORIA, "expandir": True,
+                                  "recorrido": recorrido})]
+        if completo:
+            nuevas.append(tareas.encolar(conn, TAREA_DESCUBRIR, "descubrir:estatico",
+                                         {"sitio": "estatico", "recorrido": recorrido}))
+        if dinamico:
+            nuevas.append(tareas.encolar(conn, TAREA_DESCUBRIR, "descubrir:dinamico",
+                                         {"sitio": "dinamico", "recorrido": recorrido}))
+        logger.info("Recorrido %s encolado (%d tareas nuevas, el resto ya estaba pendiente)", recorrido, sum(nuevas))
+        return tareas.resumen(conn)
+    finally:
+        conn.close()
+
+
+class Trabajador:
+    def __init__(self, nombre=None, tipos=None, arriendo=tareas.ARRIENDO_SEGUNDOS, latido=LATIDO_SEGUNDOS,
+                 manejadores=None):
+        self.nombre = nombre or "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:6])
+        self.tipos = tipos
+        self.arriendo = arriendo
+        self.latido = latido
+        self.manejadores = manejadores or MANEJADORES
+        self.conn = None
+        self._detener = threading.Event()
+        # Navegador propio, creado la primera vez que llega una página y reutilizado después
+        self._scraper = None
+        self._driver = None
+
+    def navegador(self):
+        if self._driver is None:
+            from main import ScraperTiendaMonge, crear_driver
+
+            self._scraper = ScraperTiendaMonge()
+            self._driver = crear_driver()
+        return self._scraper, self._driver
+
+    def detener(self):
+        """Termina después de la tarea en curso."""
+        self._detener.set()
+
+    def _reconectar(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+        self.conn = obtener_conexion()
+
+    def _en_cola(self, operacion, *args):
+        """Ejecuta una operación de db/tareas.py; si la conexión murió, reconecta y la repite una vez."""
+        try:
+            return operacion(self.conn, *args)
+        except Exception:
+            logger.warning("[%s] Error en la conexión con la cola; se reconecta", self.nombre, exc_info=True)
+            self._reconectar()
+            return operacion(self.conn, *args)
+
+    def _latidos(self, tarea, terminada):
+        # Conexión propia (la principal está ocupada por la tarea), abierta solo si la tarea
+        # dura más de un latido: la mayoría de los archivos termina antes
+        conn = None
+        try:
+            while not terminada.wait(self.latido):
+                conn = conn or obtener_conexion()
+                if not tareas.renovar_arriendo(conn, tarea["id"], self.nombre, self.arriendo):
+                    logger.warning("[%s] Arriendo de %s perdido", self.nombre, tarea["clave"])
+                    return
+        except Exception:
+            logger.exception("[%s] Error renovando el arriendo de %s", self.nombre, tarea["clave"])
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _cerrar_recorrido(self, tarea):
+        """Si la tarea era la última pendiente de su recorrido, encola la exportación."""
+        recorrido = tarea["carga"].get("recorrido")
+        if not recorrido or tarea["tipo"] == TAREA_EXPORTAR:
+            return
+        try:
+            if self._en_cola(tareas.recorrido_terminado, recorrido, [TAREA_EXPORTAR]):
+                if self._en_cola(tareas.encolar, TAREA_EXPORTAR, "exportar", {"recorrido": recorrido}):
+                    logger.info("[%s] Recorrido %s terminado; exportación encolada", self.nombre, recorrido)
+        except Exception:
+            logger.exception("[%s] No se pudo comprobar el fin del recorrido %s", self.nombre, recorrido)
+
+    def ejecutar_tarea(self, tarea):
+        """Ejecuta una tarea reclamada; devuelve True si terminó bien."""
+        terminada = threading.Event()
+        latidos = threading.Thread(target=self._latidos, args=(tarea, terminada), daemon=True)
+        latidos.start()
+        try:
+            with metricas.temporizador("tarea", tipo=tarea["tipo"]):
+                self.manejadores[tarea["tipo"]](self, tarea["carga"])
+        except Exception as e:
+            logger.exception("[%s] Error en la tarea %s (intento %d de %d)", self.nombre, tarea["clave"],
+                             tarea["intentos"], tarea["max_intentos"])
+            try:
+                estado = self._en_cola(tareas.fallar, tarea["id"], self.nombre, e)
+            except Exception:
+                # Sin registrar el fallo la tarea queda en curso y se retoma al vencer el arriendo
+                logger.exception("[%s] No se pudo registrar el fallo de %s", self.nombre, tarea["clave"])
+                estado = None
+            metricas.contador("tareas_fallidas", tipo=tarea["tipo"], estado=estado or "perdida")
+            if estado == tareas.FALLIDA:
+                self._cerrar_recorrido(tarea)
+            return False
+        finally:
+            terminada.set()
+            latidos.join()
+        try:
+            completada = self._en_cola(tareas.completar, tarea["id"], self.nombre)
+        except Exception:
+            logger.exception("[%s] No se pudo marcar %s como hecha", self.nombre, tarea["clave"])
+            completada = False
+        if not completada:
+            # El arriendo venció y otra instancia la tomó (o se tomará al vencer): el trabajo se repite, no se pierde
+            logger.warning("[%s] %s terminó con el arriendo vencido", self.nombre, tarea["clave"])
+        metricas.contador("tareas_completadas", tipo=tarea["tipo"])
+        self._cerrar_recorrido(tarea)
+        return True
+
+    def ejecutar(self, max_tareas=None, salir_si_vacia=False):
+        """
+        Bucle principal: reclama y ejecuta tareas hasta detener(), `max_tareas` o, con
+        `salir_si_vacia`, hasta que no quede nada disponible.
+        :return: Cantidad de tareas ejecutadas.
+        """
+        self.conn = obtener_conexion()
+        logger.info("[%s] Trabajador iniciado (tipos: %s)", self.nombre, ", ".join(self.tipos or ["todos"]))
+        ejecutadas = 0
+        try:
+            while not self._detener.is_set():
+                try:
+                    tarea = self._en_cola(tareas.reclamar, self.nombre, self.tipos, self.arriendo)
+                except Exception:
+                    # Base caída: se vuelve a intentar (y a reconectar) en la próxima vuelta
+                    logger.exception("[%s] No se pudo reclamar una tarea", self.nombre)
+                    self._detener.wait(ESPERA_SIN_TAREAS)
+                    continue
+                if tarea is None:
+                    if salir_si_vacia:
+                        break
+                    self._detener.wait(ESPERA_SIN_TAREAS)
+                    continue
+                self.ejecutar_tarea(tarea)
+                ejecutadas += 1
+                if max_tareas and ejecutadas >= max_tareas:
+                    break
+        finally:
+            self.cerrar()
+        logger.info("[%s] Trabajador detenido tras %d tareas", self.nombre, ejecutadas)
+        return ejecutadas
+
+    def descartar_navegador(self):
+        """Cierra el navegador (si sigue vivo) para que navegador() cree uno nuevo."""
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+        self._scraper = None
+        self._driver = None
+
+    def cerrar(self):
+        self.descartar_navegador()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _proceso_trabajador(tipos, max_tareas, salir_si_vacia):
+    """Punto de entrada de cada proceso: SIGTERM/SIGINT terminan después de la tarea en curso."""
+    from db.logger import configurar_logging
+
+    configurar_logging()
+    nuevo_run_id()
+    metricas.reiniciar()
+    trabajador = Trabajador(tipos=tipos)
+    signal.signal(signal.SIGTERM, lambda *_: trabajador.detener())
+    signal.signal(signal.SIGINT, lambda *_: trabajador.detener())
+    try:
+        trabajador.ejecutar(max_tareas=max_tareas, salir_si_vacia=salir_si_vacia)
+    finally:
+        metricas.guardar_reporte()
+
+
+def iniciar_trabajadores(procesos=1, tipos=None, max_tareas=None, salir_si_vacia=False):
+    """Levanta `procesos` trabajadores independientes (cada uno con su conexión y su navegador)."""
+    if procesos <= 1:
+        _proceso_trabajador(tipos, max_tareas, salir_si_vacia)
+        return
+    hijos = [
+        multiprocessing.Process(target=_proceso_trabajador, args=(tipos, max_tareas, salir_si_vacia),
+                                name="trabajador-%d" % i)
+        for i in range(procesos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    try:
+        for hijo in hijos:
+            hijo.join()
+    except KeyboardInterrupt:
+        # Ctrl+C llega a todo el grupo; cada hijo termina su tarea en curso
+        for hijo in hijos:
+            hijo.join()
@@ -1,15 +1,16 @@
-from flask import Flask, send_from_directory
-import os
+from flask import Flask
+from api.activos import CARPETA_FRONTEND, responder_activo
 # para hacer funcionar el servidor con el uso de Flask
-app = Flask(__name__, static_folder="../frontend", static_url_path="")
+# Los archivos se sirven desde api/activos.py (nombres con hash, gzip/brotli y caché en memoria)
+app = Flask(__name__, static_folder=None)
 
 @app.route("/")
 def root():
-    return send_from_directory(app.static_folder, "index.html")
+    return responder_activo("index.html", CARPETA_FRONTEND)
 
 @app.route("/<path:filename>")
 def serve_static(filename):
-    return send_from_directory(app.static_folder, filename)
+    return responder_activo(filename, CARPETA_FRONTEND)
 
 if __name__ == "__main__":
     app.run(port=5500, debug=True)